@@ -0,0 +1,237 @@
+import json
+import itertools
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Iterable, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+
+_ABSENT = object()
+
+class ChunkStore(Sequence):
+    """
+    Columnar, read-only chunk corpus indexed by row (integer chunk id).
+    Texts live in one UTF-8 buffer addressed by `offsets`. Low-cardinality metadata keys
+    (doc_id, source, section headers) are interned: a table of distinct values plus an int32
+    code column, -1 where the key is absent. Keys with mostly unique values (chunk_id) are
+    stored as JSON appended to the text buffer and addressed by a (start, end) `spans` column.
+    No per-chunk Python objects are held: `Document`s are built on access, so a saved
+    store can be memory-mapped and a corpus costs little more than its raw text.
+    Indexing and iteration yield fresh `Document`s, so it stands in for a chunk list.
+    """
+    ARRAYS = ("text", "offsets", "codes", "spans")
+    # a key stays interned while it has at most this many distinct values, or this share of its chunks
+    max_interned_values = 64
+    max_interned_ratio = 0.5
+
+    def __init__(
+            self,
+            text: np.ndarray,
+            offsets: np.ndarray,
+            keys: List[str],
+            values: List[Optional[list]],
+            codes: np.ndarray,
+            spans: np.ndarray
+    ):
+        self.text = text
+        self.offsets = offsets
+        self.keys = keys
+        self.values = values  # None for keys stored in `spans`
+        self.codes = codes
+        self.spans = spans
+        self.key_index = {key: i for i, key in enumerate(keys)}
+        self.columns = self._columns(values)
+        self._tables_bytes = sum(len(json.dumps(table)) for table in values if table is not None)
+
+    @staticmethod
+    def _columns(values: List[Optional[list]]) -> dict[int, int]:
+        """key -> its column in `codes` (interned keys) or in `spans` (keys stored as JSON)."""
+        interned = [k for k, table in enumerate(values) if table is not None]
+        unique = [k for k, table in enumerate(values) if table is None]
+        return {k: i for i, k in enumerate(interned)} | {k: i for i, k in enumerate(unique)}
+
+    @classmethod
+    def from_documents(cls, documents: Iterable[Document], ids: Optional[List[str]] = None) -> "ChunkStore":
+        """Packs documents into a store; `ids` (if given) are stamped as their `chunk_id` metadata."""
+        text = bytearray()
+        offsets = [0]
+        keys: dict[str, int] = {}
+        interned: list[dict[str, int]] = []
+        values: list[list] = []
+        used: list[int] = []
+        rows: list[list[tuple[int, int]]] = []
+        for row, doc in enumerate(documents):
+            text += doc.page_content.encode("utf-8")
+            offsets.append(len(text))
+            metadata = doc.metadata if ids is None else {**doc.metadata, "chunk_id": ids[row]}
+            entry = []
+            for key, value in metadata.items():
+                if key not in keys:
+                    keys[key] = len(keys)
+                    interned.append({})
+                    values.append([])
+                    used.append(0)
+                k = keys[key]
+                used[k] += 1
+                # json keeps True / 1 / 1.0 apart and makes list values hashable
+                code = interned[k].setdefault(json.dumps(value, sort_keys=True), len(values[k]))
+                if code == len(values[k]):
+                    values[k].append(value)
+                entry.append((k, code))
+            rows.append(entry)
+
+        # mostly-unique keys leave their value tables for JSON spans after the chunk texts
+        unique = {
+            k: values[k] for k in range(len(keys))
+            if len(values[k]) > max(cls.max_interned_values, cls.max_interned_ratio * used[k])
+        }
+        for k in unique:
+            values[k] = None
+        columns = cls._columns(values)
+        codes = np.full((len(rows), len(keys) - len(unique)), -1, dtype=np.int32)
+        spans = np.full((len(rows), len(unique), 2), -1, dtype=np.int64)
+        for row, entry in enumerate(rows):
+            for k, code in entry:
+                if k in unique:
+                    start = len(text)
+                    text += json.dumps(unique[k][code]).encode("utf-8")
+                    spans[row, columns[k]] = (start, len(text))
+                else:
+                    codes[row, columns[k]] = code
+        return cls(np.frombuffer(bytes(text), dtype=np.uint8), np.asarray(offsets, dtype=np.int64), list(keys), values, codes, spans)
+
+    @classmethod
+    def of(cls, chunks) -> "ChunkStore":
+        return chunks if isinstance(chunks, cls) else cls.from_documents(chunks)
+
+    def save(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        (directory / "metadata.json").write_text(json.dumps({"keys": self.keys, "values": self.values}))
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "ChunkStore":
+        meta = json.loads((directory / "metadata.json").read_text())
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None) for name in cls.ARRAYS}
+        return cls(keys=meta["keys"], values=meta["values"], **arrays)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self.document(i) for i in range(*row.indices(len(self)))]
+        if row < 0:
+            row += len(self)
+        if not 0 <= row < len(self):
+            raise IndexError(f"chunk {row} out of range")
+        return self.document(row)
+
+    def page_content(self, row: int) -> str:
+        return bytes(self.text[self.offsets[row]:self.offsets[row + 1]]).decode("utf-8")
+
+    def _value(self, row: int, k: int, codes: Optional[list] = None, spans: Optional[list] = None):
+        """Value of key `k` at `row`, or `_ABSENT`; `codes` / `spans` are the row's columns when already read."""
+        table = self.values[k]
+        if table is not None:
+            code = codes[self.columns[k]] if codes is not None else int(self.codes[row, self.columns[k]])
+            return table[code] if code >= 0 else _ABSENT
+        start, end = spans[self.columns[k]] if spans is not None else self.spans[row, self.columns[k]].tolist()
+        return json.loads(bytes(self.text[start:end])) if start >= 0 else _ABSENT
+
+    def metadata(self, row: int) -> dict:
+        codes, spans = self.codes[row].tolist(), self.spans[row].tolist()
+        metadata = {}
+        for k, key in enumerate(self.keys):
+            value = self._value(row, k, codes, spans)
+            if value is not _ABSENT:
+                metadata[key] = value
+        return metadata
+
+    def get(self, row: int, key: str, default=None):
+        k = self.key_index.get(key)
+        if k is None:
+            return default
+        value = self._value(row, k)
+        return default if value is _ABSENT else value
+
+    def document(self, row: int) -> Document:
+        return Document(page_content=self.page_content(row), metadata=self.metadata(row))
+
+    def texts(self) -> List[str]:
+        return [self.page_content(row) for row in range(len(self))]
+
+    def chunk_id(self, row: int) -> str:
+        """Id of a chunk, as `RAG.index_builder.chunk_ids` derives it from the chunk list."""
+        return self.get(row, "chunk_id") or f"{self.get(row, 'doc_id', 'unknown')}::{row}"
+
+    def ids(self) -> List[str]:
+        return [self.chunk_id(row) for row in range(len(self))]
+
+    def rows_by_id(self) -> dict[str, int]:
+        """Chunk id -> row. One entry per chunk, so callers build it only when they map ids back to rows."""
+        return {chunk_id: row for row, chunk_id in enumerate(self.ids())}
+
+    def distinct(self, key: str) -> list:
+        """Values of `key` used by at least one chunk."""
+        k = self.key_index.get(key)
+        if k is None:
+            return []
+        if self.values[k] is None:
+            present = (self._value(row, k) for row in range(len(self)))
+            return list({json.dumps(value, sort_keys=True): value for value in present if value is not _ABSENT}.values())
+        return [self.values[k][code] for code in np.unique(self.codes[:, self.columns[k]]).tolist() if code >= 0]
+
+    def matches(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        """
+        Boolean row mask of `RAG.metadata_filter.matches_filter` (None when unfiltered),
+        computed over the code columns: each value table is scanned once, not each chunk.
+        """
+        if not filter:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        for key, expected in filter.items():
+            mask &= self._key_mask(key, list(expected) if isinstance(expected, (list, tuple, set)) else [expected])
+        return mask
+
+    def matches_where(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """Boolean row mask of a `where` clause (`RAG.metadata_filter.matches_where`), over the code columns."""
+        if not where:
+            return None
+        mask = np.ones(len(self), dtype=bool)
+        if "$and" in where:
+            for clause in where["$and"]:
+                mask &= self.matches_where(clause)
+            return mask
+        for key, expected in where.items():
+            mask &= self._key_mask(key, list(expected["$in"]) if isinstance(expected, dict) and "$in" in expected else [expected])
+        return mask
+
+    def _key_mask(self, key: str, accepted: list) -> np.ndarray:
+        k = self.key_index.get(key)
+        if k is None:
+            # an absent key reads as None
+            return np.full(len(self), None in accepted, dtype=bool)
+        if self.values[k] is None:
+            # unique values: one decode per chunk, like matching the metadata dicts
+            return np.fromiter(
+                ((value is _ABSENT and None in accepted) or (value is not _ABSENT and value in accepted)
+                 for value in (self._value(row, k) for row in range(len(self)))),
+                dtype=bool, count=len(self)
+            )
+        codes = [code for code, value in enumerate(self.values[k]) if value in accepted]
+        if None in accepted:
+            codes.append(-1)
+        return np.isin(self.codes[:, self.columns[k]], codes)
+
+    def without(self, filter: dict, documents: Iterable[Document] = ()) -> "ChunkStore":
+        """A new store without the chunks matching `filter` and with `documents` appended."""
+        drop = self.matches(filter)
+        kept = (self.document(row) for row in range(len(self)) if drop is None or not drop[row])
+        return ChunkStore.from_documents(itertools.chain(kept, documents))
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the arrays plus a rough estimate of the interned value tables."""
+        return sum(getattr(self, name).nbytes for name in self.ARRAYS) + self._tables_bytes
@@ -39,6 +39,11 @@ class DocumentProcessor:
             doc = self._convert_to_doclingDocument()
             md_doc = self._convert_to_md(doc)
             chunked_doc = markdown_splitter.split_text(md_doc)
+            doc_id = Path(self.pdf_file_pth).name
+            for idx, chunk in enumerate(chunked_doc):
+                chunk.metadata["source"] = doc_id
+                chunk.metadata["doc_id"] = doc_id
+                chunk.metadata["chunk_id"] = f"{doc_id}::{idx}"
             print(f"\n👌 Split into {len(chunked_doc)} chunks")
             print(f"\nThese are the chunked doc: {type(chunked_doc[0])}")
             return chunked_doc
@@ -0,0 +1,139 @@
+import json
+import heapq
+import logging
+from collections import OrderedDict
+from functools import cached_property
+from typing import List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from RAG.chunk_store import ChunkStore
+from RAG.index_snapshot import IndexSnapshot
+from RAG.lexical_index import LexicalIndex
+from RAG.term_index import TermIndex
+from RAG.metadata_filter import to_chroma_where
+
+logger = logging.getLogger(__name__)
+
+class HybridSearch:
+    """
+    BM25 + dense search over one version of a collection, keyed by row (position in its `ChunkStore`).
+    Both legs return row ids only; Reciprocal Rank Fusion runs over those ids and
+    `Document` objects are materialized for the fused top-n survivors alone.
+    Built once per index version (see `IndexCollection.search_engine`), so the BM25
+    postings are no longer rebuilt for every query. BM25 queries are expanded with the
+    acronyms and term variants of the version's `TermIndex`.
+    """
+    max_cached_filters = 64
+
+    def __init__(self, vectorstore, chunked_doc: List[Document], previous: Optional["HybridSearch"] = None):
+        self.vectorstore = vectorstore
+        self.chunks = chunked_doc
+        self.store = ChunkStore.of(chunked_doc)
+        if isinstance(vectorstore, IndexSnapshot):
+            # rows of a snapshot are its chunk store; its postings are already on disk
+            self.lexical = vectorstore.lexical
+            self.terms = vectorstore.terms
+        else:
+            self.lexical = LexicalIndex.build(self.store.texts())
+            # documents unchanged since the previous version are not re-scanned
+            self.terms = TermIndex.build(self.store, previous.terms if previous is not None else None)
+        self._masks: "OrderedDict[str, Optional[np.ndarray]]" = OrderedDict()
+        self._warned_unmapped = False
+
+    @cached_property
+    def row_of(self) -> dict[str, int]:
+        # only the Chroma dense leg returns chunk ids; snapshot search returns rows directly
+        return self.store.rows_by_id()
+
+    def allowed(self, filter: Optional[dict]) -> Optional[np.ndarray]:
+        """Boolean row mask of the chunks matching `filter` (None when unfiltered), cached per filter."""
+        if not filter:
+            return None
+        key = json.dumps(filter, sort_keys=True, default=str)
+        if key in self._masks:
+            self._masks.move_to_end(key)
+            return self._masks[key]
+        mask = self.store.matches(filter)
+        self._masks[key] = mask
+        while len(self._masks) > self.max_cached_filters:
+            self._masks.popitem(last=False)
+        return mask
+
+    def expand(self, query: str, filter: Optional[dict] = None) -> str:
+        """BM25 query with the term expansions of the documents `filter` selects (all when it names none)."""
+        doc_ids = (filter or {}).get("doc_id")
+        if doc_ids is not None:
+            doc_ids = set(doc_ids) if isinstance(doc_ids, (list, tuple, set)) else {doc_ids}
+        return self.terms.expand(query, doc_ids)
+
+    def lexical_rows(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> List[int]:
+        return [row for row, _ in self.lexical.search(query, k, allowed)]
+
+    def dense_rows(self, query_embedding: List[float], k: int, filter: Optional[dict] = None, allowed: Optional[np.ndarray] = None) -> List[int]:
+        k = min(k, len(self.store))
+        if k <= 0:
+            return []
+        if isinstance(self.vectorstore, IndexSnapshot):
+            return [row for row, _ in self.vectorstore.dense_search(query_embedding, k, allowed)]
+        # ids only: no documents, metadatas or distances are fetched from Chroma
+        result = self.vectorstore._collection.query(
+            query_embeddings=[query_embedding], n_results=k, where=to_chroma_where(filter), include=[]
+        )
+        rows = [self.row_of[chunk_id] for chunk_id in result["ids"][0] if chunk_id in self.row_of]
+        unmapped = len(result["ids"][0]) - len(rows)
+        if unmapped and not self._warned_unmapped:
+            self._warned_unmapped = True
+            logger.warning(
+                f"{unmapped} of {len(result['ids'][0])} vector hits have ids missing from the chunk store; "
+                "the dense leg is dropping them (was the collection written with other ids?)"
+            )
+        return rows
+
+    @staticmethod
+    def fuse(rankings: List[List[int]], k: int = 60, top_n: int = 10) -> List[int]:
+        """Reciprocal Rank Fusion over row ids; ties keep first-seen order like `Retrievers.rrf_fusion`."""
+        scores: dict[int, float] = {}
+        for rows in rankings:
+            for rank, row in enumerate(rows, 1):
+                scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank)
+        return heapq.nlargest(top_n, scores, key=scores.get)
+
+    def materialize(self, rows: List[int]) -> List[Document]:
+        # fresh objects, like a Chroma query: later stages annotate metadata in place
+        return [
+            Document(id=self.store.chunk_id(row), page_content=self.store.page_content(row), metadata=self.store.metadata(row))
+            for row in rows
+        ]
+
+    def search(
+            self,
+            query: str,
+            query_embedding: Optional[List[float]] = None,
+            filter: Optional[dict] = None,
+            lexical: bool = True,
+            dense: bool = True,
+            bm25_k: int = 10,
+            vector_k: int = 10,
+            rrf_k: int = 60,
+            top_n: int = 8,
+            expand_terms: bool = True
+    ) -> List[Document]:
+        """Fused top-n chunks for `query`; `filter` scopes both legs like `Retrievers.build_retriever`."""
+        if not len(self.store):
+            return []
+        allowed = self.allowed(filter)
+        if allowed is not None and not allowed.any():
+            logger.warning(f"No chunk matches filter {filter}, searching the whole corpus")
+            filter, allowed = None, None
+
+        rankings = []
+        if lexical:
+            lexical_query = self.expand(query, filter) if expand_terms else query
+            rankings.append(self.lexical_rows(lexical_query, bm25_k, allowed))
+        if dense:
+            if query_embedding is None:
+                query_embedding = self.vectorstore.embeddings.embed_query(query)
+            rankings.append(self.dense_rows(query_embedding, vector_k, filter, allowed))
+        # a single leg keeps its own ranking
+        rows = self.fuse(rankings, k=rrf_k, top_n=top_n) if len(rankings) > 1 else rankings[0][:top_n]
+        return self.materialize(rows)
@@ -0,0 +1,72 @@
+"""
+Recall@k vs latency benchmark of the HNSW index against exact (brute-force) search.
+
+Queries are stored chunk embeddings with a little gaussian noise, so no extra
+embedding API calls are needed once the index exists.
+
+    python -m RAG.index_benchmark
+"""
+import time
+import numpy as np
+from RAG.index_manager import GlobalIndexManager, INDEX_CONFIG
+from utils.utils import config
+
+HEADERS_TO_SPLIT_ON = config["retriever"]["headers_to_split_on"]
+FILE_PTH = config["retriever"]["file_pth"]
+EF_SEARCH_SWEEP = [10, 32, 64, 128, 256]
+
+def exact_search(matrix: np.ndarray, query: np.ndarray, k: int, space: str) -> np.ndarray:
+    if space == "cosine":
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        scores = -(matrix @ query) / np.maximum(norms, 1e-12)
+    elif space == "ip":
+        scores = -(matrix @ query)
+    else:
+        scores = np.sum((matrix - query) ** 2, axis=1)
+    top = np.argpartition(scores, min(k, len(scores) - 1))[:k]
+    return top[np.argsort(scores[top])]
+
+def run_benchmark(num_queries: int = 100, k: int = 10, noise: float = 0.01, seed: int = 0):
+    vectorstore, _ = GlobalIndexManager.get_vectorstore(
+        headers_to_split_on=HEADERS_TO_SPLIT_ON,
+        file_pth=FILE_PTH
+    )
+    collection = vectorstore._collection
+    stored = collection.get(include=["embeddings"])
+    ids = np.array(stored["ids"])
+    matrix = np.asarray(stored["embeddings"], dtype=np.float32)
+    space = INDEX_CONFIG.get("hnsw", {}).get("space", "l2")
+    k = min(k, len(ids))
+
+    rng = np.random.default_rng(seed)
+    picks = rng.choice(len(ids), size=min(num_queries, len(ids)), replace=False)
+    queries = matrix[picks] + rng.normal(0, noise, size=(len(picks), matrix.shape[1])).astype(np.float32)
+
+    start = time.perf_counter()
+    truth = [set(ids[exact_search(matrix, q, k, space)]) for q in queries]
+    exact_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    print(f"\n📏 Exact search over {len(ids)} vectors: {exact_ms:.2f} ms/query")
+
+    results = []
+    for ef_search in EF_SEARCH_SWEEP:
+        collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+        latencies, hits = [], 0
+        for q, relevant in zip(queries, truth):
+            start = time.perf_counter()
+            found = collection.query(query_embeddings=[q.tolist()], n_results=k, include=[])["ids"][0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += len(relevant.intersection(found))
+        recall = hits / (k * len(queries))
+        p50, p95 = np.percentile(latencies, [50, 95])
+        results.append({"ef_search": ef_search, "recall": recall, "p50_ms": p50, "p95_ms": p95})
+        print(f"⚡ ef_search={ef_search:<4} recall@{k}={recall:.3f}  p50={p50:.2f} ms  p95={p95:.2f} ms")
+
+    # restore the configured value
+    collection.modify(configuration={"hnsw": {"ef_search": INDEX_CONFIG.get("hnsw", {}).get("ef_search", 64)}})
+    return results
+
+def main():
+    run_benchmark()
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,119 @@
-import os
-from typing import List
-from langchain_openai import OpenAIEmbeddings
+from typing import List, Optional
+from langchain_core.documents import Document
+from utils.client_registry import ClientRegistry
 import logging
 from langchain_chroma import Chroma
 logger = logging.getLogger(__name__)
 
+def chunk_ids(chunked_doc: List[Document]) -> List[str]:
+    """Stable ids (`<doc_id>::<position>`) so chunks of one document can be replaced or deleted."""
+    return [
+        doc.metadata.get("chunk_id") or f"{doc.metadata.get('doc_id', 'unknown')}::{idx}"
+        for idx, doc in enumerate(chunked_doc)
+    ]
+
 class IndexBuilder:
     """
-    Builds a vector-based
+    Builds a vector-based HNSW index (Chroma) over the chunked documents
     """
-    def __init__(self, chunked_doc: List[str], collection_name: str, persist_directory: str, load_documents: bool):
+    def __init__(
+            self,
+            chunked_doc: List[str],
+            collection_name: str,
+            persist_directory: str,
+            load_documents: bool,
+            hnsw_params: Optional[dict] = None,
+            embedding_model: str = "text-embedding-3-small"
+    ):
         self.chunked_doc = chunked_doc
         self.collection_name = collection_name
         self.persist_directory = persist_directory
         self.load_documents = load_documents
+        self.hnsw_params = hnsw_params or {}
+        self.embedding_model = embedding_model
+
+    def _collection_configuration(self) -> Optional[dict]:
+        if not self.hnsw_params:
+            return None
+        return {"hnsw": dict(self.hnsw_params)}
 
     def build_vectorstore(self):
         """
-        Initializes the Chroma vectorstore with the provided documents and embeddings
+        Opens the Chroma collection, indexing the provided documents if the collection is empty
         """
-        embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
+        embeddings = ClientRegistry.get_embeddings(self.embedding_model)
         try:
             logger.info("Building VectorStore")
-            if not os.path.exists(self.persist_directory):
-                logger.info("🧠 Detect persist_directory not exist...CREATING...")
+            # several named collections share one persist_directory, so look at the collection itself
+            self.vectorstore = Chroma(
+                persist_directory=self.persist_directory,
+                collection_name=self.collection_name,
+                embedding_function=embeddings,
+                collection_configuration=self._collection_configuration()
+            )
+            if self.chunked_doc and self.vectorstore._collection.count() == 0:
+                logger.info(f"🧠 Collection {self.collection_name} is empty...CREATING...")
                 self.vectorstore = Chroma.from_documents(
                     documents=self.chunked_doc,
+                    ids=chunk_ids(self.chunked_doc),
                     collection_name=self.collection_name,
                     embedding=embeddings,
-                    persist_directory=self.persist_directory
-                )
-            else:
-                logger.info("📦 Detect persisten_directory exist...LOADING...")
-                self.vectorstore = Chroma(
                     persist_directory=self.persist_directory,
-                    collection_name=self.collection_name,
-                    embedding_function=embeddings
+                    collection_configuration=self._collection_configuration()
                 )
+            else:
+                logger.info(f"📦 Collection {self.collection_name} exists...LOADING...")
+                self.tune_search(self.hnsw_params.get("ef_search"))
             logger.info("🔥 Vectorstore built/load successfully.")
             return self.vectorstore
         except Exception as e:
             logger.error(f"Error building vectorstore: {e}")
             raise RuntimeError(f"Error building vectorsrore: {e}")
-            
-        
\ No newline at end of file
+
+    def stored_documents(self) -> List[Document]:
+        """
+        Chunks persisted in the collection, so it can be reloaded without parsing its PDFs again.
+        Each carries its Chroma id (`Document.id`): collections written before chunk ids were stable use random UUIDs.
+        """
+        stored = self.vectorstore.get(include=["documents", "metadatas"])
+        return [
+            Document(id=chunk_id, page_content=text, metadata=metadata or {})
+            for chunk_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+        ]
+
+    def tune_search(self, ef_search: Optional[int]):
+        """
+        Re-tunes the query-time recall/latency trade-off of an existing HNSW index.
+        Build-time parameters (space, ef_construction, max_neighbors) cannot change
+        after the collection has been created.
+        """
+        if ef_search is None:
+            return
+        try:
+            self.vectorstore._collection.modify(configuration={"hnsw": {"ef_search": ef_search}})
+            logger.info(f"🎛️ HNSW ef_search set to {ef_search}")
+        except Exception as e:
+            logger.warning(f"Could not update ef_search on collection {self.collection_name}: {e}")
+
+    def add_documents(self, chunked_doc: List[Document]) -> List[str]:
+        """
+        Incrementally inserts the chunks of one uploaded document.
+        Existing chunks of the same document are replaced.
+        """
+        doc_ids = {doc.metadata.get("doc_id") for doc in chunked_doc}
+        for doc_id in doc_ids:
+            self.delete_documents(doc_id)
+        ids = chunk_ids(chunked_doc)
+        self.vectorstore.add_documents(documents=chunked_doc, ids=ids)
+        logger.info(f"➕ Inserted {len(ids)} chunks into {self.collection_name}")
+        return ids
+
+    def delete_documents(self, doc_id: str) -> int:
+        """
+        Removes every chunk of a document from the index
+        """
+        ids = self.vectorstore.get(where={"doc_id": doc_id}, include=[])["ids"]
+        if ids:
+            self.vectorstore.delete(ids=ids)
+        logger.info(f"➖ Deleted {len(ids)} chunks of {doc_id} from {self.collection_name}")
+        return len(ids)
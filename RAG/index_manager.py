@@ -1,26 +1,450 @@
-from RAG.document_processor import DocumentProcessor
+import os
+import re
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
 from RAG.index_builder import IndexBuilder
+from RAG.chunk_store import ChunkStore
+from utils.utils import config
+
+INDEX_CONFIG = config.get("index", {})
+SERVING_CONFIG = config.get("serving", {})
+COLLECTIONS_CONFIG = config.get("collections", {})
+DEFAULT_COLLECTION = INDEX_CONFIG.get("collection_name", "test")
+# Chroma's rule for collection names (they also name the snapshot directories)
+COLLECTION_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]{1,61}[A-Za-z0-9]")
+
+class IndexCollection:
+    """
+    One named corpus (per tenant / project): its Chroma collection or snapshot series,
+    the chunks BM25 runs over (a `ChunkStore`), and its version. Loaded on first use and unloaded
+    again by `GlobalIndexManager` under its memory budget; the version survives unloading.
+    """
+    def __init__(
+            self,
+            name: str,
+            sources: Optional[list[str]],
+            persist_directory: str,
+            collection_name: str,
+            snapshot_root: Path
+    ):
+        self.name = name
+        self._sources = sources
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.snapshot_root = snapshot_root
+        # (vectorstore, chunked_doc), swapped as one reference so readers never see half an update
+        self.index = None
+        self.index_builder = None
+        self.snapshots = None
+        # HybridSearch over the served (vectorstore, chunked_doc); rebuilt when either is swapped
+        self.search = None
+        self.version = 0
+        self.lock = threading.Lock()
+        self.ready_task: "asyncio.Task | None" = None
+        self.status = {"state": "cold", "error": None, "build_seconds": None}
+        self.last_used = 0.0
+
+    def sources(self, file_pth: Optional[str] = None) -> list[str]:
+        """PDFs indexed when the collection is first built; the default collection falls back to `file_pth`."""
+        if self._sources is not None:
+            return list(self._sources)
+        return [file_pth or config["retriever"]["file_pth"]]
+
+    def snapshot_series(self):
+        if self.snapshots is None:
+            from RAG.index_snapshot import IndexSnapshots
+            self.snapshots = IndexSnapshots(self.snapshot_root)
+        return self.snapshots
+
+    def chunks(self) -> Optional[ChunkStore]:
+        if self.snapshots is not None:
+            snapshot = self.snapshots.loaded()
+            return snapshot.chunks if snapshot is not None else None
+        return self.index[1] if self.index is not None else None
+
+    def search_engine(self, vectorstore, chunked_doc):
+        def current(engine):
+            return engine is not None and engine.vectorstore is vectorstore and engine.chunks is chunked_doc
+
+        engine = self.search
+        if current(engine):
+            return engine
+        # single flight: concurrent cold queries wait for one build instead of each indexing the corpus
+        with self.lock:
+            engine = self.search
+            if not current(engine):
+                from RAG.hybrid_search import HybridSearch
+                engine = self.search = HybridSearch(vectorstore, chunked_doc, previous=engine)
+        return engine
+
+    @property
+    def loaded(self) -> bool:
+        return self.chunks() is not None
+
+    def memory_bytes(self) -> int:
+        """Rough resident size: chunk store plus vectors (and BM25 postings built in memory)."""
+        chunks = self.chunks()
+        if chunks is None:
+            return 0
+        store = chunks.nbytes
+        snapshot = self.snapshots.loaded() if self.snapshots is not None else None
+        vectors = snapshot.vectors.nbytes if snapshot is not None else len(chunks) * 4 * COLLECTIONS_CONFIG.get("embedding_dimensions", 1536)
+        postings = 0
+        if self.search is not None and snapshot is None:
+            postings = sum(getattr(self.search.lexical, name).nbytes for name in self.search.lexical.ARRAYS)
+        return store + vectors + postings
+
+    def unload(self):
+        # no lock: it runs while another collection's build holds its own, and in-flight
+        # requests keep the objects they already fetched
+        self.index = None
+        self.index_builder = None
+        self.search = None
+        if self.snapshots is not None:
+            self.snapshots.close()
+        self.ready_task = None
+        self.status.update(state="cold", build_seconds=None)
 
 class GlobalIndexManager:
-    _vectorstore = None
-    _chunked_doc = None
+    """
+    Process-wide registry of named index collections; `collection=None` is `index.collection_name`.
+    `serving.mode: local` builds and mutates Chroma collections (all in `index.persist_directory`) in this process;
+    `serving.mode: snapshot` serves the shared, read-only snapshots of `RAG.index_snapshot`
+    (`<snapshot_dir>/<collection>`, memory-mapped by every uvicorn worker) and ingests by publishing a new version.
+    Collections load lazily; past `collections.max_loaded` or `collections.max_memory_mb` the least
+    recently used ones are unloaded, and ones idle for `collections.idle_seconds` are unloaded too.
+    The first load of a collection is single-flight: threads wait on its lock, coroutines await one shared
+    `ensure_ready` task, and its progress is reported by `status()` (served on /health).
+    """
+    _collections: "OrderedDict[str, IndexCollection]" = OrderedDict()  # least recently used first
+    _registry_lock = threading.Lock()
+
+    mode = SERVING_CONFIG.get("mode", "local")
+    max_loaded = COLLECTIONS_CONFIG.get("max_loaded", 4)
+    max_memory_bytes = int(COLLECTIONS_CONFIG.get("max_memory_mb", 2048) * 2 ** 20)
+    idle_seconds = COLLECTIONS_CONFIG.get("idle_seconds", 0)
+
+    @classmethod
+    def snapshot_mode(cls) -> bool:
+        return cls.mode == "snapshot"
+
+    @staticmethod
+    def split_pdf(headers_to_split_on, file_pth=None):
+        from RAG.document_processor import DocumentProcessor
+        if file_pth is None:
+            doc_processor = DocumentProcessor(headers_to_split_on=headers_to_split_on)
+        else:
+            doc_processor = DocumentProcessor(headers_to_split_on=headers_to_split_on, pdf_file_pth=file_pth)
+        return doc_processor.process_split()
+
+    @classmethod
+    def _split_sources(cls, headers_to_split_on, sources: list[str]):
+        return [chunk for source in sources for chunk in cls.split_pdf(headers_to_split_on, source)]
+
+    @staticmethod
+    def check_name(name: str) -> str:
+        if not COLLECTION_NAME.fullmatch(name):
+            raise ValueError(f"Invalid collection name {name!r}: 3-63 letters, digits, '_' or '-'")
+        return name
+
+    @classmethod
+    def collection(cls, name: Optional[str] = None) -> IndexCollection:
+        """The collection called `name`, registered (not loaded) on first reference."""
+        name = name or DEFAULT_COLLECTION
+        coll = cls._collections.get(name)
+        if coll is not None:
+            return coll
+        cls.check_name(name)
+        with cls._registry_lock:
+            if name not in cls._collections:
+                configured = COLLECTIONS_CONFIG.get("sources", {}).get(name)
+                cls._collections[name] = IndexCollection(
+                    name=name,
+                    # only the default collection falls back to retriever.file_pth; a new tenant starts empty
+                    sources=configured if configured is not None else (None if name == DEFAULT_COLLECTION else []),
+                    persist_directory=INDEX_CONFIG.get("persist_directory", "./RAG"),
+                    collection_name=name,
+                    snapshot_root=Path(SERVING_CONFIG.get("snapshot_dir", "./RAG/snapshots")) / name
+                )
+            return cls._collections[name]
+
+    @classmethod
+    def list_collections(cls) -> list[str]:
+        """Collections that can be queried: default, configured, persisted and registered in this process."""
+        names = {DEFAULT_COLLECTION, *COLLECTIONS_CONFIG.get("sources", {}), *cls._collections}
+        if cls.snapshot_mode():
+            root = Path(SERVING_CONFIG.get("snapshot_dir", "./RAG/snapshots"))
+            names.update(p.parent.name for p in root.glob("*/CURRENT"))
+        else:
+            persist_directory = INDEX_CONFIG.get("persist_directory", "./RAG")
+            if os.path.exists(persist_directory):
+                import chromadb
+                names.update(c.name for c in chromadb.PersistentClient(path=persist_directory).list_collections())
+        return sorted(names)
+
+    @classmethod
+    def _touch(cls, name: Optional[str]) -> IndexCollection:
+        coll = cls.collection(name)
+        now = time.monotonic()
+        coll.last_used = now
+        with cls._registry_lock:
+            cls._collections.move_to_end(coll.name)
+            idle = [
+                c for c in cls._collections.values()
+                if cls.idle_seconds and c is not coll and c.loaded and now - c.last_used > cls.idle_seconds
+            ]
+        for c in idle:
+            print(f"💤 Unloading collection {c.name} (idle for {now - c.last_used:.0f}s)")
+            c.unload()
+        return coll
+
+    @classmethod
+    def _enforce_budget(cls, keep: IndexCollection):
+        """Unloads least recently used collections until the loaded ones fit max_loaded / max_memory_mb."""
+        with cls._registry_lock:
+            loaded = {c: c.memory_bytes() for c in cls._collections.values() if c.loaded}
+        total = sum(loaded.values())
+        for coll, size in list(loaded.items()):
+            if len(loaded) <= cls.max_loaded and total <= cls.max_memory_bytes:
+                break
+            if coll is keep:
+                continue
+            print(f"🧹 Unloading collection {coll.name} ({size / 2 ** 20:.1f} MiB) to stay within the index memory budget")
+            coll.unload()
+            del loaded[coll]
+            total -= size
+
+    @classmethod
+    def get_vectorstore(cls, headers_to_split_on, file_pth=None, collection: Optional[str] = None):
+        coll = cls._touch(collection)
+        if cls.snapshot_mode():
+            snapshots = coll.snapshot_series()
+            open_snapshot = lambda: snapshots.get(
+                lambda: cls._split_sources(headers_to_split_on, coll.sources(file_pth))
+            )
+            # IndexSnapshots.get is single-flight itself (thread lock + builder flock)
+            snapshot = open_snapshot() if snapshots.loaded() is not None else cls._initialize(coll, open_snapshot)
+            return snapshot, snapshot.chunks
+
+        index = coll.index
+        if index is not None:
+            return index
+
+        # retrieval also runs in worker threads (speculative retrieval); build only once
+        with coll.lock:
+            if coll.index is not None:
+                return coll.index
+            return cls._initialize(coll, lambda: cls._build(coll, headers_to_split_on, file_pth))
+
+    @classmethod
+    def _initialize(cls, coll: IndexCollection, load):
+        """Runs the first (expensive) load of a collection and records its progress for `status()`."""
+        coll.status.update(state="building", error=None)
+        start = time.perf_counter()
+        try:
+            result = load()
+        except Exception as e:
+            coll.status.update(state="failed", error=str(e))
+            raise
+        coll.status.update(state="ready", build_seconds=round(time.perf_counter() - start, 3))
+        cls._enforce_budget(keep=coll)
+        return result
+
+    @classmethod
+    def _build(cls, coll: IndexCollection, headers_to_split_on, file_pth):
+        index_builder = cls._new_index_builder([], persist_directory=coll.persist_directory, collection_name=coll.collection_name)
+        vectorstore = index_builder.build_vectorstore()
+        # a persisted collection reloads its chunks from Chroma instead of re-parsing the PDFs
+        stored = index_builder.stored_documents()
+        # rows keep their Chroma ids, so the dense leg of HybridSearch can map its hits back to them
+        chunked_doc = ChunkStore.from_documents(stored, ids=[doc.id for doc in stored])
+        if chunked_doc:
+            print(f"📦 Loaded collection {coll.name}: {len(chunked_doc)} chunks")
+        elif coll.sources(file_pth):
+            print(f"🧠 Building collection {coll.name} (first time only)...")
+            index_builder.chunked_doc = cls._split_sources(headers_to_split_on, coll.sources(file_pth))
+            vectorstore = index_builder.build_vectorstore()
+            chunked_doc = ChunkStore.from_documents(index_builder.chunked_doc)
+            index_builder.chunked_doc = []
+        coll.index_builder = index_builder
+        coll.index = (vectorstore, chunked_doc)
+        return coll.index
+
+    @classmethod
+    async def ensure_ready(cls, headers_to_split_on, file_pth=None, collection: Optional[str] = None):
+        """
+        Loads a collection off the event loop. Concurrent callers await the same build task
+        (shielded, so one cancelled request does not abort it); a failed build is retried by the next caller.
+        """
+        coll = cls.collection(collection)
+        if coll.status["state"] == "ready" and coll.loaded:
+            return
+        task = coll.ready_task
+        if (
+            task is None
+            or task.get_loop() is not asyncio.get_running_loop()
+            or (task.done() and (task.cancelled() or task.exception() is not None))
+        ):
+            task = coll.ready_task = asyncio.create_task(
+                asyncio.to_thread(cls.get_vectorstore, headers_to_split_on, file_pth, coll.name)
+            )
+        await asyncio.shield(task)
+
+    @classmethod
+    def status(cls, collection: Optional[str] = None) -> dict:
+        coll = cls.collection(collection)
+        return {
+            **coll.status,
+            "ready": coll.status["state"] == "ready",
+            "collection": coll.name,
+            "mode": cls.mode,
+            "index_version": cls.index_version(coll.name),
+            "documents": len(cls.list_documents(coll.name)),
+        }
+
+    @classmethod
+    def collections_status(cls) -> dict:
+        """Registered collections with their load state and estimated size, least recently used first."""
+        with cls._registry_lock:
+            collections = list(cls._collections.values())
+        return {
+            c.name: {"state": c.status["state"], "loaded": c.loaded, "memory_mib": round(c.memory_bytes() / 2 ** 20, 1)}
+            for c in collections
+        }
 
     @classmethod
-    def get_vectorstore(cls, headers_to_split_on, file_pth):
-        if cls._vectorstore is not None:
-            return cls._vectorstore, cls._chunked_doc
+    def load_chunks(
+            cls,
+            chunked_doc,
+            persist_directory: str,
+            collection_name: str = "benchmark",
+            collection: Optional[str] = None
+    ):
+        """Serves an already-chunked corpus (e.g. a synthetic benchmark corpus) as `collection` instead of its PDFs."""
+        name = collection or DEFAULT_COLLECTION
+        coll = IndexCollection(
+            name=name,
+            sources=[],
+            persist_directory=persist_directory,
+            collection_name=collection_name,
+            snapshot_root=Path(persist_directory) / "snapshots" / name
+        )
+        with cls._registry_lock:
+            previous = cls._collections.pop(name, None)
+            coll.version = previous.version + 1 if previous is not None else 1
+            cls._collections[name] = coll
+        chunked_doc = list(chunked_doc)
+        if cls.snapshot_mode():
+            snapshot = cls._initialize(coll, lambda: coll.snapshot_series().publish(lambda _: chunked_doc))
+            return snapshot, snapshot.chunks
 
-        print("🧠 Building vectorstore (first time only)...")
+        def load():
+            coll.index_builder = cls._new_index_builder(
+                chunked_doc, persist_directory=persist_directory, collection_name=collection_name
+            )
+            coll.index = (coll.index_builder.build_vectorstore(), ChunkStore.from_documents(chunked_doc))
+            coll.index_builder.chunked_doc = []
+            return coll.index
 
-        doc_processor = DocumentProcessor(headers_to_split_on=headers_to_split_on)
-        cls._chunked_doc = doc_processor.process_split()
+        with coll.lock:
+            return cls._initialize(coll, load)
 
-        index_builder = IndexBuilder(
-            chunked_doc=cls._chunked_doc,
-            collection_name="test",
-            persist_directory="./RAG",
-            load_documents=True
+    @staticmethod
+    def _new_index_builder(chunked_doc, persist_directory: str = None, collection_name: str = None):
+        return IndexBuilder(
+            chunked_doc=chunked_doc,
+            collection_name=collection_name or DEFAULT_COLLECTION,
+            persist_directory=persist_directory or INDEX_CONFIG.get("persist_directory", "./RAG"),
+            load_documents=True,
+            hnsw_params=INDEX_CONFIG.get("hnsw"),
+            embedding_model=INDEX_CONFIG.get("embedding_model", "text-embedding-3-small")
         )
 
-        cls._vectorstore = index_builder.build_vectorstore()
-        return cls._vectorstore, cls._chunked_doc
+    @classmethod
+    def add_document(cls, headers_to_split_on, file_pth, collection: Optional[str] = None):
+        """Incrementally index an uploaded PDF without rebuilding the collection."""
+        coll = cls._touch(collection)
+        # make sure the collection's own sources are indexed before the upload joins them
+        cls.get_vectorstore(headers_to_split_on=headers_to_split_on, collection=coll.name)
+        new_chunks = cls.split_pdf(headers_to_split_on, file_pth)
+        doc_id = new_chunks[0].metadata["doc_id"]
+        if cls.snapshot_mode():
+            # only the new chunks are embedded; every other vector is copied from the previous version
+            coll.snapshot_series().publish(
+                lambda chunks: ChunkStore.of(chunks).without({"doc_id": doc_id}, new_chunks)
+            )
+        else:
+            with coll.lock:
+                if coll.index is None:  # unloaded meanwhile
+                    cls._initialize(coll, lambda: cls._build(coll, headers_to_split_on, None))
+                vectorstore, chunked_doc = coll.index
+                coll.index_builder.add_documents(new_chunks)
+                coll.index = (vectorstore, chunked_doc.without({"doc_id": doc_id}, new_chunks))
+                coll.version += 1
+        print(f"📥 Indexed {len(new_chunks)} chunks from {doc_id} into {coll.name}")
+        return len(new_chunks)
+
+    @classmethod
+    def remove_document(cls, doc_id: str, collection: Optional[str] = None):
+        """Drop every chunk of a document from the vector index and the BM25 corpus."""
+        coll = cls.collection(collection)
+        if cls.snapshot_mode():
+            return cls._remove_from_snapshot(coll, doc_id)
+        with coll.lock:
+            if coll.index is None:
+                # Not loaded in this process: delete straight from the persisted collection
+                if not os.path.exists(coll.persist_directory):
+                    return 0
+                index_builder = cls._new_index_builder([], persist_directory=coll.persist_directory, collection_name=coll.collection_name)
+                index_builder.build_vectorstore()
+                removed = index_builder.delete_documents(doc_id)
+            else:
+                removed = coll.index_builder.delete_documents(doc_id)
+                vectorstore, chunked_doc = coll.index
+                coll.index = (vectorstore, chunked_doc.without({"doc_id": doc_id}))
+            coll.version += 1
+        return removed
+
+    @staticmethod
+    def _remove_from_snapshot(coll: IndexCollection, doc_id: str) -> int:
+        snapshots = coll.snapshot_series()
+        if not snapshots.exists():
+            return 0
+        removed = 0
+
+        def without_document(chunks):
+            nonlocal removed
+            kept = ChunkStore.of(chunks).without({"doc_id": doc_id})
+            removed = len(chunks) - len(kept)
+            return kept
+
+        snapshots.publish(without_document)
+        return removed
+
+    @classmethod
+    def search_engine(cls, vectorstore, chunked_doc, collection: Optional[str] = None):
+        """The collection's `HybridSearch` for the index returned by `get_vectorstore`, built once per version."""
+        return cls.collection(collection).search_engine(vectorstore, chunked_doc)
+
+    @classmethod
+    def index_version(cls, collection: Optional[str] = None) -> int:
+        coll = cls.collection(collection)
+        if cls.snapshot_mode():
+            # shared across workers, so caches keyed on it drop entries after any worker's ingestion
+            return coll.snapshot_series().version()
+        return coll.version
+
+    @classmethod
+    def list_documents(cls, collection: Optional[str] = None) -> list[str]:
+        """doc_ids currently searchable in a collection (empty until it is loaded in this process)."""
+        coll = cls.collection(collection)
+        if cls.snapshot_mode():
+            coll.snapshot_series().version()  # picks up a newer snapshot
+        chunked_doc = coll.chunks()
+        if chunked_doc is None:
+            return []
+        return sorted(d for d in chunked_doc.distinct("doc_id") if d)
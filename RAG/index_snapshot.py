@@ -0,0 +1,360 @@
+"""
+Immutable, versioned index snapshots for multi-process serving.
+
+A snapshot directory (`<snapshot_dir>/v000042/`) holds everything retrieval needs:
+
+    manifest.json   version, embedding model, chunk count, dimension
+    vectors.npy     L2-normalised float32 chunk embeddings (opened memory-mapped)
+    chunks/         chunk texts and metadata, row-aligned with the vectors (`RAG.chunk_store`, memory-mapped)
+    lexical/        BM25 postings (`RAG.lexical_index`, memory-mapped)
+    terms.json      acronyms and term variants per document (`RAG.term_index`)
+
+One builder at a time (serialised by an flock on `<snapshot_dir>/.lock`) writes a new
+version into a staging directory, renames it into place and swaps the `CURRENT` pointer
+with `os.replace`. Worker processes only ever read: they map the version named by
+`CURRENT`, notice a newer one within `refresh_interval` seconds and switch to it, so
+every uvicorn worker shares the vectors through the page cache instead of holding its
+own copy of the index.
+
+    python -m RAG.index_snapshot build                  # snapshot the configured PDFs
+    python -m RAG.index_snapshot add paper.pdf          # publish a new version with one more document
+    python -m RAG.index_snapshot status --collection X  # each collection has its own <snapshot_dir>/<name>
+"""
+import os
+import json
+import time
+import shutil
+import fcntl
+import argparse
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import cached_property
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+from RAG.index_builder import chunk_ids
+from RAG.chunk_store import ChunkStore
+from RAG.lexical_index import LexicalIndex
+from RAG.term_index import TermIndex
+from utils.client_registry import ClientRegistry
+from utils.utils import config
+
+logger = logging.getLogger(__name__)
+
+SERVING_CONFIG = config.get("serving", {})
+INDEX_CONFIG = config.get("index", {})
+
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+SNAPSHOT_FORMAT = 3
+
+@contextmanager
+def builder_lock(root: Path):
+    """Exclusive across processes: only one builder writes a version at a time."""
+    root.mkdir(parents=True, exist_ok=True)
+    with open(root / LOCK_FILE, "w") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+def current_name(root: Path) -> Optional[str]:
+    try:
+        return (root / CURRENT_FILE).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+def _versions(root: Path) -> list[str]:
+    return sorted(p.name for p in root.glob("v*") if p.is_dir())
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return (vectors / np.maximum(norms, 1e-12)).astype(np.float32)
+
+class IndexSnapshot(VectorStore):
+    """Read-only view of one snapshot version; usable wherever the Chroma vectorstore is."""
+    max_cached_filters = 64
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.name = path.name
+        manifest = json.loads((path / "manifest.json").read_text())
+        if manifest["format"] != SNAPSHOT_FORMAT:
+            raise RuntimeError(f"Unsupported index snapshot format {manifest['format']} in {path}")
+        self.version = manifest["version"]
+        self.embedding_model = manifest["embedding_model"]
+        self.vectors = np.load(path / "vectors.npy", mmap_mode="r")
+        self.chunks = ChunkStore.load(path / "chunks")
+        self.lexical = LexicalIndex.load(path / "lexical")
+        self.terms = TermIndex.load(path / "terms.json")
+        self._masks: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._masks_lock = threading.Lock()
+
+    @cached_property
+    def row_of(self) -> dict[str, int]:
+        # only `write_snapshot` maps chunk ids back to rows; readers never pay for the dict
+        return self.chunks.rows_by_id()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return ClientRegistry.get_embeddings(self.embedding_model)
+
+    def allowed(self, where: Optional[dict]) -> Optional[np.ndarray]:
+        """Boolean row mask of the chunks matching a `where` clause (None when unfiltered), cached per clause."""
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, default=str)
+        with self._masks_lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                return mask
+        mask = self.chunks.matches_where(where)
+        with self._masks_lock:
+            self._masks[key] = mask
+            while len(self._masks) > self.max_cached_filters:
+                self._masks.popitem(last=False)
+        return mask
+
+    def _materialize(self, rows: Iterable[int]) -> List[Document]:
+        # fresh objects, like a Chroma query: later stages annotate metadata in place
+        return [self.chunks.document(r) for r in rows]
+
+    def dense_search(self, embedding: List[float], k: int, allowed: Optional[np.ndarray] = None) -> List[tuple[int, float]]:
+        """Exact cosine top-k (row, score) pairs; rows outside the boolean `allowed` mask are skipped."""
+        k = min(k, len(self.chunks))
+        if k <= 0:
+            return []
+        query = _normalize(np.asarray(embedding, dtype=np.float32)[None, :])[0]
+        scores = self.vectors @ query
+        if allowed is not None:
+            scores = np.where(allowed, scores, -np.inf)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(r), float(scores[r])) for r in top if scores[r] > -np.inf]
+
+    def similarity_search_by_vector(
+            self, embedding: List[float], k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return self._materialize(row for row, _ in self.dense_search(embedding, k, self.allowed(filter)))
+
+    def lexical_search(self, query: str, k: int = 4, filter: Optional[dict] = None) -> List[Document]:
+        """BM25 over the snapshot's precomputed postings (no per-query index build)."""
+        return self._materialize(row for row, _ in self.lexical.search(query, k, self.allowed(filter)))
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any) -> List[Document]:
+        return self.similarity_search_by_vector(self.embeddings.embed_query(query), k=k, filter=filter)
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs: Any) -> List[str]:
+        raise NotImplementedError("Index snapshots are read-only; publish a new version with IndexSnapshots.publish")
+
+    @classmethod
+    def from_texts(cls, texts: List[str], embedding: Embeddings, metadatas: Optional[List[dict]] = None, **kwargs: Any):
+        raise NotImplementedError("Build snapshots with write_snapshot")
+
+def write_snapshot(
+        root: Path,
+        chunks: List[Document],
+        embedding_model: str,
+        previous: Optional[IndexSnapshot] = None,
+        keep_versions: int = 3
+) -> str:
+    """
+    Writes the next version and points CURRENT at it. Callers hold `builder_lock`.
+    Embeddings of chunks whose id and text are unchanged since `previous` are copied, not recomputed.
+    """
+    ids = chunk_ids(chunks)
+    reusable = previous is not None and previous.embedding_model == embedding_model
+    rows, missing = [], []
+    for i, (chunk_id, chunk) in enumerate(zip(ids, chunks)):
+        row = previous.row_of.get(chunk_id) if reusable else None
+        if row is None or previous.chunks.page_content(row) != chunk.page_content:
+            row = None
+            missing.append(i)
+        rows.append(row)
+
+    fresh = ClientRegistry.get_embeddings(embedding_model).embed_documents(
+        [chunks[i].page_content for i in missing]
+    ) if missing else []
+    dim = len(fresh[0]) if fresh else (previous.vectors.shape[1] if previous is not None and len(previous.chunks) else 0)
+    vectors = np.zeros((len(chunks), dim), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row is not None:
+            vectors[i] = previous.vectors[row]
+    if missing:
+        vectors[missing] = _normalize(np.asarray(fresh, dtype=np.float32))
+
+    existing = _versions(root)
+    version = int(existing[-1][1:]) + 1 if existing else 1
+    name = f"v{version:06d}"
+    staging = root / f".staging-{name}-{os.getpid()}"
+    staging.mkdir(parents=True)
+    np.save(staging / "vectors.npy", vectors)
+    store = ChunkStore.from_documents(chunks, ids=ids)
+    store.save(staging / "chunks")
+    LexicalIndex.build(store.texts()).save(staging / "lexical")
+    TermIndex.build(store, previous.terms if previous is not None else None).save(staging / "terms.json")
+    (staging / "manifest.json").write_text(json.dumps({
+        "format": SNAPSHOT_FORMAT,
+        "version": version,
+        "embedding_model": embedding_model,
+        "chunks": len(chunks),
+        "dimension": dim,
+        "created": time.time(),
+    }, indent=2))
+    os.rename(staging, root / name)
+
+    pointer = root / f".{CURRENT_FILE}.{os.getpid()}"
+    pointer.write_text(name)
+    os.replace(pointer, root / CURRENT_FILE)
+    logger.info(f"📸 Published index snapshot {name}: {len(chunks)} chunks, {len(missing)} newly embedded")
+
+    # old versions stay readable by workers that still have them mapped (unlinked files live on)
+    for old in _versions(root)[:-max(keep_versions, 1)]:
+        shutil.rmtree(root / old, ignore_errors=True)
+    return name
+
+class IndexSnapshots:
+    """
+    Per-process handle on the CURRENT snapshot of one collection (`serving.mode: snapshot`).
+    Workers re-read the pointer at most every `refresh_interval` seconds and open a newer version on a
+    background thread, then swap it in atomically; in-flight retrievals keep the snapshot object they started with.
+    """
+    refresh_interval = SERVING_CONFIG.get("refresh_interval", 2.0)
+    keep_versions = SERVING_CONFIG.get("keep_versions", 3)
+    embedding_model = INDEX_CONFIG.get("embedding_model", "text-embedding-3-small")
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._snapshot: Optional[IndexSnapshot] = None
+        self._checked = 0.0
+        self._refreshing = False
+        self._lock = threading.Lock()
+
+    def exists(self) -> bool:
+        return current_name(self.root) is not None
+
+    def get(self, build_chunks: Callable[[], List[Document]]) -> IndexSnapshot:
+        """The current snapshot; the first process to find none builds it from `build_chunks()`."""
+        snapshot = self._snapshot
+        if snapshot is not None:
+            self._maybe_refresh()
+            return snapshot
+        with self._lock:
+            name = current_name(self.root)
+            if name is None:
+                with builder_lock(self.root):
+                    name = current_name(self.root)
+                    if name is None:
+                        print(f"🧠 Building the first index snapshot in {self.root}...")
+                        name = write_snapshot(self.root, build_chunks(), self.embedding_model, keep_versions=self.keep_versions)
+            self._open(name)
+            return self._snapshot
+
+    def _open(self, name: str):
+        if self._snapshot is None or self._snapshot.name != name:
+            self._snapshot = IndexSnapshot(self.root / name)
+            print(f"📦 Serving index snapshot {self.root.name}/{name} ({len(self._snapshot.chunks)} chunks)")
+        self._checked = time.monotonic()
+
+    def _maybe_refresh(self):
+        """
+        Once `refresh_interval` has passed, re-reads CURRENT and opens a newer version on a background
+        thread. Callers (the event loop among them) never wait on the load; they keep reading the open
+        snapshot until the new one is swapped in.
+        """
+        if time.monotonic() - self._checked < self.refresh_interval:
+            return
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._checked < self.refresh_interval:
+                return
+            self._refreshing = True
+            self._checked = time.monotonic()
+        threading.Thread(target=self._refresh, name=f"snapshot-refresh-{self.root.name}", daemon=True).start()
+
+    def _refresh(self):
+        try:
+            name = current_name(self.root)
+            current = self._snapshot
+            if name is None or current is None or current.name == name:
+                return
+            snapshot = IndexSnapshot(self.root / name)
+            with self._lock:
+                # closed (unloaded) or already moved past this version meanwhile
+                if self._snapshot is not None and self._snapshot.version < snapshot.version:
+                    self._snapshot = snapshot
+                    print(f"📦 Serving index snapshot {self.root.name}/{name} ({len(snapshot.chunks)} chunks)")
+        except Exception:
+            logger.exception(f"Refreshing index snapshot {self.root} failed; serving the open version")
+        finally:
+            self._refreshing = False
+
+    def publish(self, update: Callable[[List[Document]], List[Document]]) -> IndexSnapshot:
+        """
+        Derives the next version from the latest published chunks (`update(chunks) -> chunks`)
+        under the builder lock, so concurrent ingestions in different workers are not lost.
+        """
+        with builder_lock(self.root):
+            name = current_name(self.root)
+            previous = IndexSnapshot(self.root / name) if name else None
+            chunks = update(previous.chunks if previous is not None else [])
+            name = write_snapshot(self.root, chunks, self.embedding_model, previous, self.keep_versions)
+        with self._lock:
+            self._open(name)
+            return self._snapshot
+
+    def version(self) -> int:
+        """
+        Version of the snapshot served here (read from the CURRENT pointer while none is open; 0 if none exists).
+        A newer published version is picked up in the background, so this never loads one itself.
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            name = current_name(self.root)
+            return int(name[1:]) if name else 0
+        self._maybe_refresh()
+        return snapshot.version
+
+    def loaded(self) -> Optional[IndexSnapshot]:
+        return self._snapshot
+
+    def close(self):
+        """Drops this process's mapping; the next `get` reopens CURRENT."""
+        with self._lock:
+            self._snapshot = None
+
+def main():
+    from RAG.index_manager import GlobalIndexManager
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "add", "remove", "status"])
+    parser.add_argument("target", nargs="?", help="PDF path for `add`, doc_id for `remove`")
+    parser.add_argument("--collection", help="named collection (default: index.collection_name)")
+    args = parser.parse_args()
+
+    headers = config["retriever"]["headers_to_split_on"]
+    GlobalIndexManager.mode = "snapshot"
+    collection = GlobalIndexManager.collection(args.collection)
+    snapshots = IndexSnapshots(collection.snapshot_root)
+    if args.command == "build":
+        chunks = [chunk for source in collection.sources() for chunk in GlobalIndexManager.split_pdf(headers, source)]
+        snapshots.publish(lambda _: chunks)
+    elif args.command == "add":
+        GlobalIndexManager.add_document(headers, args.target, collection=collection.name)
+    elif args.command == "remove":
+        GlobalIndexManager.remove_document(args.target, collection=collection.name)
+    name = current_name(snapshots.root)
+    if name is None:
+        print(f"📭 No index snapshot in {snapshots.root}")
+        return
+    snapshot = IndexSnapshot(snapshots.root / name)
+    documents = sorted(d for d in snapshot.chunks.distinct("doc_id") if d)
+    print(f"📦 {collection.name}/{snapshot.name}: {len(snapshot.chunks)} chunks over {len(documents)} documents ({snapshot.path})")
+
+if __name__ == "__main__":
+    main()
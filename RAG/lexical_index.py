@@ -0,0 +1,114 @@
+import re
+import json
+import math
+from collections import Counter
+from pathlib import Path
+from typing import Optional, Sequence
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+class LexicalIndex:
+    """
+    BM25 (Okapi) over integer chunk ids.
+    Postings are stored CSR-style (term -> slice of doc ids / term frequencies) in flat
+    numpy arrays, so a saved index can be memory-mapped and shared by every worker process.
+    """
+    ARRAYS = ("offsets", "doc_ids", "term_freqs", "doc_lengths", "idf")
+
+    def __init__(
+            self,
+            vocabulary: dict[str, int],
+            offsets: np.ndarray,
+            doc_ids: np.ndarray,
+            term_freqs: np.ndarray,
+            doc_lengths: np.ndarray,
+            idf: np.ndarray,
+            k1: float = 1.5,
+            b: float = 0.75
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.term_freqs = term_freqs
+        self.doc_lengths = doc_lengths
+        self.idf = idf
+        self.k1 = k1
+        self.b = b
+        self.avg_length = float(doc_lengths.mean()) if len(doc_lengths) else 0.0
+
+    @classmethod
+    def build(cls, texts: Sequence[str], k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25) -> "LexicalIndex":
+        postings: dict[str, list[tuple[int, int]]] = {}
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+        for doc, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lengths[doc] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                postings.setdefault(term, []).append((doc, tf))
+
+        vocabulary = {term: i for i, term in enumerate(sorted(postings))}
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        for term, i in vocabulary.items():
+            offsets[i + 1] = len(postings[term])
+        offsets = np.cumsum(offsets)
+        doc_ids = np.empty(offsets[-1], dtype=np.int32)
+        term_freqs = np.empty(offsets[-1], dtype=np.float32)
+        for term, i in vocabulary.items():
+            entries = np.asarray(postings[term], dtype=np.int64).reshape(-1, 2)
+            doc_ids[offsets[i]:offsets[i + 1]] = entries[:, 0]
+            term_freqs[offsets[i]:offsets[i + 1]] = entries[:, 1]
+
+        # same idf as rank_bm25.BM25Okapi (used by BM25Retriever): negative idfs are floored
+        n = len(texts)
+        doc_freqs = np.diff(offsets).astype(np.float64)
+        idf = np.log((n - doc_freqs + 0.5) / (doc_freqs + 0.5))
+        if len(idf):
+            idf[idf < 0] = epsilon * idf.mean()
+        return cls(vocabulary, offsets, doc_ids, term_freqs, doc_lengths, idf.astype(np.float32), k1=k1, b=b)
+
+    def save(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.ARRAYS:
+            np.save(directory / f"{name}.npy", getattr(self, name))
+        (directory / "vocabulary.json").write_text(json.dumps(
+            {"k1": self.k1, "b": self.b, "terms": self.vocabulary}
+        ))
+
+    @classmethod
+    def load(cls, directory: Path, mmap: bool = True) -> "LexicalIndex":
+        meta = json.loads((directory / "vocabulary.json").read_text())
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode="r" if mmap else None) for name in cls.ARRAYS}
+        return cls(meta["terms"], k1=meta["k1"], b=meta["b"], **arrays)
+
+    def __len__(self) -> int:
+        return len(self.doc_lengths)
+
+    def scores(self, query: str, allowed: Optional[np.ndarray] = None) -> np.ndarray:
+        """BM25 score of every chunk; chunks outside the boolean `allowed` mask score -inf."""
+        scores = np.zeros(len(self), dtype=np.float32)
+        norm = self.k1 * (1 - self.b + self.b * self.doc_lengths / (self.avg_length or 1.0))
+        for term in set(tokenize(query)):
+            i = self.vocabulary.get(term)
+            if i is None:
+                continue
+            start, end = self.offsets[i], self.offsets[i + 1]
+            docs = self.doc_ids[start:end]
+            tf = self.term_freqs[start:end]
+            scores[docs] += self.idf[i] * tf * (self.k1 + 1) / (tf + norm[docs])
+        if allowed is not None:
+            scores[~allowed] = -math.inf
+        return scores
+
+    def search(self, query: str, k: int, allowed: Optional[np.ndarray] = None) -> list[tuple[int, float]]:
+        """Top-k (chunk id, score) pairs, best first."""
+        scores = self.scores(query, allowed)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(i), float(scores[i])) for i in top if scores[i] > -math.inf]
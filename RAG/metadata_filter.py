@@ -0,0 +1,43 @@
+from typing import Optional
+
+def matches_filter(metadata: dict, filter: Optional[dict]) -> bool:
+    """
+    A filter maps metadata keys (doc_id, Header 1/2/3, ...) to a value or a list of accepted values.
+    """
+    if not filter:
+        return True
+    for key, expected in filter.items():
+        value = metadata.get(key)
+        if isinstance(expected, (list, tuple, set)):
+            if value not in expected:
+                return False
+        elif value != expected:
+            return False
+    return True
+
+def to_chroma_where(filter: Optional[dict]) -> Optional[dict]:
+    """Translate a retrieval filter into a Chroma `where` clause."""
+    if not filter:
+        return None
+    clauses = [
+        {key: {"$in": list(expected)}} if isinstance(expected, (list, tuple, set)) else {key: expected}
+        for key, expected in filter.items()
+    ]
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+def matches_where(metadata: dict, where: Optional[dict]) -> bool:
+    """Evaluate a `where` clause produced by `to_chroma_where` (equality, $in, $and) outside Chroma."""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(matches_where(metadata, clause) for clause in where["$and"])
+    for key, expected in where.items():
+        value = metadata.get(key)
+        if isinstance(expected, dict) and "$in" in expected:
+            if value not in expected["$in"]:
+                return False
+        elif value != expected:
+            return False
+    return True
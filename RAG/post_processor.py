@@ -1,7 +1,41 @@
+import re
 import hashlib
-from typing import List
+from typing import List, Optional
 from langchain_core.documents import Document
 from RAG.retriever_utils import content_hash
+
+def shingles(text: str, size: int = 5) -> set[int]:
+    """Hashed word n-grams of a text (the whole text when it is shorter than `size` words)."""
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {hash(" ".join(words))} if words else set()
+    return {hash(" ".join(words[i:i + size])) for i in range(len(words) - size + 1)}
+
+def near_duplicate_keep(texts: List[str], threshold: float, size: int = 5, scores: Optional[List[float]] = None) -> List[int]:
+    """
+    Indices of the texts to keep, in their original order.
+    Two texts are near-duplicates when their shingle containment |A∩B| / min(|A|, |B|) reaches
+    `threshold`, which also catches a chunk that overlaps or is contained in a longer one.
+    Of each near-duplicate group the highest-scoring (then first) text is kept.
+    """
+    order = list(range(len(texts)))
+    if scores is not None:
+        order.sort(key=lambda i: scores[i], reverse=True)
+    kept: List[int] = []
+    kept_shingles: List[set] = []
+    for i in order:
+        current = shingles(texts[i], size)
+        duplicate = False
+        for other in kept_shingles:
+            smaller = min(len(current), len(other))
+            if smaller and len(current & other) / smaller >= threshold:
+                duplicate = True
+                break
+        if not duplicate:
+            kept.append(i)
+            kept_shingles.append(current)
+    return sorted(kept)
+
 class PostProcessor:
     def __init__(self, raw_retrieved_docs: List[Document]):
         self.docs = raw_retrieved_docs
@@ -16,7 +50,16 @@ class PostProcessor:
                 seen.add(h)
                 self.unique_doc.append(doc)
         return self.unique_doc
-    
+
+    def dedup_near_duplicates(self, threshold: float = 0.8, shingle_size: int = 5):
+        """Collapse overlapping / near-identical chunks (run after `dedup_by_content`)."""
+        scores = [float(doc.metadata.get("relevance_score") or 0.0) for doc in self.unique_doc]
+        keep = near_duplicate_keep(
+            [doc.page_content for doc in self.unique_doc], threshold, shingle_size, scores
+        )
+        self.unique_doc = [self.unique_doc[i] for i in keep]
+        return self.unique_doc
+
     def context_format(self) -> str:
         context = ""
         for doc in self.unique_doc:
@@ -29,4 +72,4 @@ class PostProcessor:
         ------------------------------------
         \n\n
         """
-        return context
\ No newline at end of file
+        return context
@@ -0,0 +1,106 @@
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+import numpy as np
+from langchain_core.documents import Document
+from utils.utils import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = config.get("retrieval_cache", {})
+
+class SemanticRetrievalCache:
+    """
+    Process-wide cache of final `ensemble_retrieve` results.
+    A query hits when its embedding is within `similarity_threshold` (cosine) of a cached query
+    with the same collection and filter; a collection's entries are dropped as soon as its index version changes.
+    """
+    _entries: "OrderedDict[int, dict]" = OrderedDict()
+    _next_key = 0
+    _index_versions: dict[str, int] = {}
+    _hits = 0
+    _misses = 0
+    _lock = threading.Lock()
+
+    enabled = CACHE_CONFIG.get("enabled", True)
+    similarity_threshold = CACHE_CONFIG.get("similarity_threshold", 0.95)
+    max_entries = CACHE_CONFIG.get("max_entries", 512)
+
+    @staticmethod
+    def _filter_key(filter: Optional[dict]) -> str:
+        return json.dumps(filter or {}, sort_keys=True, default=sorted)
+
+    @staticmethod
+    def _normalize(embedding) -> np.ndarray:
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec / max(float(np.linalg.norm(vec)), 1e-12)
+
+    @classmethod
+    def _check_version(cls, collection: str, index_version: int):
+        previous = cls._index_versions.get(collection)
+        if previous != index_version:
+            stale = [key for key, entry in cls._entries.items() if entry["collection"] == collection]
+            if stale:
+                logger.info(f"♻️ Index version of {collection or 'default'} {previous} -> {index_version}, dropping {len(stale)} cached results")
+            for key in stale:
+                del cls._entries[key]
+            cls._index_versions[collection] = index_version
+
+    @classmethod
+    def lookup(cls, query_embedding, filter: Optional[dict], index_version: int, collection: str = "") -> Optional[List[Document]]:
+        if not cls.enabled:
+            return None
+        query_vec = cls._normalize(query_embedding)
+        filter_key = cls._filter_key(filter)
+        with cls._lock:
+            cls._check_version(collection, index_version)
+            best_key, best_sim = None, cls.similarity_threshold
+            for key, entry in cls._entries.items():
+                if entry["filter"] != filter_key or entry["collection"] != collection:
+                    continue
+                sim = float(entry["embedding"] @ query_vec)
+                if sim >= best_sim:
+                    best_key, best_sim = key, sim
+            if best_key is None:
+                cls._misses += 1
+                return None
+            cls._entries.move_to_end(best_key)
+            cls._hits += 1
+            logger.info(f"🎯 Retrieval cache hit (cosine={best_sim:.3f}): {cls._entries[best_key]['query']}")
+            return list(cls._entries[best_key]["docs"])
+
+    @classmethod
+    def store(cls, query: str, query_embedding, filter: Optional[dict], index_version: int, docs: List[Document], collection: str = ""):
+        if not cls.enabled:
+            return
+        with cls._lock:
+            cls._check_version(collection, index_version)
+            cls._entries[cls._next_key] = {
+                "query": query,
+                "collection": collection,
+                "embedding": cls._normalize(query_embedding),
+                "filter": cls._filter_key(filter),
+                "docs": list(docs),
+            }
+            cls._next_key += 1
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            total = cls._hits + cls._misses
+            return {
+                "hits": cls._hits,
+                "misses": cls._misses,
+                "hit_rate": cls._hits / total if total else 0.0,
+                "entries": len(cls._entries),
+                "index_versions": dict(cls._index_versions),
+            }
+
+    @classmethod
+    def clear(cls):
+        with cls._lock:
+            cls._entries.clear()
@@ -0,0 +1,143 @@
+"""
+Retrieval quality vs latency of the `ensemble_retrieve` pipeline configurations
+(BM25 only, vector only, fused, fused+rerank, fused+rerank+MMR), plus two variants
+of fused: separate retrievers instead of the hybrid engine, and no BM25 term expansion.
+
+Reports recall@k, MRR and nDCG@k over labeled queries, plus mean per-stage latency,
+so the cheapest configuration meeting the quality target can be picked.
+
+    python -m RAG.retrieval_eval                        # synthetic corpus, offline stand-ins
+    python -m RAG.retrieval_eval --dataset labels.jsonl # configured index and live clients
+
+A dataset line is {"query": "...", "relevant": ["<doc_id>::<chunk position>", ...]},
+matching the `chunk_id` metadata stamped at chunking time.
+"""
+import json
+import math
+import argparse
+import tempfile
+from dataclasses import replace
+from pathlib import Path
+import numpy as np
+from RAG.index_manager import GlobalIndexManager
+from RAG.hybrid_search import HybridSearch
+from RAG.retriever_builder import Retrievers, PipelineConfig
+from utils.instrumentation import start_trace
+from utils.utils import config
+
+HEADERS_TO_SPLIT_ON = config["retriever"]["headers_to_split_on"]
+FILE_PTH = config["retriever"]["file_pth"]
+
+CONFIGURATIONS = {
+    "bm25": dict(dense=False, rerank=False, mmr=False),
+    "vector": dict(lexical=False, rerank=False, mmr=False),
+    "fused": dict(rerank=False, mmr=False),
+    "fused (separate)": dict(hybrid=False, rerank=False, mmr=False),
+    "fused (no terms)": dict(expand_terms=False, rerank=False, mmr=False),
+    "fused+rerank": dict(mmr=False),
+    "fused+rerank+mmr": dict(),
+}
+
+def recall_at_k(ranked: list[str], relevant: set[str], k: int) -> float:
+    return len(relevant.intersection(ranked[:k])) / len(relevant) if relevant else 0.0
+
+def reciprocal_rank(ranked: list[str], relevant: set[str]) -> float:
+    for rank, chunk_id in enumerate(ranked, 1):
+        if chunk_id in relevant:
+            return 1.0 / rank
+    return 0.0
+
+def ndcg_at_k(ranked: list[str], relevant: set[str], k: int) -> float:
+    dcg = sum(1.0 / math.log2(rank + 1) for rank, chunk_id in enumerate(ranked[:k], 1) if chunk_id in relevant)
+    ideal = sum(1.0 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal if ideal else 0.0
+
+def evaluate(retrievers: Retrievers, labeled: list[tuple[str, set[str]]], ks: list[int]) -> dict:
+    recalls = {k: [] for k in ks}
+    ndcgs = {k: [] for k in ks}
+    rrs, stages, totals, returned = [], {}, [], []
+    for query, relevant in labeled:
+        trace = start_trace()
+        docs = retrievers.ensemble_retrieve(query)
+        summary = trace.summary()
+        totals.append(summary["total_seconds"])
+        for span, entry in summary["spans"].items():
+            if span.startswith("stage:"):
+                stages.setdefault(span[len("stage:"):], []).append(entry["seconds"])
+        ranked = [d.metadata.get("chunk_id") for d in docs]
+        returned.append(len(ranked))
+        for k in ks:
+            recalls[k].append(recall_at_k(ranked, relevant, k))
+            ndcgs[k].append(ndcg_at_k(ranked, relevant, k))
+        rrs.append(reciprocal_rank(ranked, relevant))
+    return {
+        **{f"recall@{k}": float(np.mean(v)) for k, v in recalls.items()},
+        **{f"ndcg@{k}": float(np.mean(v)) for k, v in ndcgs.items()},
+        "mrr": float(np.mean(rrs)),
+        "returned": float(np.mean(returned)),
+        "p50_ms": float(np.percentile(totals, 50) * 1000),
+        "p95_ms": float(np.percentile(totals, 95) * 1000),
+        "stage_ms": {stage: float(np.mean(v) * 1000) for stage, v in stages.items()},
+    }
+
+def load_dataset(path: str) -> list[tuple[str, set[str]]]:
+    labeled = []
+    for line in Path(path).read_text().splitlines():
+        if line.strip():
+            item = json.loads(line)
+            labeled.append((item["query"], set(item["relevant"])))
+    return labeled
+
+def run_evaluation(labeled: list[tuple[str, set[str]]], vectorstore, chunked_doc, ks: list[int], base: PipelineConfig) -> dict:
+    results = {}
+    search = HybridSearch(vectorstore, chunked_doc)
+    for name, overrides in CONFIGURATIONS.items():
+        pipeline = replace(base, **overrides)
+        retrievers = Retrievers(chunked_doc=chunked_doc, vectorstore=vectorstore, pipeline=pipeline, search=search)
+        metrics = evaluate(retrievers, labeled, ks)
+        results[name] = metrics
+        quality = "  ".join(f"{key}={value:.3f}" for key, value in metrics.items() if "@" in key or key == "mrr")
+        stages = ", ".join(f"{stage} {ms:.1f}" for stage, ms in metrics["stage_ms"].items())
+        print(f"🎯 {name:<17} {quality}  p50={metrics['p50_ms']:.1f} ms  p95={metrics['p95_ms']:.1f} ms  [{stages}]")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dataset", help="labeled JSONL; omit to evaluate on the synthetic corpus offline")
+    parser.add_argument("--corpus-size", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--rrf-k", type=int, help="override retriever.pipeline.rrf_k")
+    parser.add_argument("--mmr-lambda", type=float, help="override retriever.pipeline.mmr_lambda")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    overrides = {}
+    if args.rrf_k is not None:
+        overrides["rrf_k"] = args.rrf_k
+    if args.mmr_lambda is not None:
+        overrides["mmr_lambda"] = args.mmr_lambda
+    base = PipelineConfig.from_config(**overrides)
+
+    if args.dataset:
+        labeled = load_dataset(args.dataset)
+        vectorstore, chunked_doc = GlobalIndexManager.get_vectorstore(
+            headers_to_split_on=HEADERS_TO_SPLIT_ON, file_pth=FILE_PTH
+        )
+        results = run_evaluation(labeled, vectorstore, chunked_doc, args.k, base)
+    else:
+        from benchmarks.fakes import install_fakes
+        from benchmarks.corpus import synthetic_corpus, labeled_queries
+        install_fakes(llm_latency=0.0, embedding_latency=0.0, rerank_latency=0.0)
+        chunks = synthetic_corpus(args.corpus_size)
+        labeled = [(q.query, q.relevant) for q in labeled_queries(chunks, args.queries)]
+        with tempfile.TemporaryDirectory() as workdir:
+            vectorstore, chunked_doc = GlobalIndexManager.load_chunks(chunks, persist_directory=str(Path(workdir) / "index"))
+            results = run_evaluation(labeled, vectorstore, chunked_doc, args.k, base)
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,95 @@
 import logging
-from typing import List
-from langchain_community.retrievers import BM25Retriever
+from dataclasses import dataclass
+from typing import List, Optional
 from langchain_community.vectorstores import Chroma
 from langchain_core.documents import Document
+from langchain_core.runnables import RunnableLambda
 from langchain_community.vectorstores.utils import maximal_marginal_relevance
 import heapq
-from langchain_openai import OpenAIEmbeddings
+from utils.client_registry import ClientRegistry
 from typing import Dict
-from langchain_cohere import CohereRerank
+from RAG.metadata_filter import to_chroma_where
+from RAG.hybrid_search import HybridSearch
+from utils.instrumentation import timed
+from utils.utils import config
 
 logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """Stages and parameters of `ensemble_retrieve` (`retriever.pipeline` in config.yaml)."""
+    hybrid: bool = True
+    lexical: bool = True
+    dense: bool = True
+    bm25_k: int = 10
+    vector_k: int = 10
+    rrf_k: int = 60
+    rrf_top_n: int = 8
+    expand_terms: bool = True
+    rerank: bool = True
+    rerank_model: str = "rerank-english-v3.0"
+    rerank_top_n: int = 4
+    mmr: bool = True
+    mmr_k: int = 4
+    mmr_lambda: float = 0.5
+
+    @classmethod
+    def from_config(cls, **overrides) -> "PipelineConfig":
+        settings = {**config["retriever"].get("pipeline", {}), **overrides}
+        return cls(**{k: v for k, v in settings.items() if k in cls.__dataclass_fields__})
+
 # BM25 -> samilarityEmbeddingSearch
 class Retrievers:
-    def __init__(self, chunked_doc: List[str], vectorstore: Chroma):
+    def __init__(
+            self,
+            chunked_doc: List[str],
+            vectorstore: Chroma,
+            pipeline: Optional[PipelineConfig] = None,
+            search: Optional[HybridSearch] = None
+    ):
         self.chunked_doc = chunked_doc
         self.vectorstore = vectorstore
-        self.cohere_rerank = CohereRerank(model="rerank-english-v3.0", top_n=4)
+        self.pipeline = pipeline or PipelineConfig.from_config()
+        if not (self.pipeline.lexical or self.pipeline.dense):
+            raise ValueError("At least one of the lexical and dense retrievers must be enabled")
+        # pass the collection's cached engine (GlobalIndexManager.search_engine) to skip building one here
+        self._engine = search
+        self.search = self.engine if self.pipeline.hybrid else None
+        self.cohere_rerank = (
+            ClientRegistry.get_reranker(self.pipeline.rerank_model, top_n=self.pipeline.rerank_top_n)
+            if self.pipeline.rerank else None
+        )
+
+    @property
+    def engine(self) -> HybridSearch:
+        """Row-level BM25 postings and filter masks of the corpus; the separate BM25 leg searches them too."""
+        if self._engine is None:
+            self._engine = HybridSearch(self.vectorstore, self.chunked_doc)
+        return self._engine
 
-    def build_retriever(self):
+    def build_retriever(self, filter: Optional[dict] = None):
         try:
-            logger.info("Building BM25 retriever")
-            bm25_retriever = BM25Retriever.from_documents(self.chunked_doc)
-            bm25_retriever.k = 10
+            engine = self.engine
+            allowed = engine.allowed(filter)
+            if allowed is not None and not allowed.any():
+                logger.warning(f"No chunk matches filter {filter}, searching the whole corpus")
+                filter, allowed = None, None
+
+            bm25_retriever = retriever_vanilla = None
+            if self.pipeline.lexical:
+                # the filter is a row mask over the prebuilt postings; nothing is indexed per query
+                k = self.pipeline.bm25_k
+                bm25_retriever = RunnableLambda(lambda query: engine.materialize(engine.lexical_rows(query, k, allowed)))
 
-            logger.info("Building vector-based retrivers.")
-            retriever_vanilla = self.vectorstore.as_retriever(
-                search_type="similarity", search_kwargs={"k": 10}
-            )
+            if self.pipeline.dense:
+                logger.info("Building vector-based retrivers.")
+                search_kwargs = {"k": self.pipeline.vector_k}
+                where = to_chroma_where(filter)
+                if where is not None:
+                    search_kwargs["filter"] = where
+                retriever_vanilla = self.vectorstore.as_retriever(
+                    search_type="similarity", search_kwargs=search_kwargs
+                )
 
             logger.info("Combining retrievers into an ensemble retriever")
             ensemble_retriever = [bm25_retriever, retriever_vanilla]
@@ -74,12 +137,13 @@ class Retrievers:
         
         return unique_docs
 
-    def mmr_select(self, query: str, docs: List[Document], k=4, lambda_mult=0.5):
-        embedding = OpenAIEmbeddings(model="text-embedding-3-small")
+    def mmr_select(self, query: str, docs: List[Document], k=4, lambda_mult=0.5, query_embedding: Optional[List[float]] = None):
+        embedding = ClientRegistry.get_embeddings(config.get("index", {}).get("embedding_model", "text-embedding-3-small"))
 
         doc_texts = [d.page_content for d in docs]
         doc_embeddings = embedding.embed_documents(doc_texts)  # List[List[float]]
-        query_embedding = embedding.embed_query(query)         # List[float]
+        if query_embedding is None:
+            query_embedding = embedding.embed_query(query)     # List[float]
 
         import numpy as np
         query_embedding = np.array(query_embedding)        # List → np.array
@@ -95,28 +159,83 @@ class Retrievers:
         return [docs[i] for i in selected_indices]
 
 
-    def ensemble_retrieve(self, query: str) -> List[Document]:
-            """完整Pipeline: BM25+Embedding → RRF → Cohere Rerank → MMR"""
+    def ensemble_retrieve(
+            self,
+            query: str,
+            filter: Optional[dict] = None,
+            query_embedding: Optional[List[float]] = None
+    ) -> List[Document]:
+            """完整Pipeline: BM25+Embedding → RRF → Cohere Rerank → MMR
+            `filter` (e.g. {"doc_id": "2310.08560v2.pdf", "Header 2": "Method"}) scopes both retrievers
+            `query_embedding` is reused by the hybrid dense leg and MMR when the caller already embedded the query
+            Stages and their parameters come from `self.pipeline`; a disabled stage passes its input through.
+            """
+            pipeline = self.pipeline
             logger.info("🔄 开始Ensemble检索...")
-            
+
+            # 1+2. hybrid: both legs rank chunk rows, only the fused survivors become Documents
+            if self.search is not None:
+                with timed("hybrid"):
+                    rrf_result = self.search.search(
+                        query,
+                        query_embedding=query_embedding,
+                        filter=filter,
+                        lexical=pipeline.lexical,
+                        dense=pipeline.dense,
+                        bm25_k=pipeline.bm25_k,
+                        vector_k=pipeline.vector_k,
+                        rrf_k=pipeline.rrf_k,
+                        top_n=pipeline.rrf_top_n,
+                        expand_terms=pipeline.expand_terms
+                    )
+                logger.info(f"🔗 Hybrid检索融合后: {len(rrf_result)} 个文档")
+            else:
+                rrf_result = self.separate_retrieve(query, filter)
+            return self.post_process(query, rrf_result, query_embedding)
+
+    def separate_retrieve(self, query: str, filter: Optional[dict] = None) -> List[Document]:
+            """BM25 and vector retrievers run independently, their Documents fused by `rrf_fusion`."""
+            pipeline = self.pipeline
             # 1. 多检索器检索
-            retrievers = self.build_retriever()
-            docs = [retriever.invoke(query) for retriever in retrievers]
+            with timed("build_retrievers"):
+                bm25_retriever, vector_retriever = self.build_retriever(filter=filter)
+            docs = []
+            if bm25_retriever is not None:
+                with timed("bm25"):
+                    docs.append(bm25_retriever.invoke(query))
+            if vector_retriever is not None:
+                with timed("vector"):
+                    docs.append(vector_retriever.invoke(query))
             logger.info(f"📥 检索到 {sum(len(d) for d in docs)} 个文档")
             
-            # 2. RRF融合
-            rrf_result = self.rrf_fusion(docs, top_n=8)  # 先多取8个给rerank
+            # 2. RRF融合 (a single retriever keeps its own ranking)
+            if len(docs) > 1:
+                with timed("rrf"):
+                    rrf_result = self.rrf_fusion(docs, k=pipeline.rrf_k, top_n=pipeline.rrf_top_n)
+            else:
+                rrf_result = docs[0][:pipeline.rrf_top_n]
             logger.info(f"🔗 RRF融合后: {len(rrf_result)} 个文档")
-            
+            return rrf_result
+
+    def post_process(self, query: str, rrf_result: List[Document], query_embedding: Optional[List[float]] = None) -> List[Document]:
+            pipeline = self.pipeline
             # 3. 🔥 Cohere Rerank压缩
-            reranked_docs = self.cohere_rerank.compress_documents(
-                query=query, 
-                documents=rrf_result
-            )
-            logger.info(f"⭐ Cohere Rerank后: {len(reranked_docs)} 个文档")
+            reranked_docs = rrf_result
+            if self.cohere_rerank is not None:
+                with timed("rerank"):
+                    reranked_docs = self.cohere_rerank.compress_documents(
+                        query=query, 
+                        documents=rrf_result
+                    )
+                logger.info(f"⭐ Cohere Rerank后: {len(reranked_docs)} 个文档")
             
             # 4. MMR多样性选择
-            mmr_selected = self.mmr_select(query, reranked_docs, k=4, lambda_mult=0.5)
+            if not pipeline.mmr or not reranked_docs:
+                return reranked_docs
+            with timed("mmr"):
+                mmr_selected = self.mmr_select(
+                    query, reranked_docs, k=pipeline.mmr_k, lambda_mult=pipeline.mmr_lambda, query_embedding=query_embedding
+                )
             logger.info(f"🎯 MMR最终选择: {len(mmr_selected)} 个文档")
             
             return mmr_selected
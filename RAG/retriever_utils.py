@@ -1,26 +1,45 @@
 from langchain_community.vectorstores.utils import maximal_marginal_relevance
 import heapq
 import hashlib
-from typing import List, Dict
+from typing import List, Dict, Optional
 from langchain_core.documents import Document
 from langchain_openai import OpenAIEmbeddings
-from RAG.document_processor import DocumentProcessor
 from RAG.index_builder import IndexBuilder
-from RAG.index_manager import GlobalIndexManager
-from RAG.retriever_builder import Retrievers
+from RAG.index_manager import GlobalIndexManager, INDEX_CONFIG
+from RAG.retrieval_cache import SemanticRetrievalCache
+from utils.client_registry import ClientRegistry
+from RAG.retriever_builder import Retrievers, PipelineConfig
+from utils.instrumentation import timed, cache_result
 
-def retrieve(headers_to_split_on, query, file_pth):
+def retrieve(headers_to_split_on, query, file_pth, filter: Optional[dict] = None, collection: Optional[str] = None):
+    """`collection` names the index collection to search (None: the default one)."""
     vectorstore, chunked_doc = GlobalIndexManager.get_vectorstore(
         headers_to_split_on=headers_to_split_on,
-        file_pth=file_pth
+        file_pth=file_pth,
+        collection=collection
     )
 
+    # Near-identical queries reuse the final result of a previous run
+    embedding = ClientRegistry.get_embeddings(INDEX_CONFIG.get("embedding_model", "text-embedding-3-small"))
+    with timed("embed_query"):
+        query_embedding = embedding.embed_query(query)
+    index_version = GlobalIndexManager.index_version(collection)
+    cached_docs = SemanticRetrievalCache.lookup(query_embedding, filter, index_version, collection or "")
+    cache_result("retrieval", "miss" if cached_docs is None else "hit")
+    if cached_docs is not None:
+        print(f"\n✅ There are {len(cached_docs)} documents served from the retrieval cache....")
+        return cached_docs
+
+    pipeline = PipelineConfig.from_config()
     retrievers = Retrievers(
         chunked_doc=chunked_doc,
-        vectorstore=vectorstore
+        vectorstore=vectorstore,
+        pipeline=pipeline,
+        search=GlobalIndexManager.search_engine(vectorstore, chunked_doc, collection)
     )
 
-    final_docs = retrievers.ensemble_retrieve(query=query)
+    final_docs = retrievers.ensemble_retrieve(query=query, filter=filter, query_embedding=query_embedding)
+    SemanticRetrievalCache.store(query, query_embedding, filter, index_version, final_docs, collection or "")
     print(f"\n✅ There are {len(final_docs)} documents selected from RAG pipeline....")
     return final_docs
 
@@ -84,4 +103,4 @@ def ensemble_retrieve(retrievers, query: str) -> List[Document]:
     return mmr_selected
 
 def content_hash(text: str) -> str:
-    return hashlib.md5(text.strip().encode("utf-8")).hexdigest()
\ No newline at end of file
+    return hashlib.md5(text.strip().encode("utf-8")).hexdigest()
@@ -0,0 +1,172 @@
+"""
+Ingestion-time index of domain terms and acronyms, used to expand lexical (BM25) queries locally.
+
+Per document it records
+    acronyms   "RAG" <-> "retrieval augmented generation", from "long form (SHORT)" and
+               "SHORT (long form)" definitions (Schwartz & Hearst's letter matching)
+    variants   spellings of one method / dataset / metric name found by
+               `utils.signature_extractor.extract_entities` ("CIFAR-10", "cifar10", "CIFAR 10")
+
+At query time `expand` appends the expansions of every term the query mentions, so a query
+saying "RAG" also matches chunks that only spell out "retrieval-augmented generation",
+with no LLM rephrasing. Expansions are scoped to the documents a retrieval filter selects,
+since one acronym can mean different things in different papers.
+"""
+import re
+import json
+import hashlib
+from pathlib import Path
+from typing import Iterable, Optional
+from RAG.lexical_index import tokenize
+from utils.signature_extractor import extract_entities
+
+# "(RAG)" / "(LLMs)": 2-10 characters starting with a letter and containing a capital
+SHORT_FORM = re.compile(r"\(\s*([A-Za-z][A-Za-z0-9\-]{1,9})\s*\)")
+# "RAG (retrieval augmented generation)"
+SHORT_THEN_LONG = re.compile(r"\b([A-Z][A-Za-z0-9\-]{1,9})\s*\(([^()]{4,120})\)")
+WORD = re.compile(r"[\w\-]+")
+MAX_PHRASE_TOKENS = 8
+MAX_EXPANSIONS_PER_TERM = 3
+
+def _key(phrase: str) -> str:
+    return " ".join(tokenize(phrase))
+
+def best_long_form(short: str, candidate: str) -> Optional[str]:
+    """
+    Shortest suffix of `candidate` whose characters spell `short` in order, the first letter
+    starting a word (Schwartz & Hearst, 2003); None when there is none.
+    """
+    s, l = len(short) - 1, len(candidate) - 1
+    while s >= 0:
+        c = short[s].lower()
+        if not c.isalnum():
+            s -= 1
+            continue
+        while l >= 0 and (candidate[l].lower() != c or (s == 0 and l > 0 and candidate[l - 1].isalnum())):
+            l -= 1
+        if l < 0:
+            return None
+        l -= 1
+        s -= 1
+    long_form = candidate[candidate.rfind(" ", 0, l + 1) + 1:].strip()
+    # a long form spells the acronym out: more words than one, and not just the acronym again
+    if len(WORD.findall(long_form)) < 2 or long_form.lower() == short.lower():
+        return None
+    return long_form
+
+def extract_acronyms(text: str) -> dict[str, str]:
+    """Acronym -> long form for the definitions found in `text` (the first definition wins)."""
+    acronyms: dict[str, str] = {}
+    for m in SHORT_FORM.finditer(text):
+        short = m.group(1)
+        if not any(ch.isupper() for ch in short):
+            continue
+        if len(short) > 2 and short.endswith("s") and short[:-1].isupper():
+            short = short[:-1]  # "(LLMs)" defines LLM
+        letters = sum(ch.isalnum() for ch in short)
+        # at most min(|A| + 5, 2|A|) words before the parenthesis
+        words = WORD.findall(text[max(0, m.start() - 300):m.start()])
+        window = " ".join(words[-min(letters + 5, letters * 2):])
+        long_form = best_long_form(short, window)
+        if long_form:
+            acronyms.setdefault(short, long_form)
+    for m in SHORT_THEN_LONG.finditer(text):
+        short, inner = m.group(1), m.group(2)
+        if not short.isupper() or short in acronyms:
+            continue
+        long_form = best_long_form(short, inner.strip())
+        if long_form and long_form == inner.strip():
+            acronyms[short] = long_form
+    return acronyms
+
+def extract_variants(text: str) -> dict[str, list[str]]:
+    """Compact name (no spaces / hyphens) -> the spellings of it used in `text`."""
+    entities = extract_entities(text)
+    variants: dict[str, set[str]] = {}
+    lower = text.lower()
+    for name in {*entities["methods"], *entities["datasets"], *entities["metrics"]}:
+        compact = re.sub(r"[\s\-]", "", name)
+        # every spelling of the name with optional spaces / hyphens between its characters
+        pattern = r"\b" + r"[\s\-]?".join(map(re.escape, compact)) + r"\b"
+        forms = {_key(form) for form in re.findall(pattern, lower)}
+        if forms:
+            variants[compact] = sorted(forms)
+    return variants
+
+class TermIndex:
+    """
+    Per-document acronyms and term variants of one index version, plus the term -> expansions
+    lookup built from them. Entries of unchanged documents are reused from the previous version.
+    """
+    def __init__(self, documents: dict[str, dict]):
+        self.documents = documents
+        # term key -> {expansion key -> doc_ids defining it}
+        self.expansions: dict[str, dict[str, set[str]]] = {}
+        for doc_id, entry in documents.items():
+            for short, long_form in entry["acronyms"].items():
+                self._add(_key(short), _key(long_form), doc_id)
+                self._add(_key(short) + "s", _key(long_form), doc_id)  # "LLMs"
+                self._add(_key(long_form), _key(short), doc_id)
+            for compact, forms in entry["variants"].items():
+                for form in {compact, *forms}:
+                    for other in forms:
+                        self._add(_key(form), other, doc_id)
+
+    def _add(self, term: str, expansion: str, doc_id: str):
+        if term and expansion and term != expansion:
+            self.expansions.setdefault(term, {}).setdefault(expansion, set()).add(doc_id)
+
+    @staticmethod
+    def fingerprint(texts: Iterable[str]) -> str:
+        digest = hashlib.md5()
+        for text in texts:
+            digest.update(text.encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def build(cls, store, previous: Optional["TermIndex"] = None) -> "TermIndex":
+        """Index every document of a `ChunkStore`; documents whose texts are unchanged since `previous` are not re-scanned."""
+        rows_of: dict[str, list[int]] = {}
+        for row in range(len(store)):
+            rows_of.setdefault(store.get(row, "doc_id") or "", []).append(row)
+        documents = {}
+        for doc_id, rows in rows_of.items():
+            texts = [store.page_content(row) for row in rows]
+            fingerprint = cls.fingerprint(texts)
+            cached = previous.documents.get(doc_id) if previous is not None else None
+            if cached is not None and cached["fingerprint"] == fingerprint:
+                documents[doc_id] = cached
+                continue
+            text = "\n".join(texts)
+            documents[doc_id] = {
+                "fingerprint": fingerprint,
+                "acronyms": extract_acronyms(text),
+                "variants": extract_variants(text),
+            }
+        return cls(documents)
+
+    def save(self, path: Path):
+        path.write_text(json.dumps(self.documents))
+
+    @classmethod
+    def load(cls, path: Path) -> "TermIndex":
+        return cls(json.loads(path.read_text()))
+
+    def expand(self, query: str, doc_ids: Optional[set[str]] = None) -> str:
+        """`query` followed by the expansions of the terms it mentions (defined in `doc_ids`, or anywhere)."""
+        tokens = tokenize(query)
+        present = set(tokens)
+        added: list[str] = []
+        for n in range(min(MAX_PHRASE_TOKENS, len(tokens)), 0, -1):
+            for i in range(len(tokens) - n + 1):
+                candidates = self.expansions.get(" ".join(tokens[i:i + n]))
+                if not candidates:
+                    continue
+                usable = [
+                    expansion for expansion, defined_in in candidates.items()
+                    if doc_ids is None or defined_in & doc_ids
+                ]
+                for expansion in usable[:MAX_EXPANSIONS_PER_TERM]:
+                    if expansion not in added and not set(expansion.split()) <= present:
+                        added.append(expansion)
+        return f"{query} {' '.join(added)}" if added else query
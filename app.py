@@ -1,6 +1,6 @@
 import asyncio
 from main_graph.graph_state import InputState
-from main_graph.graph_builder import graph
+from main_graph.graph_builder import get_graph
 from utils.utils import new_uuid
 
 thread = {"configurable": {"thread_id": new_uuid()}}
@@ -8,6 +8,7 @@ thread = {"configurable": {"thread_id": new_uuid()}}
 async def process_query(query):
     inputState = InputState(messages=query, user_question=query)
     prev_node = None
+    graph = await get_graph()
     async for c, metadata in graph.astream(input=inputState, stream_mode="messages", config=thread):
         node = metadata.get("langgraph_node") or metadata.get("step")
         if node != prev_node:
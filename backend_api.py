@@ -5,20 +5,63 @@ Supports: WebSocket streaming, PDF upload, document management
 import asyncio
 import os
 import json
+import time
+import logging
 from pathlib import Path
+from contextlib import asynccontextmanager
 from typing import Optional
 from fastapi import FastAPI, WebSocket, UploadFile, File, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, JSONResponse
 import uvicorn
 from pydantic import BaseModel
 
 from main_graph.graph_state import InputState
-from main_graph.graph_builder import graph
-from utils.utils import new_uuid
+from main_graph.graph_builder import get_graph
+from main_graph.checkpointer import CheckpointStore
+from utils.utils import new_uuid, config
+from RAG.index_manager import GlobalIndexManager, DEFAULT_COLLECTION
+from RAG.retrieval_cache import SemanticRetrievalCache
+from main_graph.answer_cache import AnswerCache
+from utils.llm_client import LLMClient
+from utils.client_registry import ClientRegistry
+from utils.llm_scheduler import RateLimitScheduler
+from research_graph.decomposition_gate import DecompositionStats
+from utils.token_budget import TokenUsage
+from utils.instrumentation import Metrics, start_trace, monitor_event_loop_lag
+
+SERVING_CONFIG = config.get("serving", {})
+
+async def warm_up():
+    """Loads the index and the paper signature before the first request needs them."""
+    try:
+        await GlobalIndexManager.ensure_ready(HEADERS_TO_SPLIT_ON, config["retriever"]["file_pth"])
+        from utils.signature_extractor import get_paper_signature
+        await asyncio.to_thread(get_paper_signature)
+        print(f"🔥 Warm-up done: {GlobalIndexManager.status()}")
+    except Exception as e:
+        # requests retry the build; /health reports the failure meanwhile
+        logging.error(f"❌ Warm-up failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # event-loop lag gauge on /metrics (blocking work inside coroutines stalls every session)
+    lag_monitor = asyncio.create_task(
+        monitor_event_loop_lag(config.get("metrics", {}).get("event_loop_lag_interval", 0.1))
+    )
+    # in the background, so /health can answer (not ready) while the index is being built
+    warm_up_task = asyncio.create_task(warm_up()) if SERVING_CONFIG.get("warm_up", True) else None
+    yield
+    lag_monitor.cancel()
+    if warm_up_task is not None:
+        warm_up_task.cancel()
+    # Release pooled provider connections and the checkpoint database on shutdown
+    await ClientRegistry.aclose()
+    await CheckpointStore.aclose()
+
 
 # Initialize FastAPI app
-app = FastAPI(title="MultiAgenticRAG API", version="1.0.0")
+app = FastAPI(title="MultiAgenticRAG API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -32,12 +75,17 @@ app.add_middleware(
 # Configuration
 PAPERS_DIR = Path(__file__).parent / "papers"
 PAPERS_DIR.mkdir(exist_ok=True)
+HEADERS_TO_SPLIT_ON = config["retriever"]["headers_to_split_on"]
+# Nodes that push their output through the custom stream; their final message is not re-sent
+CUSTOM_STREAMED_NODES = {"replay_cached_answer", "respond"}
 
 
 class QueryRequest(BaseModel):
     """Request model for chat queries"""
     query: str
     thread_id: Optional[str] = None
+    # index collection to answer from (default: index.collection_name)
+    collection: Optional[str] = None
 
 
 class DocumentInfo(BaseModel):
@@ -49,16 +97,87 @@ class DocumentInfo(BaseModel):
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "ok", "service": "MultiAgenticRAG"}
+    """
+    Health check endpoint
+    Answers 503 while the startup warm-up has not made the index ready, so a load balancer
+    only routes to workers that can serve; without warm-up the index loads on the first request.
+    """
+    index = GlobalIndexManager.status()
+    collections = GlobalIndexManager.collections_status()
+    if SERVING_CONFIG.get("warm_up", True) and not index["ready"]:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "status": "starting" if index["state"] != "failed" else "failed",
+                "service": "MultiAgenticRAG",
+                "index": index,
+                "collections": collections
+            }
+        )
+    return {"status": "ok", "service": "MultiAgenticRAG", "index": index, "collections": collections}
+
+
+def invalidate_answers(collection: str):
+    """Drops the cached answers of one collection; the default one is cached under "" and under its name."""
+    name = GlobalIndexManager.collection(collection or None).name
+    AnswerCache.invalidate({collection, name, ""} if name == DEFAULT_COLLECTION else {collection, name})
+
+def resolve_collection(name: Optional[str], must_exist: bool = True) -> str:
+    """
+    Validated collection name ("" for the default one). Questions about an unknown collection are
+    rejected instead of silently creating an empty one; uploads may create it.
+    """
+    if not name:
+        return ""
+    try:
+        GlobalIndexManager.check_name(name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if must_exist and name not in GlobalIndexManager.collections_status() and name not in GlobalIndexManager.list_collections():
+        raise HTTPException(status_code=404, detail=f"Unknown collection {name!r}")
+    return name
+
+
+def papers_dir(collection: str) -> Path:
+    """Uploaded PDFs of the default collection live in papers/, the others in papers/<collection>/"""
+    return PAPERS_DIR / collection if collection else PAPERS_DIR
+
+
+@app.get("/collections")
+async def list_collections():
+    """Queryable collections, and the load state / estimated size of those used by this process"""
+    return {
+        "collections": await asyncio.to_thread(GlobalIndexManager.list_collections),
+        "loaded": GlobalIndexManager.collections_status()
+    }
+
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Hit/miss counters of the caches and LLM call savings"""
+    return {
+        "retrieval": SemanticRetrievalCache.stats(),
+        "answers": AnswerCache.stats(),
+        "llm": LLMClient.stats(),
+        "llm_scheduler": RateLimitScheduler.stats(),
+        "query_decomposition": DecompositionStats.stats(),
+        "token_usage": TokenUsage.stats()
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Node / stage / LLM timings, token counts and cache outcomes in the Prometheus text format"""
+    return PlainTextResponse(Metrics.render(), media_type="text/plain; version=0.0.4")
 
 
 @app.get("/documents", response_model=list[DocumentInfo])
-async def list_documents():
+async def list_documents(collection: Optional[str] = None):
     """List all uploaded PDF documents"""
     documents = []
-    if PAPERS_DIR.exists():
-        for pdf_file in PAPERS_DIR.glob("*.pdf"):
+    directory = papers_dir(resolve_collection(collection))
+    if directory.exists():
+        for pdf_file in directory.glob("*.pdf"):
             documents.append(
                 DocumentInfo(
                     filename=pdf_file.name,
@@ -70,12 +189,13 @@ async def list_documents():
 
 
 @app.get("/documents/{filename}")
-async def download_document(filename: str):
+async def download_document(filename: str, collection: Optional[str] = None):
     """Download a specific PDF document"""
-    file_path = PAPERS_DIR / filename
+    directory = papers_dir(resolve_collection(collection))
+    file_path = directory / filename
     
     # Security check: prevent path traversal
-    if not file_path.exists() or not str(file_path).startswith(str(PAPERS_DIR)):
+    if not file_path.exists() or not str(file_path).startswith(str(directory)):
         raise HTTPException(status_code=404, detail="Document not found")
     
     return FileResponse(
@@ -86,36 +206,60 @@ async def download_document(filename: str):
 
 
 @app.post("/documents/upload")
-async def upload_document(file: UploadFile = File(...)):
-    """Upload a new PDF document"""
+async def upload_document(file: UploadFile = File(...), collection: Optional[str] = None):
+    """Upload a new PDF document (into `collection`, which is created if needed)"""
     # Validate file type
     if not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    collection = resolve_collection(collection, must_exist=False)
     
     # Save file
-    file_path = PAPERS_DIR / file.filename
+    directory = papers_dir(collection)
+    directory.mkdir(exist_ok=True)
+    file_path = directory / file.filename
     content = await file.read()
     
     with open(file_path, "wb") as f:
         f.write(content)
+
+    # Incrementally insert the new chunks into the existing index
+    try:
+        num_chunks = await asyncio.to_thread(
+            GlobalIndexManager.add_document,
+            HEADERS_TO_SPLIT_ON,
+            str(file_path),
+            collection or None
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"File saved but indexing failed: {e}")
+    invalidate_answers(collection)
     
     return {
         "filename": file.filename,
+        "collection": collection or GlobalIndexManager.collection().name,
         "size": len(content),
+        "chunks_indexed": num_chunks,
         "message": "File uploaded successfully"
     }
 
 
 @app.delete("/documents/{filename}")
-async def delete_document(filename: str):
+async def delete_document(filename: str, collection: Optional[str] = None):
     """Delete a PDF document"""
-    file_path = PAPERS_DIR / filename
+    collection = resolve_collection(collection)
+    directory = papers_dir(collection)
+    file_path = directory / filename
     
-    if not file_path.exists() or not str(file_path).startswith(str(PAPERS_DIR)):
+    if not file_path.exists() or not str(file_path).startswith(str(directory)):
         raise HTTPException(status_code=404, detail="Document not found")
     
     file_path.unlink()
-    return {"message": f"Document {filename} deleted successfully"}
+    removed = await asyncio.to_thread(GlobalIndexManager.remove_document, filename, collection or None)
+    invalidate_answers(collection)
+    return {
+        "message": f"Document {filename} deleted successfully",
+        "chunks_removed": removed
+    }
 
 
 @app.websocket("/ws/chat")
@@ -124,15 +268,18 @@ async def websocket_chat_endpoint(websocket: WebSocket):
     WebSocket endpoint for real-time chat with streaming responses
     
     Message format:
-    - Client sends: {"query": "user question"}
+    - Client sends: {"query": "user question", "thread_id": optional id of a conversation to resume,
+                     "collection": optional index collection, kept for the rest of the connection}
     - Server streams: {"type": "node_enter", "node": "node_name"}
     -                 {"type": "content", "data": "streamed text"}
-    -                 {"type": "node_exit", "node": "node_name"}
-    -                 {"type": "done"}
+    -                 {"type": "progress", "stage": "plan" | "retrieve" | "post_process" | "distill" | "align", ...}
+    -                 {"type": "node_exit", "node": "node_name", "seconds": time since node_enter}
+    -                 {"type": "done", "trace": per-request timing summary}
     """
     await websocket.accept()
     thread_id = new_uuid()
     thread = {"configurable": {"thread_id": thread_id}}
+    collection = ""
     prev_node = None
     
     try:
@@ -141,6 +288,15 @@ async def websocket_chat_endpoint(websocket: WebSocket):
             data = await websocket.receive_text()
             message = json.loads(data)
             query = message.get("query", "").strip()
+            if message.get("thread_id"):
+                thread_id = message["thread_id"]
+                thread = {"configurable": {"thread_id": thread_id}}
+            if "collection" in message:
+                try:
+                    collection = resolve_collection(message["collection"])
+                except HTTPException as e:
+                    await websocket.send_json({"type": "error", "message": e.detail})
+                    continue
             
             if not query:
                 await websocket.send_json({
@@ -157,46 +313,67 @@ async def websocket_chat_endpoint(websocket: WebSocket):
             
             # Process query with streaming
             try:
-                input_state = InputState(messages=query, user_question=query)
+                input_state = InputState(messages=query, user_question=query, collection=collection)
                 prev_node = None
-                
-                async for c, metadata in graph.astream(
+                node_started = time.perf_counter()
+                trace = start_trace()
+                graph = await get_graph()
+
+                async def transition(node):
+                    nonlocal prev_node, node_started
+                    if node == prev_node:
+                        return
+                    if prev_node is not None:
+                        await websocket.send_json({
+                            "type": "node_exit",
+                            "node": prev_node,
+                            "seconds": round(time.perf_counter() - node_started, 4)
+                        })
+                    node_started = time.perf_counter()
+                    if node is not None:
+                        await websocket.send_json({
+                            "type": "node_enter",
+                            "node": node
+                        })
+                    prev_node = node
+
+                async for mode, payload in graph.astream(
                     input=input_state,
-                    stream_mode="messages",
+                    stream_mode=["messages", "custom", "tasks"],
                     config=thread
                 ):
+                    # A node starting: announce it before any token or progress event it writes
+                    if mode == "tasks":
+                        if "triggers" in payload:
+                            await transition(payload["name"])
+                        continue
+
+                    # Events written by nodes themselves (progress, respond tokens, replayed answers)
+                    if mode == "custom":
+                        await websocket.send_json(payload)
+                        continue
+
+                    c, metadata = payload
                     # Handle node transitions
                     node = metadata.get("langgraph_node") or metadata.get("step")
-                    if node != prev_node:
-                        if prev_node is not None:
-                            await websocket.send_json({
-                                "type": "node_exit",
-                                "node": prev_node
-                            })
-                        if node is not None:
-                            await websocket.send_json({
-                                "type": "node_enter",
-                                "node": node
-                            })
-                        prev_node = node
-                    
+                    await transition(node)
+
                     # Stream content
-                    if c.content:
+                    if c.content and node not in CUSTOM_STREAMED_NODES:
                         await websocket.send_json({
                             "type": "content",
                             "data": c.content
                         })
                 
                 # Final node exit
-                if prev_node is not None:
-                    await websocket.send_json({
-                        "type": "node_exit",
-                        "node": prev_node
-                    })
+                await transition(None)
                 
                 # Send completion signal
+                summary = trace.summary()
+                logging.info(f"⏱️ Trace for thread {thread_id}: {summary}")
                 await websocket.send_json({
-                    "type": "done"
+                    "type": "done",
+                    "trace": summary
                 })
                 
             except Exception as e:
@@ -223,10 +400,13 @@ async def post_chat(request: QueryRequest):
     
     thread_id = request.thread_id or new_uuid()
     thread = {"configurable": {"thread_id": thread_id}}
+    collection = resolve_collection(request.collection)
     
     try:
-        input_state = InputState(messages=query, user_question=query)
+        input_state = InputState(messages=query, user_question=query, collection=collection)
         response_content = ""
+        trace = start_trace()
+        graph = await get_graph()
         
         async for c, metadata in graph.astream(
             input=input_state,
@@ -238,7 +418,8 @@ async def post_chat(request: QueryRequest):
         
         return {
             "response": response_content,
-            "thread_id": thread_id
+            "thread_id": thread_id,
+            "trace": trace.summary()
         }
     
     except Exception as e:
@@ -246,9 +427,15 @@ async def post_chat(request: QueryRequest):
 
 
 if __name__ == "__main__":
+    serving = config.get("serving", {})
+    workers = serving.get("workers", 1)
+    if workers > 1 and serving.get("mode", "local") != "snapshot":
+        print("⚠️ Several workers need serving.mode: snapshot (each local worker would build its own index); using 1")
+        workers = 1
     uvicorn.run(
-        app,
+        "backend_api:app" if workers > 1 else app,
         host="0.0.0.0",
         port=8000,
-        reload=False
+        reload=False,
+        workers=workers
     )
@@ -0,0 +1,105 @@
+"""
+Seeded synthetic corpus with labeled queries, shaped like the chunked papers:
+chunks carry `source` / `doc_id` / header metadata and a stable `chunk_id`.
+
+Every chunk mixes words of its section topic, common filler words and a few
+words unique to it; a labeled query uses some of those unique words plus topic
+words, so its relevant chunk is known.
+"""
+import random
+from dataclasses import dataclass
+from langchain_core.documents import Document
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vo", "zi", "pa", "qu", "do", "fe", "gi", "ho", "ju"]
+SECTIONS = ["Introduction", "Method", "Memory Hierarchy", "Experiments", "Results", "Related Work", "Discussion", "Conclusion"]
+
+@dataclass
+class LabeledQuery:
+    query: str
+    relevant: set[str]  # chunk_ids
+
+def _vocabulary(rng: random.Random, size: int) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def synthetic_corpus(
+        num_chunks: int,
+        num_documents: int = 4,
+        words_per_chunk: int = 120,
+        duplicate_rate: float = 0.05,
+        seed: int = 0
+) -> list[Document]:
+    """`duplicate_rate` of the chunks are near-copies of an earlier chunk (overlapping splits)."""
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 4000 + 3 * num_chunks)
+    common, rest = vocabulary[:400], vocabulary[400:]
+    topics = {section: rest[i * 60:(i + 1) * 60] for i, section in enumerate(SECTIONS)}
+    unique_pool = rest[len(SECTIONS) * 60:]
+    rng.shuffle(unique_pool)
+
+    chunks = []
+    for idx in range(num_chunks):
+        doc_id = f"synthetic-{idx % num_documents}.pdf"
+        if chunks and rng.random() < duplicate_rate:
+            original = rng.choice(chunks)
+            words = original.page_content.split()
+            cut = rng.randint(1, max(len(words) // 10, 1))
+            text = " ".join(words[cut:] + rng.sample(common, cut))
+            metadata = {**original.metadata, "chunk_id": f"{doc_id}::{idx}", "duplicate_of": original.metadata["chunk_id"]}
+            chunks.append(Document(page_content=text, metadata=metadata))
+            continue
+        section = SECTIONS[idx % len(SECTIONS)]
+        unique = unique_pool[idx * 3:(idx + 1) * 3]
+        words = (
+            rng.choices(topics[section], k=words_per_chunk // 2)
+            + rng.choices(common, k=words_per_chunk // 2 - len(unique))
+            + unique
+        )
+        rng.shuffle(words)
+        sentences = [" ".join(words[i:i + 15]).capitalize() + "." for i in range(0, len(words), 15)]
+        chunks.append(Document(
+            page_content=" ".join(sentences),
+            metadata={
+                "source": doc_id,
+                "doc_id": doc_id,
+                "Header 1": section,
+                "chunk_id": f"{doc_id}::{idx}",
+                "unique_terms": " ".join(unique),
+            }
+        ))
+    return chunks
+
+def labeled_queries(chunks: list[Document], num_queries: int = 50, seed: int = 0) -> list[LabeledQuery]:
+    """Queries targeting single chunks; near-copies of the target count as relevant too."""
+    rng = random.Random(seed + 1)
+    originals = [c for c in chunks if "duplicate_of" not in c.metadata]
+    copies: dict[str, set[str]] = {}
+    for chunk in chunks:
+        if "duplicate_of" in chunk.metadata:
+            copies.setdefault(chunk.metadata["duplicate_of"], set()).add(chunk.metadata["chunk_id"])
+
+    queries = []
+    for target in rng.sample(originals, min(num_queries, len(originals))):
+        unique = target.metadata["unique_terms"].split()
+        words = [w.strip(".").lower() for w in target.page_content.split()]
+        topic_words = rng.sample([w for w in words if w not in unique], 4)
+        terms = rng.sample(unique, 2) + topic_words
+        rng.shuffle(terms)
+        chunk_id = target.metadata["chunk_id"]
+        queries.append(LabeledQuery(
+            query=f"What does the paper say about {' '.join(terms)}?",
+            relevant={chunk_id} | copies.get(chunk_id, set())
+        ))
+    return queries
+
+def synthetic_signature() -> dict:
+    """Paper signature matching the synthetic corpus, so routing / planning prompts stay realistic."""
+    return {
+        "title": "A Synthetic Paper for Offline Benchmarks",
+        "abstract": "Synthetic chunks with known relevance labels.",
+        "sections": [s.upper() for s in SECTIONS],
+        "entities": {"methods": [], "datasets": [], "metrics": []},
+        "topic": "synthetic benchmark corpus",
+    }
@@ -0,0 +1,45 @@
+"""
+Runs `backend_api` with the offline model stand-ins over a synthetic corpus, as the target of
+`benchmarks.load_test`.
+
+    python -m benchmarks.fake_server --port 8001 --corpus-size 1000 --llm-latency 0.2
+"""
+import argparse
+import tempfile
+from pathlib import Path
+import uvicorn
+from benchmarks.fakes import install_fakes
+from benchmarks.corpus import synthetic_corpus, synthetic_signature
+from utils.signature_extractor import set_paper_signature
+from RAG.index_manager import GlobalIndexManager
+from main_graph.checkpointer import CheckpointStore
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--corpus-size", type=int, default=1000)
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per simulated LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.01, help="seconds per simulated streamed token")
+    parser.add_argument("--embedding-latency", type=float, default=0.01)
+    parser.add_argument("--rerank-latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    install_fakes(
+        llm_latency=args.llm_latency,
+        token_latency=args.token_latency,
+        embedding_latency=args.embedding_latency,
+        rerank_latency=args.rerank_latency,
+    )
+    set_paper_signature(synthetic_signature())
+    with tempfile.TemporaryDirectory() as workdir:
+        GlobalIndexManager.load_chunks(
+            synthetic_corpus(args.corpus_size), persist_directory=str(Path(workdir) / "index")
+        )
+        CheckpointStore.path = str(Path(workdir) / "checkpoints.sqlite")
+        print(f"🧪 Serving fake backends over {args.corpus_size} synthetic chunks")
+        from backend_api import app
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
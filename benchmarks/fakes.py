@@ -0,0 +1,223 @@
+"""
+Deterministic, network-free stand-ins for the provider clients, with configurable simulated latency.
+
+    install_fakes(llm_latency=0.05, embedding_latency=0.005, rerank_latency=0.02)
+
+routes every `ClientRegistry` client (chat models, embeddings, reranker) to these classes.
+"""
+import re
+import ast
+import json
+import time
+import asyncio
+import hashlib
+from typing import Any, Callable, Optional, Sequence
+import numpy as np
+from pydantic import BaseModel
+from langchain_core.documents import Document
+from langchain_core.documents.compressor import BaseDocumentCompressor
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, convert_to_messages
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from utils.client_registry import ClientRegistry
+
+TOKEN_PATTERN = re.compile(r"\w+")
+FACT_SEPARATOR = "\n\n------------------------------------\n\n"
+
+def _terms(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+def _usage(messages: Sequence[BaseMessage], output: str) -> dict:
+    prompt_tokens = sum(len(str(m.content)) for m in messages) // 4
+    output_tokens = len(output) // 4
+    return {"input_tokens": prompt_tokens, "output_tokens": output_tokens, "total_tokens": prompt_tokens + output_tokens}
+
+def _last_user_text(messages: Sequence[BaseMessage]) -> str:
+    for message in reversed(messages):
+        if message.type == "human":
+            return str(message.content)
+    return str(messages[-1].content) if messages else ""
+
+def _section(text: str, marker: str) -> str:
+    return text.split(marker, 1)[1].strip() if marker in text else ""
+
+def _first_sentence(text: str) -> str:
+    sentence = re.split(r"(?<=[.!?])\s", text.strip(), maxsplit=1)[0]
+    return sentence[:300]
+
+# ---- structured outputs, keyed by schema name ----
+
+def _route(messages):
+    return {"logic": "benchmark: research query", "type": "research"}
+
+def _route_and_plan(messages):
+    question = _last_user_text(messages)
+    return {"logic": "benchmark: research query", "type": "research", "steps": [question], "target_documents": [""]}
+
+def _plan(messages):
+    question = _last_user_text(messages)
+    return {"steps": [question, f"Which results are reported about: {question}"], "target_documents": []}
+
+def _queries(messages):
+    return {"queries": [_last_user_text(messages)]}
+
+def _distill(messages):
+    document = _section(str(messages[0].content), "Document Content:")
+    return {"facts": [_first_sentence(part) for part in document.split(FACT_SEPARATOR) if part.strip()]}
+
+def _align(messages):
+    prompt = str(messages[0].content)
+    steps_line = _section(prompt, "Research Steps:").split("\n", 1)[0]
+    try:
+        num_steps = len(ast.literal_eval(steps_line))
+    except (ValueError, SyntaxError):
+        num_steps = 1
+    num_evidence = len(re.findall(r"Evidence \d+:", _section(prompt, "Evidence:")))
+    # every step cites (up to) the first three evidence items
+    return {"alignment": {str(i): list(range(1, min(num_evidence, 3) + 1)) for i in range(num_steps)}}
+
+def _paragraph(messages):
+    return {"paragraph": _first_sentence(_section(str(messages[0].content), "Evidence:"))}
+
+STRUCTURED_RESPONDERS: dict[str, Callable] = {
+    "Router": _route,
+    "RouterWithPlan": _route_and_plan,
+    "Plan": _plan,
+    "Queries": _queries,
+    "Distilled_doc": _distill,
+    "Alignment": _align,
+    "StepParagraph": _paragraph,
+}
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model answering instantly-computable, deterministic text after `latency` seconds.
+    Structured outputs come from `responders` (schema name -> fn(messages) -> dict),
+    falling back to `STRUCTURED_RESPONDERS`.
+    """
+    model_name: str = "fake-chat"
+    temperature: float = 0.0
+    latency: float = 0.0
+    token_latency: float = 0.0
+    responders: dict[str, Callable] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    def _reply(self, messages: Sequence[BaseMessage]) -> str:
+        return "Based on the evidence: " + _first_sentence(_last_user_text(messages) or "no question")
+
+    def _result(self, messages: Sequence[BaseMessage]) -> ChatResult:
+        text = self._reply(messages)
+        message = AIMessage(content=text, usage_metadata=_usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        text = self._reply(messages)
+        for word in text.split(" "):
+            if self.token_latency:
+                await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=word + " "))
+            if run_manager:
+                await run_manager.on_llm_new_token(chunk.text, chunk=chunk)
+            yield chunk
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=_usage(messages, text)))
+
+    def _structured(self, schema, messages: Any, include_raw: bool):
+        messages = convert_to_messages(messages)
+        name = getattr(schema, "__name__", str(schema))
+        responder = self.responders.get(name) or STRUCTURED_RESPONDERS.get(name)
+        if responder is None:
+            raise ValueError(f"No fake structured response registered for schema {name}")
+        payload = responder(messages)
+        parsed = schema(**payload) if isinstance(schema, type) and issubclass(schema, BaseModel) else payload
+        raw = AIMessage(content=json.dumps(payload), usage_metadata=_usage(messages, json.dumps(payload)))
+        return {"raw": raw, "parsed": parsed, "parsing_error": None} if include_raw else parsed
+
+    def with_structured_output(self, schema, *, include_raw: bool = False, **kwargs):
+        def call(messages):
+            time.sleep(self.latency)
+            return self._structured(schema, messages, include_raw)
+
+        async def acall(messages):
+            await asyncio.sleep(self.latency)
+            return self._structured(schema, messages, include_raw)
+
+        return RunnableLambda(call, afunc=acall)
+
+class HashingEmbeddings(Embeddings):
+    """Feature-hashed bag of words: texts sharing terms get similar vectors, with no model or network."""
+    def __init__(self, dimensions: int = 256, latency: float = 0.0):
+        self.dimensions = dimensions
+        self.latency = latency
+
+    def _embed(self, text: str) -> list[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for term in _terms(text):
+            digest = hashlib.md5(term.encode("utf-8")).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = float(np.linalg.norm(vector))
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        time.sleep(self.latency)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        time.sleep(self.latency)
+        return self._embed(text)
+
+class OverlapReranker(BaseDocumentCompressor):
+    """Reranks by the share of query terms found in the document (Cohere-style `relevance_score`)."""
+    top_n: int = 4
+    latency: float = 0.0
+
+    def compress_documents(self, documents: Sequence[Document], query: str, callbacks=None) -> Sequence[Document]:
+        time.sleep(self.latency)
+        query_terms = set(_terms(query))
+        scored = []
+        for doc in documents:
+            overlap = len(query_terms.intersection(_terms(doc.page_content))) / max(len(query_terms), 1)
+            scored.append(Document(
+                page_content=doc.page_content,
+                metadata={**doc.metadata, "relevance_score": overlap}
+            ))
+        scored.sort(key=lambda d: d.metadata["relevance_score"], reverse=True)
+        return scored[:self.top_n]
+
+def install_fakes(
+        llm_latency: float = 0.05,
+        token_latency: float = 0.0,
+        embedding_latency: float = 0.005,
+        rerank_latency: float = 0.02,
+        dimensions: int = 256,
+        responders: Optional[dict[str, Callable]] = None
+):
+    """Routes every `ClientRegistry` client to the deterministic stand-ins above."""
+    ClientRegistry.configure(
+        chat=lambda model, temperature, streaming: FakeChatModel(
+            model_name=model,
+            temperature=temperature,
+            latency=llm_latency,
+            token_latency=token_latency,
+            responders=responders or {}
+        ),
+        embeddings=lambda model: HashingEmbeddings(dimensions=dimensions, latency=embedding_latency),
+        reranker=lambda model, top_n: OverlapReranker(top_n=top_n, latency=rerank_latency),
+    )
+
+def uninstall_fakes():
+    ClientRegistry.configure()
@@ -0,0 +1,159 @@
+"""
+Load generator for `/ws/chat` and `/chat`.
+
+Opens N concurrent sessions per concurrency level, each sending `--turns` questions
+in sequence, and reports time-to-first-token, latency distribution, error rate and
+the server's event-loop lag (sampled from `/metrics`) as concurrency scales.
+
+    python -m benchmarks.fake_server --port 8001 &
+    python -m benchmarks.load_test --url http://127.0.0.1:8001 --concurrency 1 8 32
+"""
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+import httpx
+import numpy as np
+import websockets
+from benchmarks.corpus import synthetic_corpus, labeled_queries
+
+LAG_GAUGE = "event_loop_lag_last_seconds"
+
+class Recorder:
+    def __init__(self):
+        self.ttft: list[float] = []
+        self.latency: list[float] = []
+        self.errors: list[str] = []
+        self.lag: list[float] = []
+
+def _percentiles(values: list[float]) -> dict:
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"p50": p50 * 1000, "p95": p95 * 1000, "p99": p99 * 1000, "max": max(values) * 1000}
+
+async def websocket_session(ws_url: str, queries: list[str], recorder: Recorder, timeout: float):
+    finished = 0
+    try:
+        async with websockets.connect(ws_url, max_size=None) as ws:
+            for query in queries:
+                start = time.perf_counter()
+                first_token = None
+                await ws.send(json.dumps({"query": query}))
+                while True:
+                    event = json.loads(await asyncio.wait_for(ws.recv(), timeout))
+                    if event["type"] == "content" and first_token is None:
+                        first_token = time.perf_counter() - start
+                    elif event["type"] == "error":
+                        recorder.errors.append(event.get("message", "error"))
+                        break
+                    elif event["type"] == "done":
+                        recorder.latency.append(time.perf_counter() - start)
+                        recorder.ttft.append(first_token if first_token is not None else recorder.latency[-1])
+                        break
+                finished += 1
+    except Exception as e:
+        # the failing question and every one the session could not send
+        recorder.errors.extend([f"{type(e).__name__}: {e}"] * (len(queries) - finished))
+
+async def http_session(client: httpx.AsyncClient, url: str, queries: list[str], recorder: Recorder):
+    thread_id = None
+    for query in queries:
+        start = time.perf_counter()
+        try:
+            response = await client.post(f"{url}/chat", json={"query": query, "thread_id": thread_id})
+            response.raise_for_status()
+            thread_id = response.json().get("thread_id")
+        except Exception as e:
+            recorder.errors.append(f"{type(e).__name__}: {e}")
+            continue
+        # the HTTP endpoint is not streamed: the first token arrives with the whole answer
+        recorder.latency.append(time.perf_counter() - start)
+        recorder.ttft.append(recorder.latency[-1])
+
+async def sample_event_loop_lag(client: httpx.AsyncClient, url: str, recorder: Recorder, interval: float):
+    while True:
+        try:
+            text = (await client.get(f"{url}/metrics")).text
+            for line in text.splitlines():
+                if line.startswith(LAG_GAUGE + " "):
+                    recorder.lag.append(float(line.split()[1]))
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(interval)
+
+async def run_level(url: str, mode: str, concurrency: int, queries: list[str], turns: int, timeout: float) -> dict:
+    recorder = Recorder()
+    ws_url = url.replace("http", "ws", 1) + "/ws/chat"
+    limits = httpx.Limits(max_connections=concurrency + 1)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        sampler = asyncio.create_task(sample_event_loop_lag(client, url, recorder, interval=0.25))
+        sessions = []
+        for i in range(concurrency):
+            session_queries = [queries[(i * turns + t) % len(queries)] for t in range(turns)]
+            if mode == "ws":
+                sessions.append(websocket_session(ws_url, session_queries, recorder, timeout))
+            else:
+                sessions.append(http_session(client, url, session_queries, recorder))
+        start = time.perf_counter()
+        await asyncio.gather(*sessions)
+        wall = time.perf_counter() - start
+        sampler.cancel()
+
+    requests = concurrency * turns
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "requests": requests,
+        "completed": len(recorder.latency),
+        "error_rate": len(recorder.errors) / requests,
+        "throughput_rps": len(recorder.latency) / wall if wall else 0.0,
+        "ttft_ms": _percentiles(recorder.ttft),
+        "latency_ms": _percentiles(recorder.latency),
+        "event_loop_lag_ms": _percentiles(recorder.lag),
+        "sample_errors": sorted(set(recorder.errors))[:5],
+    }
+
+async def run_load_test(url: str, modes: list[str], levels: list[int], turns: int, corpus_size: int, timeout: float) -> list[dict]:
+    chunks = synthetic_corpus(corpus_size)
+    per_run = max(levels) * turns
+    queries = [q.query for q in labeled_queries(chunks, num_queries=per_run * len(modes) * len(levels))]
+    results = []
+    for run, (mode, concurrency) in enumerate((m, c) for m in modes for c in levels):
+        # fresh questions per run, so answers cached by an earlier run are not replayed
+        run_queries = queries[run * per_run:] + queries[:run * per_run]
+        result = await run_level(url, mode, concurrency, run_queries, turns, timeout)
+        results.append(result)
+        print(
+            f"🚦 {mode:<4} c={concurrency:<4} {result['throughput_rps']:6.2f} req/s  "
+            f"ttft p50={result['ttft_ms']['p50']:7.0f} p95={result['ttft_ms']['p95']:7.0f} ms  "
+            f"latency p50={result['latency_ms']['p50']:7.0f} p95={result['latency_ms']['p95']:7.0f} "
+            f"p99={result['latency_ms']['p99']:7.0f} ms  "
+            f"loop lag p95={result['event_loop_lag_ms']['p95']:6.1f} max={result['event_loop_lag_ms']['max']:6.1f} ms  "
+            f"errors={result['error_rate']:.1%}"
+        )
+        for error in result["sample_errors"]:
+            print(f"   ❌ {error}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8001")
+    parser.add_argument("--modes", nargs="+", choices=["ws", "http"], default=["ws", "http"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--turns", type=int, default=2, help="questions per session")
+    parser.add_argument("--corpus-size", type=int, default=1000, help="must match the fake server's corpus")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_load_test(
+        args.url, args.modes, args.concurrency, args.turns, args.corpus_size, args.timeout
+    ))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+"""
+Offline throughput / latency / memory benchmark of `retrieve()`, `researcher_graph` and the full graph.
+
+Provider clients are replaced by the deterministic stand-ins of `benchmarks.fakes`
+(simulated latency, no network) and the index is built over a synthetic corpus,
+so runs are comparable across commits.
+
+    python -m benchmarks.pipeline_benchmark --sizes 200 1000 --concurrency 1 8
+"""
+import gc
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from pathlib import Path
+import numpy as np
+from benchmarks.fakes import install_fakes
+from benchmarks.corpus import synthetic_corpus, labeled_queries, synthetic_signature
+from utils.signature_extractor import set_paper_signature
+from RAG.index_manager import GlobalIndexManager
+from RAG.retrieval_cache import SemanticRetrievalCache
+from RAG.retriever_utils import retrieve
+from main_graph.answer_cache import AnswerCache
+from utils.llm_client import LLMClient
+from utils.utils import config
+
+HEADERS_TO_SPLIT_ON = config["retriever"]["headers_to_split_on"]
+FILE_PTH = config["retriever"]["file_pth"]
+
+def reset_caches():
+    SemanticRetrievalCache.clear()
+    AnswerCache.invalidate()
+    LLMClient._cache.clear()
+
+async def _run_retrieve(query: str):
+    await asyncio.to_thread(retrieve, headers_to_split_on=HEADERS_TO_SPLIT_ON, query=query, file_pth=FILE_PTH)
+
+async def _run_research(query: str):
+    from research_graph.graph_builder import researcher_graph
+    await researcher_graph.ainvoke({"question": query})
+
+async def _run_graph(query: str):
+    from main_graph.graph_builder import graph
+    from main_graph.graph_state import InputState
+    await graph.ainvoke(
+        InputState(messages=query, user_question=query),
+        {"configurable": {"thread_id": f"bench-{time.perf_counter_ns()}"}}
+    )
+
+SCENARIOS = {"retrieve": _run_retrieve, "research": _run_research, "graph": _run_graph}
+
+async def run_scenario(name: str, queries: list[str], concurrency: int, trace_memory: bool) -> dict:
+    runner = SCENARIOS[name]
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(query: str):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await runner(query)
+            except Exception as e:
+                errors += 1
+                print(f"❌ {name} failed: {e}")
+                return
+            latencies.append(time.perf_counter() - start)
+
+    reset_caches()
+    gc.collect()
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(q) for q in queries))
+    wall = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+    if trace_memory:
+        tracemalloc.stop()
+
+    p50, p95 = np.percentile(latencies, [50, 95]) if latencies else (0.0, 0.0)
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "requests": len(queries),
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall else 0.0,
+        "p50_ms": p50 * 1000,
+        "p95_ms": p95 * 1000,
+        "peak_mib": peak / 2 ** 20,
+    }
+
+async def run_benchmark(
+        sizes: list[int],
+        concurrency_levels: list[int],
+        scenarios: list[str],
+        num_queries: int,
+        trace_memory: bool,
+        latencies: dict
+) -> list[dict]:
+    install_fakes(**latencies)
+    set_paper_signature(synthetic_signature())
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for size in sizes:
+            chunks = synthetic_corpus(size)
+            start = time.perf_counter()
+            GlobalIndexManager.load_chunks(chunks, persist_directory=str(Path(workdir) / f"index-{size}"))
+            print(f"\n🧠 Indexed {size} synthetic chunks in {time.perf_counter() - start:.2f}s")
+            queries = [q.query for q in labeled_queries(chunks, num_queries)]
+            for name in scenarios:
+                for concurrency in concurrency_levels:
+                    result = {"corpus_size": size, **await run_scenario(name, queries, concurrency, trace_memory)}
+                    results.append(result)
+                    print(
+                        f"⚡ {name:<9} size={size:<6} c={concurrency:<3} "
+                        f"{result['throughput_rps']:7.2f} req/s  p50={result['p50_ms']:8.1f} ms  "
+                        f"p95={result['p95_ms']:8.1f} ms  peak={result['peak_mib']:7.1f} MiB  errors={result['errors']}"
+                    )
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--queries", type=int, default=20, help="requests per scenario run")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per simulated LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="seconds per simulated streamed token")
+    parser.add_argument("--embedding-latency", type=float, default=0.005)
+    parser.add_argument("--rerank-latency", type=float, default=0.02)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc (it slows the run down)")
+    parser.add_argument("--json", help="write the results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmark(
+        sizes=args.sizes,
+        concurrency_levels=args.concurrency,
+        scenarios=args.scenarios,
+        num_queries=args.queries,
+        trace_memory=not args.no_memory,
+        latencies={
+            "llm_latency": args.llm_latency,
+            "token_latency": args.token_latency,
+            "embedding_latency": args.embedding_latency,
+            "rerank_latency": args.rerank_latency,
+        }
+    ))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\n💾 Results written to {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+import re
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+from utils.utils import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = config.get("answer_cache", {})
+
+class AnswerCache:
+    """
+    Final answers of the research path keyed by (collection, normalized question, index version).
+    Entries expire after `ttl_seconds` and are dropped explicitly on document upload/delete.
+    """
+    _entries: "OrderedDict[tuple, tuple[str, float]]" = OrderedDict()
+    _hits = 0
+    _misses = 0
+    _lock = threading.Lock()
+
+    enabled = CACHE_CONFIG.get("enabled", True)
+    ttl_seconds = CACHE_CONFIG.get("ttl_seconds", 3600)
+    max_entries = CACHE_CONFIG.get("max_entries", 256)
+
+    @staticmethod
+    def normalize(question: str) -> str:
+        question = re.sub(r"[^\w\s]", " ", question.lower())
+        return re.sub(r"\s+", " ", question).strip()
+
+    @classmethod
+    def get(cls, question: str, index_version: int, collection: str = "") -> Optional[str]:
+        if not cls.enabled:
+            return None
+        key = (collection, cls.normalize(question), index_version)
+        with cls._lock:
+            entry = cls._entries.get(key)
+            if entry is None or entry[1] < time.time():
+                cls._entries.pop(key, None)
+                cls._misses += 1
+                return None
+            cls._entries.move_to_end(key)
+            cls._hits += 1
+        logger.info(f"🎯 Answer cache hit: {question}")
+        return entry[0]
+
+    @classmethod
+    def put(cls, question: str, index_version: int, answer: str, collection: str = ""):
+        if not cls.enabled:
+            return
+        key = (collection, cls.normalize(question), index_version)
+        with cls._lock:
+            cls._entries[key] = (answer, time.time() + cls.ttl_seconds)
+            cls._entries.move_to_end(key)
+            while len(cls._entries) > cls.max_entries:
+                cls._entries.popitem(last=False)
+
+    @classmethod
+    def invalidate(cls, collections: Optional[set[str]] = None):
+        """Drops the entries of `collections` (every entry when None); other collections keep theirs."""
+        with cls._lock:
+            if collections is None:
+                dropped = len(cls._entries)
+                cls._entries.clear()
+            else:
+                stale = [key for key in cls._entries if key[0] in collections]
+                for key in stale:
+                    del cls._entries[key]
+                dropped = len(stale)
+        logger.info(f"♻️ Answer cache invalidated ({dropped} entries)")
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            total = cls._hits + cls._misses
+            return {
+                "hits": cls._hits,
+                "misses": cls._misses,
+                "hit_rate": cls._hits / total if total else 0.0,
+                "entries": len(cls._entries),
+            }
@@ -0,0 +1,47 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Optional
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from utils.utils import config
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_CONFIG = config.get("checkpoint", {})
+
+class CheckpointStore:
+    """
+    Process-wide SQLite checkpointer, so a `thread_id` keeps its conversation and
+    retrieved documents across turns (and restarts).
+    The saver binds to the running event loop, hence it is opened lazily on first use.
+    """
+    _conn: Optional[aiosqlite.Connection] = None
+    _saver: Optional[AsyncSqliteSaver] = None
+    _lock = asyncio.Lock()
+
+    enabled = CHECKPOINT_CONFIG.get("enabled", True)
+    path = CHECKPOINT_CONFIG.get("path", "./checkpoints.sqlite")
+
+    @classmethod
+    async def get(cls) -> Optional[AsyncSqliteSaver]:
+        if not cls.enabled:
+            return None
+        if cls._saver is not None:
+            return cls._saver
+        async with cls._lock:
+            if cls._saver is None:
+                Path(cls.path).parent.mkdir(parents=True, exist_ok=True)
+                cls._conn = await aiosqlite.connect(cls.path)
+                cls._saver = AsyncSqliteSaver(cls._conn)
+                await cls._saver.setup()
+                logger.info(f"💾 Opened checkpoint store at {cls.path}")
+            return cls._saver
+
+    @classmethod
+    async def aclose(cls):
+        async with cls._lock:
+            conn = cls._conn
+            cls._conn = cls._saver = None
+        if conn is not None:
+            await conn.close()
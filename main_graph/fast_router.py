@@ -0,0 +1,67 @@
+import re
+from typing import Optional
+from main_graph.graph_state import Router
+
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "what", "which", "how", "does", "did", "are",
+    "was", "were", "is", "its", "from", "into", "about", "can", "you", "your", "paper", "please",
+    "tell", "explain", "describe", "give", "show", "use", "used", "using", "between", "there",
+    "their", "they", "them", "have", "has", "will", "would", "could", "should", "more", "some",
+}
+GREETING_PATTERN = re.compile(r"^\s*(hi|hello|hey|thanks|thank you|good (morning|afternoon|evening))\b[\s!.,]*$", re.I)
+SIGNATURE_PATTERN = re.compile(
+    r"\b(abstract|title|(what|whats|what's) (is )?(this|the) paper about|summar(y|ize|ise) (of )?(this|the) paper|(list|what are) the sections)\b",
+    re.I
+)
+DETAIL_PATTERN = re.compile(
+    r"\b(which|results?|table|figure|dataset|metric|architecture|method|experiment|evaluat\w*|compare\w*|hyperparameter\w*|component\w*|mechanism|design\w*|implement\w*)\b",
+    re.I
+)
+
+def content_terms(text: str) -> set[str]:
+    return {
+        w for w in re.findall(r"[a-z0-9][a-z0-9\-]+", text.lower())
+        if len(w) >= 3 and w not in STOPWORDS
+    }
+
+class FastQueryRouter:
+    """
+    Local, LLM-free routing for queries that can be classified confidently:
+    - greetings / small talk                           → general
+    - questions answered by the paper signature itself → general
+    - detailed questions that overlap the paper's vocabulary (title, sections, entities, topic) → research
+    Anything else (including every potential `more_info` case) returns None and goes to the LLM router.
+    """
+    def __init__(self, paper_signature: dict, research_overlap: float = 0.5, min_research_terms: int = 2):
+        self.research_overlap = research_overlap
+        self.min_research_terms = min_research_terms
+        entities = paper_signature.get("entities") or {}
+        fields = [
+            paper_signature.get("title") or "",
+            paper_signature.get("topic") or "",
+            " ".join(paper_signature.get("sections") or []),
+            " ".join(term for values in entities.values() for term in values),
+        ]
+        self.vocabulary = content_terms(" ".join(fields))
+
+    def classify(self, question: str) -> Optional[Router]:
+        if GREETING_PATTERN.match(question):
+            return Router(type="general", logic="Greeting or small talk, no paper content needed.")
+        if SIGNATURE_PATTERN.search(question):
+            return Router(
+                type="general",
+                logic="Answerable directly from the paper signature (title / abstract / sections)."
+            )
+
+        terms = content_terms(question)
+        matched = terms & self.vocabulary
+        if (
+            DETAIL_PATTERN.search(question)
+            and len(matched) >= self.min_research_terms
+            and len(matched) / max(len(terms), 1) >= self.research_overlap
+        ):
+            return Router(
+                type="research",
+                logic=f"Paper-specific detail request matching paper terms: {', '.join(sorted(matched))}."
+            )
+        return None
@@ -1,16 +1,30 @@
 from langgraph.graph import StateGraph, END, START
 from langgraph.types import Send
+from langgraph.config import get_stream_writer
 from langchain_core.runnables import RunnableConfig
-from langchain_openai import ChatOpenAI
-from utils.utils import config, align_evidence_to_steps, write_step_from_evidence
-from utils.signature_extractor import paper_signature
-from utils.prompt import ROUTER_SYSTEM_PROMPT, CREATE_PLAN_SYSTEM_PROMPT, ANSWER_GENERAL_QUERY_SYSTEM_PROPT, GENERATE_RESPONSE_SYSTEM_PROMPT, DOCUMENT_DISTILLATION_SYSTEM_PROMPT
-from typing import Any, Literal, TypedDict, cast
+from utils.llm_client import LLMClient
+from utils.token_budget import truncate_to_budget, pack_by_score, group_by_score, MERGE_SEPARATOR
+from utils.utils import config, align_evidence_to_steps, stream_step_from_evidence
+from utils.signature_extractor import get_collection_signature, NO_SIGNATURE
+from utils.prompt import ROUTER_SYSTEM_PROMPT, ROUTE_AND_PLAN_SYSTEM_PROMPT, CREATE_PLAN_SYSTEM_PROMPT, ANSWER_GENERAL_QUERY_SYSTEM_PROPT, GENERATE_RESPONSE_SYSTEM_PROMPT, DOCUMENT_DISTILLATION_SYSTEM_PROMPT
+from typing import Any, Literal, Optional, TypedDict, cast
 import logging
-from main_graph.graph_state import InputState, AgentState, Router, DistillAgentState
+import asyncio
+import numpy as np
+from main_graph.graph_state import InputState, AgentState, Router, RouterWithPlan, DistillAgentState
 from research_graph.graph_builder import researcher_graph
-from RAG.post_processor import PostProcessor
+from RAG.post_processor import PostProcessor, near_duplicate_keep
+from RAG.index_manager import GlobalIndexManager, INDEX_CONFIG
+from RAG.retriever_utils import content_hash
+from main_graph.answer_cache import AnswerCache
+from main_graph.fast_router import FastQueryRouter
+from main_graph.speculative_retrieval import SpeculativeRetrieval
+from main_graph.checkpointer import CheckpointStore
+from main_graph.history import HISTORY_CONFIG, compact_history, conversation, is_follow_up
+from langchain_core.documents import Document
 from langchain_core.messages import AIMessage
+from utils.instrumentation import timed, timed_node, cache_result
+from utils.client_registry import ClientRegistry
 """
 user_input -> query_router -> general_query ----------------------------------------------------------------------------|
                     ^       -> research_query -> decompose_query_to_steps -> conduct_research -> check_finished -> response -> check_hallucination
@@ -22,28 +36,117 @@ user_input -> query_router -> general_query ------------------------------------
 
 MODEL_NAME = config["llm"]["gpt_4o_mini"]
 TEMPERATURE = config["llm"]["temperature"]
+REPLAY_CHUNK_SIZE = config.get("answer_cache", {}).get("replay_chunk_size", 64)
+ROUTER_CONFIG = config.get("router", {})
+TOKEN_BUDGET = config.get("token_budget", {})
+DEDUP_CONFIG = config.get("post_process", {})
+HEADERS_TO_SPLIT_ON = config["retriever"]["headers_to_split_on"]
+FILE_PTH = config["retriever"]["file_pth"]
 
-async def query_router(
-        state: AgentState, *, config: RunnableConfig
-) -> dict[str, Router]:
+_fast_router: Optional[tuple[dict, FastQueryRouter]] = None
+
+def get_fast_router(collection: str = "") -> Optional[FastQueryRouter]:
+    """
+    Local classifier over the paper signature (None when `router.fast_classifier` is off, or for
+    a collection other than the default one: the signature says nothing about its documents).
+    """
+    global _fast_router
+    if not ROUTER_CONFIG.get("fast_classifier", True):
+        return None
+    signature = get_collection_signature(collection)
+    if signature is None:
+        return None
+    if _fast_router is None or _fast_router[0] is not signature:
+        _fast_router = (signature, FastQueryRouter(
+            signature,
+            research_overlap=ROUTER_CONFIG.get("research_overlap", 0.5),
+            min_research_terms=ROUTER_CONFIG.get("min_research_terms", 2)
+        ))
+    return _fast_router[1]
+
+async def available_documents(collection: str) -> list[str]:
+    """doc_ids searchable in `collection`, loading it first (an unloaded collection lists none)."""
+    await GlobalIndexManager.ensure_ready(HEADERS_TO_SPLIT_ON, FILE_PTH, collection=collection or None)
+    return GlobalIndexManager.list_documents(collection)
+
+async def route_with_llm(conversation: list, collection: str = "") -> Router:
     system_prompt = ROUTER_SYSTEM_PROMPT.format(
-        paper_signature=paper_signature
+        paper_signature=get_collection_signature(collection) or NO_SIGNATURE
     )
-    model = ChatOpenAI(model=MODEL_NAME, temperature=TEMPERATURE, streaming=True)
+    model = LLMClient.get_chat_model(MODEL_NAME, temperature=TEMPERATURE, streaming=True)
     messages = [
         {"role": "system", "content": system_prompt}
-    ] + state.messages
+    ] + conversation
+    return cast(
+        Router, await LLMClient.structured_invoke(model, Router, messages, priority="interactive")
+    )
+
+async def route_and_plan_with_llm(conversation: list, documents: list[str], collection: str = "") -> RouterWithPlan:
+    """Single round-trip that returns the route and, for research queries, the plan."""
+    system_prompt = ROUTE_AND_PLAN_SYSTEM_PROMPT.format(
+        paper_signature=get_collection_signature(collection) or NO_SIGNATURE,
+        documents="\n".join(documents) or "(all indexed documents)"
+    )
+    model = LLMClient.get_chat_model(MODEL_NAME, temperature=TEMPERATURE, streaming=True)
+    messages = [
+        {"role": "system", "content": system_prompt}
+    ] + conversation
+    return cast(
+        RouterWithPlan, await LLMClient.structured_invoke(model, RouterWithPlan, messages, priority="interactive")
+    )
+
+async def query_router(
+        state: AgentState, *, config: RunnableConfig
+) -> dict[str, Router]:
     logging.info("---ANALYZE AND ROUTE QUERY---")
     logging.info(f"MESSAGES: {state.messages}")
-    response = cast(
-        Router, await model.with_structured_output(Router).ainvoke(messages)
-    )
-    return {"router": response}
+    plan = {"steps": [], "original_steps": [], "step_documents": []}
+    # per-turn evidence of a checkpointed thread starts empty
+    turn = {
+        "documents": "delete", "distilled_docs": "delete", "fact_scores": "delete",
+        "distilled_chunks": "delete", "post_processed_docs": []
+    }
+    fast_router = get_fast_router(state.collection)
+    response = fast_router.classify(state.user_question) if fast_router else None
+    speculation_key = SpeculativeRetrieval.key(config, state.user_question)
+    if response is None or response.type == "research":
+        # overlap retrieval for the raw question with the router / planner LLM latency
+        SpeculativeRetrieval.start(speculation_key, state.user_question, state.collection)
+    if response is not None:
+        logging.info(f"⚡ Routed locally as {response.type}: {response.logic}")
+    elif ROUTER_CONFIG.get("mode", "separate") == "combined":
+        documents = await available_documents(state.collection)
+        routed = await route_and_plan_with_llm(conversation(state), documents, state.collection)
+        response = Router(logic=routed.logic, type=routed.type)
+        if routed.type == "research" and routed.steps:
+            step_documents = scope_steps_to_documents(
+                routed.steps, routed.target_documents, documents
+            )
+            plan = {"steps": routed.steps, "original_steps": routed.steps, "step_documents": step_documents}
+    else:
+        response = await route_with_llm(conversation(state), state.collection)
+    cached_answer = ""
+    # answers to follow-ups depend on the thread's context, so only standalone questions use the cache
+    if response.type == "research" and not is_follow_up(state):
+        cached_answer = AnswerCache.get(
+            state.user_question, GlobalIndexManager.index_version(state.collection), state.collection
+        ) or ""
+        cache_result("answer", "hit" if cached_answer else "miss")
+    if response.type != "research" or cached_answer:
+        SpeculativeRetrieval.discard(speculation_key)
+    if plan["steps"] and not cached_answer:
+        get_stream_writer()({"type": "progress", "stage": "plan", "steps": plan["steps"]})
+    return {"router": response, "cached_answer": cached_answer, **plan, **turn}
 
-def router(state: AgentState) -> Literal["research_query", "general_query", "more_info"]:
+def router(state: AgentState) -> Literal["research_query", "planned_research", "general_query", "more_info", "cached_answer"]:
     type = state.router.type
     if type not in ["research", "general", "more_info"]:
         raise ValueError(f"Invalid return value: {type}")
+    if type == "research" and state.cached_answer:
+        return "cached_answer"
+    if type == "research" and state.steps:
+        # combined mode already produced the plan in query_router
+        return "planned_research"
     if type == "research":
         return "research_query"
     elif type == "general":
@@ -55,25 +158,50 @@ async def create_research_plan(
 ):
     class Plan(TypedDict):
         steps: list[str]
-    model = ChatOpenAI(model=MODEL_NAME, temperature=TEMPERATURE, streaming=True)
+        target_documents: list[str]
+    model = LLMClient.get_chat_model(MODEL_NAME, temperature=TEMPERATURE, streaming=True)
+    documents = await available_documents(state.collection)
     system_prompt = CREATE_PLAN_SYSTEM_PROMPT.format(
-        paper_signature=paper_signature
+        paper_signature=get_collection_signature(state.collection) or NO_SIGNATURE,
+        documents="\n".join(documents) or "(all indexed documents)"
     )
     messages = [
         {"role": "system", "content": system_prompt}
-    ] + state.messages
-    response = cast(Plan, await model.with_structured_output(Plan).ainvoke(messages))
+    ] + conversation(state)
+    response = cast(Plan, await LLMClient.structured_invoke(model, Plan, messages, priority="planning"))
+    step_documents = scope_steps_to_documents(
+        response["steps"], response.get("target_documents", []), documents
+    )
+    get_stream_writer()({"type": "progress", "stage": "plan", "steps": response["steps"]})
     # return {"steps": response["steps"], "documents": "delete"}
-    return {"steps": response["steps"], "original_steps": response["steps"]}
+    return {"steps": response["steps"], "original_steps": response["steps"], "step_documents": step_documents}
+
+def scope_steps_to_documents(steps: list[str], targets: list[str], available_documents: list[str]) -> list[str]:
+    """Align planner targets with steps, dropping documents that are not in the index."""
+    known = set(available_documents)
+    return [
+        targets[i] if i < len(targets) and targets[i] in known else ""
+        for i in range(len(steps))
+    ]
 
 async def conduct_research(
         state: AgentState, *, config: RunnableConfig
 ):
     step = state.steps[0]
-    result = await researcher_graph.ainvoke({"question": step})
-    docs = result["documents"]
+    target_document = state.step_documents[0] if state.step_documents else ""
+    filter = {"doc_id": target_document} if target_document else None
+    result = await researcher_graph.ainvoke({"question": step, "filter": filter, "collection": state.collection})
+    # documents retrieved speculatively for the raw question (only the first step finds them)
+    speculative_docs = await SpeculativeRetrieval.collect(
+        SpeculativeRetrieval.key(config, state.user_question)
+    )
+    if target_document:
+        # the speculative query ran unfiltered; keep only what the step is scoped to
+        speculative_docs = [d for d in speculative_docs if d.metadata.get("doc_id") == target_document]
+    docs = result["documents"] + speculative_docs
     logging.info(f"\n{len(docs)} documents retrieved in total for the step: {step}.")    
-    return {"documents": result["documents"], "steps": state.steps[1:]}
+    get_stream_writer()({"type": "progress", "stage": "retrieve", "step": step, "documents": len(docs)})
+    return {"documents": docs, "steps": state.steps[1:], "step_documents": state.step_documents[1:]}
 
 def check_research_finished(
         state: AgentState
@@ -85,19 +213,40 @@ def check_research_finished(
 async def distill_retrieved_document(
         state: DistillAgentState, *, config: RunnableConfig
 ):
-    model = ChatOpenAI(model=MODEL_NAME, temperature=0, streaming=False)
+    model = LLMClient.get_chat_model(MODEL_NAME, temperature=0, streaming=False)
     system_prompt = DOCUMENT_DISTILLATION_SYSTEM_PROMPT.format(
         user_query=state.user_question,
-        document=state.doc,
+        document=truncate_to_budget(state.doc, TOKEN_BUDGET.get("distill_document", 1500)),
     )
     messages = [
         {"role": "system", "content": system_prompt}
     ]
     class Distilled_doc(TypedDict):
         facts: list[str]
-    response = await model.with_structured_output(Distilled_doc).ainvoke(messages)
+    response = await LLMClient.structured_invoke(model, Distilled_doc, messages, priority="background")
     # print(f"📝 Distilled docs: {response}")
-    return {"distilled_docs": response["facts"]}
+    get_stream_writer()({"type": "progress", "stage": "distill", "facts": len(response["facts"])})
+    return {
+        "distilled_docs": response["facts"],
+        "fact_scores": [state.score] * len(response["facts"]),
+        "distilled_chunks": [{"chunks": state.chunks, "facts": response["facts"], "score": state.score}]
+    }
+
+def reusable_evidence(state: AgentState) -> list[dict]:
+    """
+    Distilled evidence kept from the thread's previous research turn on the same collection, when the
+    question is a follow-up that embeds close to that turn's (`history.reuse_min_similarity`); else [].
+    """
+    memory = state.thread_documents.get(state.collection)
+    if not memory or not memory["evidence"] or not is_follow_up(state):
+        return []
+    embeddings = ClientRegistry.get_embeddings(INDEX_CONFIG.get("embedding_model", "text-embedding-3-small"))
+    previous, current = np.asarray(embeddings.embed_documents([memory["question"], state.user_question]))
+    similarity = float(previous @ current / max(np.linalg.norm(previous) * np.linalg.norm(current), 1e-12))
+    if similarity < HISTORY_CONFIG.get("reuse_min_similarity", 0.5):
+        logging.info(f"Follow-up is unrelated to the previous turn (similarity {similarity:.2f}), not reusing its evidence")
+        return []
+    return memory["evidence"]
 
 def post_process_document(
         state: AgentState, *, config: RunnableConfig
@@ -105,14 +254,57 @@ def post_process_document(
     raw_retrieved_docs = state.documents
     print(f"😈 Number of retrieved documents before post process: {len(raw_retrieved_docs)}")
     post_processor = PostProcessor(raw_retrieved_docs=raw_retrieved_docs)
-    post_processed_docs = post_processor.dedup_by_content()
+    with timed("dedup"):
+        post_processed_docs = post_processor.dedup_by_content()
+        exact_unique = len(post_processed_docs)
+        if DEDUP_CONFIG.get("near_duplicates", True):
+            post_processed_docs = post_processor.dedup_near_duplicates(
+                threshold=DEDUP_CONFIG.get("chunk_threshold", 0.8),
+                shingle_size=DEDUP_CONFIG.get("chunk_shingle_size", 5)
+            )
+        logging.info(f"🧹 Collapsed {exact_unique - len(post_processed_docs)} near-duplicate chunks")
     print(f"🥳 Number of retrieved documents after post process: {len(post_processed_docs)}")
-    return {"post_processed_docs": post_processed_docs}
+    get_stream_writer()({"type": "progress", "stage": "post_process", "documents": len(post_processed_docs)})
+
+    # facts distilled for a related earlier turn compete again at a discounted score,
+    # and chunks they were distilled from are not sent to the LLM a second time
+    reuse_weight = HISTORY_CONFIG.get("reuse_score_weight", 0.5)
+    reused = [{**entry, "score": entry["score"] * reuse_weight} for entry in reusable_evidence(state)]
+    known = {chunk for entry in reused for chunk in entry["chunks"]}
+    fresh_docs = [d for d in post_processed_docs if content_hash(d.page_content) not in known]
+    if reused:
+        logging.info(
+            f"♻️ Reusing {len(reused)} distilled chunks of the previous turn; "
+            f"{len(post_processed_docs) - len(fresh_docs)} retrieved chunks skip distillation"
+        )
+    return {
+        "post_processed_docs": fresh_docs,
+        "distilled_docs": [fact for entry in reused for fact in entry["facts"]],
+        "fact_scores": [entry["score"] for entry in reused for _ in entry["facts"]],
+        "distilled_chunks": reused,
+    }
 
 def distill_document_in_parallel(state: AgentState):
+    docs = [d.page_content for d in state.post_processed_docs]
+    if not docs:
+        # every chunk was distilled in an earlier turn (or nothing was retrieved)
+        return "respond"
     print("🧐 Sending docuemnt to distill_retrieved_document node !!!!!!")
+    scores = [float(d.metadata.get("relevance_score") or 0.0) for d in state.post_processed_docs]
+    if TOKEN_BUDGET.get("merge_small_chunks", True):
+        # small chunks share one distillation call, up to the per-call budget
+        groups = group_by_score(docs, scores, TOKEN_BUDGET.get("distill_document", 1500))
+    else:
+        groups = [([i], score) for i, score in enumerate(scores)]
     return [
-        Send("distill_retrieved_document", DistillAgentState(doc=d.page_content, user_question=state.user_question, messages=state.messages)) for d in state.post_processed_docs
+        Send("distill_retrieved_document", DistillAgentState(
+            doc=MERGE_SEPARATOR.join(docs[i] for i in indices),
+            score=score,
+            chunks=[content_hash(docs[i]) for i in indices],
+            user_question=state.user_question,
+            messages=state.messages
+        ))
+        for indices, score in groups
     ]
 # async def respond(
 #         state: AgentState, *, config: RunnableConfig
@@ -138,54 +330,112 @@ def distill_document_in_parallel(state: AgentState):
 async def respond(
         state: AgentState, *, config: RunnableConfig
 ):
-    model = ChatOpenAI(model=MODEL_NAME, temperature=0)
+    model = LLMClient.get_chat_model(MODEL_NAME, temperature=0)
+    writer = get_stream_writer()
+
+    facts = state.distilled_docs
+    fact_scores = state.fact_scores if len(state.fact_scores) == len(facts) else None
+    if DEDUP_CONFIG.get("near_duplicates", True):
+        # the same fact is often distilled from several overlapping chunks
+        unique = near_duplicate_keep(
+            facts,
+            DEDUP_CONFIG.get("fact_threshold", 0.8),
+            DEDUP_CONFIG.get("fact_shingle_size", 3),
+            fact_scores
+        )
+        if len(unique) < len(facts):
+            logging.info(f"🧹 Dropped {len(facts) - len(unique)} near-duplicate facts")
+        facts = [facts[i] for i in unique]
+        fact_scores = [fact_scores[i] for i in unique] if fact_scores else None
 
-    evidence = state.distilled_docs
+    # keep the most relevant facts that fit the alignment prompt budget
+    kept = pack_by_score(facts, fact_scores, TOKEN_BUDGET.get("align_evidence", 3000))
+    evidence = [facts[i] for i in kept]
+    scores = [fact_scores[i] for i in kept] if fact_scores else None
+    if len(evidence) < len(facts):
+        logging.info(f"✂️ Packed {len(evidence)}/{len(facts)} facts into the alignment budget")
     steps = state.original_steps
     print("📝 The following text is distilled documents:")
     print("\n".join([f"Evidence {i+1}: {e}" for i, e in enumerate(evidence)]))
 
     # -------- Stage A: Evidence → Step alignment --------
+    writer({"type": "progress", "stage": "align", "steps": len(steps), "facts": len(evidence)})
     alignment = await align_evidence_to_steps(
         model=model,
         steps=steps,
         evidence=evidence
     )
 
-    # -------- Stage B: Evidence-first generation --------
+    # -------- Stage B: Evidence-first generation, streamed token by token --------
 
-    final_answer = "\n\n---------------------------------------------------\n\nTo answer your research inquire based on the submitted paper.\n\n"
+    final_answer = ""
+
+    def emit(text: str):
+        nonlocal final_answer
+        final_answer += text
+        writer({"type": "content", "data": text})
+
+    emit("\n\n---------------------------------------------------\n\nTo answer your research inquire based on the submitted paper.\n\n")
 
     for idx, step in enumerate(steps):
-        final_answer += f"### {step}\n"
+        emit(f"### {step}\n- ")
         ev_ids = alignment.get(str(idx), [])
-        selected_evidence = [evidence[i] for i in ev_ids]
+        # Evidence is numbered from 1 in the alignment prompt
+        ev_ids = [i for i in ev_ids if 1 <= i <= len(evidence)]
+        step_kept = pack_by_score(
+            [evidence[i - 1] for i in ev_ids],
+            [scores[i - 1] for i in ev_ids] if scores else None,
+            TOKEN_BUDGET.get("step_evidence", 1500)
+        )
+        ev_ids = [ev_ids[j] for j in step_kept]
+        selected_evidence = [evidence[i - 1] for i in ev_ids]
 
-        result = await write_step_from_evidence(
+        async for token in stream_step_from_evidence(
             model=model,
             step=step,
             selected_evidence=selected_evidence
-        )
+        ):
+            emit(token)
 
-        final_answer += "- " + result["paragraph"] + "\n\n"
-        final_answer += f"👉📝 supported by {ev_ids}\n\n"
-        final_answer += "---------------------------------------------------------------\n"
+        emit("\n\n")
+        emit(f"👉📝 supported by {ev_ids}\n\n")
+        emit("---------------------------------------------------------------\n")
+    if not is_follow_up(state):
+        AnswerCache.put(
+            state.user_question, GlobalIndexManager.index_version(state.collection), final_answer, state.collection
+        )
+    # the best distilled evidence of this turn is kept for follow-ups on the same collection
+    evidence = sorted(state.distilled_chunks, key=lambda e: e["score"], reverse=True)[:HISTORY_CONFIG.get("reuse_documents", 8)]
     return {
-        "messages": [AIMessage(content=final_answer)]
+        "messages": [AIMessage(content=final_answer)],
+        "thread_documents": {
+            **state.thread_documents, state.collection: {"question": state.user_question, "evidence": evidence}
+        }
     }
         
 
+async def replay_cached_answer(
+        state: AgentState, *, config: RunnableConfig
+):
+    """Short-circuit of the research path: stream a previously generated answer in chunks."""
+    writer = get_stream_writer()
+    answer = state.cached_answer
+    for start in range(0, len(answer), REPLAY_CHUNK_SIZE):
+        writer({"type": "content", "data": answer[start:start + REPLAY_CHUNK_SIZE]})
+        await asyncio.sleep(0)
+    return {"messages": [AIMessage(content=answer)]}
+
 async def answer_general_query(
         state: AgentState, *, config=RunnableConfig
 ):
-    model = ChatOpenAI(model=MODEL_NAME, temperature=TEMPERATURE, streaming=True)
+    model = LLMClient.get_chat_model(MODEL_NAME, temperature=TEMPERATURE, streaming=True)
     system_prompt = ANSWER_GENERAL_QUERY_SYSTEM_PROPT.format(
         logic=state.router.logic
     )
     messages = [
         {"role": "system", "content": system_prompt}
-    ] + state.messages
-    response = await model.ainvoke(messages)
+    ] + conversation(state)
+    response = await LLMClient.invoke(model, messages, priority="interactive")
     return {"messages": [response]}
 
 async def ask_for_more_info(
@@ -193,26 +443,47 @@ async def ask_for_more_info(
 ):
     pass
 builder = StateGraph(AgentState, input=InputState)
-builder.add_node(query_router)
-builder.add_node(create_research_plan)
-builder.add_node(answer_general_query)
-builder.add_node(ask_for_more_info)
-builder.add_node(conduct_research)
-builder.add_node(respond)
-builder.add_node(distill_retrieved_document)
-builder.add_node(post_process_document)
-
-builder.add_edge(START, "query_router")
+builder.add_node(timed_node(compact_history))
+builder.add_node(timed_node(query_router))
+builder.add_node(timed_node(create_research_plan))
+builder.add_node(timed_node(answer_general_query))
+builder.add_node(timed_node(ask_for_more_info))
+builder.add_node(timed_node(conduct_research))
+builder.add_node(timed_node(respond))
+builder.add_node(timed_node(distill_retrieved_document))
+builder.add_node(timed_node(post_process_document))
+builder.add_node(timed_node(replay_cached_answer))
+
+builder.add_edge(START, "compact_history")
+builder.add_edge("compact_history", "query_router")
 builder.add_conditional_edges(
     "query_router", 
     router, 
-    {"general_query": "answer_general_query", "research_query": "create_research_plan", "more_info": "ask_for_more_info"}
+    {
+        "general_query": "answer_general_query",
+        "research_query": "create_research_plan",
+        "planned_research": "conduct_research",
+        "more_info": "ask_for_more_info",
+        "cached_answer": "replay_cached_answer"
+    }
 )
 builder.add_edge("create_research_plan", "conduct_research")    
 builder.add_conditional_edges("conduct_research", check_research_finished)
 # Path map should reference node *names* (strings), not function objects.
-builder.add_conditional_edges("post_process_document", distill_document_in_parallel, path_map=["distill_retrieved_document"])
+builder.add_conditional_edges("post_process_document", distill_document_in_parallel, path_map=["distill_retrieved_document", "respond"])
 builder.add_edge("distill_retrieved_document", "respond")
 builder.add_edge("respond", END)
+builder.add_edge("replay_cached_answer", END)
+
+graph = builder.compile()
+_checkpointed_graph = None
 
-graph = builder.compile()
\ No newline at end of file
+async def get_graph():
+    """The main graph compiled with the SQLite thread checkpointer (the stateless `graph` when disabled)."""
+    global _checkpointed_graph
+    checkpointer = await CheckpointStore.get()
+    if checkpointer is None:
+        return graph
+    if _checkpointed_graph is None:
+        _checkpointed_graph = builder.compile(checkpointer=checkpointer)
+    return _checkpointed_graph
\ No newline at end of file
@@ -9,20 +9,41 @@ from pydantic import BaseModel
 class InputState:
     messages: Annotated[list[AnyMessage], add_messages]
     user_question: str
+    # index collection the question is answered from ("" = index.collection_name)
+    collection: str = ""
 
 class Router(BaseModel):
     logic: str
     type: Literal["more-info", "research", "general"]
 
+class RouterWithPlan(Router):
+    """Combined router + planner output; steps are only filled for research queries."""
+    steps: list[str] = []
+    target_documents: list[str] = []
+
 @dataclass(kw_only=True)
 class AgentState(InputState):
     router: Router = field(default_factory=lambda: Router(type="general", logic=""))
     steps: list[str] = field(default_factory=list)
     original_steps: list[str] = field(default_factory=list)
+    # doc_id each pending step is scoped to ("" = whole corpus), aligned with `steps`
+    step_documents: list[str] = field(default_factory=list)
     documents: Annotated[list[Document], reduce_docs] = field(default_factory=list)
     post_processed_docs: list[Document] = field(default_factory=list)
     distilled_docs: Annotated[list[str], reduce_docs] = field(default_factory=list)
+    # relevance score of the chunk each distilled fact came from, aligned with `distilled_docs`
+    fact_scores: Annotated[list[float], reduce_docs] = field(default_factory=list)
+    # one entry per distillation call: {"chunks": content hashes, "facts": [...], "score": best chunk score}
+    distilled_chunks: Annotated[list[dict], reduce_docs] = field(default_factory=list)
+    cached_answer: str = ""
+    # checkpointed across turns of a thread
+    summary: str = ""
+    # collection -> {"question": ..., "evidence": distilled_chunks entries}, reused by similar follow-ups
+    thread_documents: dict[str, dict] = field(default_factory=dict)
 
 @dataclass(kw_only=True)
 class DistillAgentState(InputState):
     doc: str
+    score: float = 0.0
+    # content hashes of the chunks merged into `doc`
+    chunks: list[str] = field(default_factory=list)
@@ -0,0 +1,60 @@
+import logging
+from langchain_core.messages import AnyMessage, HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.constants import TAG_NOSTREAM
+from utils.llm_client import LLMClient
+from utils.prompt import SUMMARIZE_HISTORY_SYSTEM_PROMPT
+from utils.token_budget import truncate_to_budget
+from utils.utils import config
+
+HISTORY_CONFIG = config.get("history", {})
+MODEL_NAME = config["llm"]["gpt_4o_mini"]
+
+def conversation(state) -> list:
+    """Messages sent to the router / planner: the running summary (if any) followed by the recent turns."""
+    if not state.summary:
+        return list(state.messages)
+    return [
+        SystemMessage(content=f"Summary of the earlier conversation:\n{state.summary}")
+    ] + list(state.messages)
+
+def is_follow_up(state) -> bool:
+    """True when the current question has earlier turns of the same thread before it."""
+    return bool(state.summary) or sum(isinstance(m, HumanMessage) for m in state.messages) > 1
+
+def _transcript(messages: list[AnyMessage]) -> str:
+    return "\n\n".join(f"{m.type}: {m.content}" for m in messages if m.content)
+
+async def compact_history(
+        state, *, config: RunnableConfig
+):
+    """
+    Keeps the checkpointed message history bounded: once it exceeds `history.max_messages`,
+    everything but the last `history.keep_last` messages is folded into `summary`
+    (or simply dropped when `history.summarize` is off).
+    """
+    messages = state.messages
+    if len(messages) <= HISTORY_CONFIG.get("max_messages", 12):
+        return {}
+    cut = max(len(messages) - HISTORY_CONFIG.get("keep_last", 4), 1)
+    # the retained window starts at a user turn and always contains the current question
+    while cut < len(messages) - 1 and not isinstance(messages[cut], HumanMessage):
+        cut += 1
+    old = messages[:cut]
+    summary = state.summary
+    if HISTORY_CONFIG.get("summarize", True):
+        model = LLMClient.get_chat_model(MODEL_NAME, temperature=0)
+        response = await LLMClient.invoke(
+            model,
+            [
+                {"role": "system", "content": SUMMARIZE_HISTORY_SYSTEM_PROMPT.format(summary=summary or "(empty)")},
+                {"role": "user", "content": truncate_to_budget(
+                    _transcript(old), HISTORY_CONFIG.get("summary_input_tokens", 3000)
+                )}
+            ],
+            priority="planning",
+            tags=[TAG_NOSTREAM]
+        )
+        summary = response.content
+    logging.info(f"🗜️ Compacted {len(old)} earlier messages of the thread")
+    return {"messages": [RemoveMessage(id=m.id) for m in old], "summary": summary}
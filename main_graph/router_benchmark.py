@@ -0,0 +1,79 @@
+"""
+Routing accuracy vs latency of the local FastQueryRouter against the LLM router.
+
+    python -m main_graph.router_benchmark
+"""
+import time
+import asyncio
+from main_graph.graph_builder import get_fast_router, route_with_llm
+from main_graph.fast_router import FastQueryRouter
+from utils.signature_extractor import get_paper_signature
+
+# Labeled queries for the bundled MemGPT paper (papers/2310.08560v2.pdf)
+LABELED_QUERIES = [
+    ("hello", "general"),
+    ("thanks!", "general"),
+    ("What is the abstract of the paper?", "general"),
+    ("What is this paper about?", "general"),
+    ("What is a transformer?", "general"),
+    ("What is the capital of France?", "general"),
+    ("How does MemGPT manage main context and external context in its memory hierarchy?", "research"),
+    ("Which datasets are used to evaluate MemGPT on document analysis?", "research"),
+    ("What results does MemGPT achieve on the multi-session chat consistency experiment?", "research"),
+    ("How does the queue manager evict messages when the context window overflows?", "research"),
+    ("How are function calls used by MemGPT to move data between memory tiers?", "research"),
+    ("What metrics are reported for the nested key-value retrieval task?", "research"),
+    ("Tell me more about the method.", "more_info"),
+    ("How does it work?", "more_info"),
+    # the examples of ROUTER_SYSTEM_PROMPT itself, as regression cases for the fast router
+    ("What is the abstract of the paper", "general"),
+    ("Can you tell me brifly of what the paper is about!", "general"),
+    ("What is a Transformer?", "general"),
+    ("How does the model work?", "more_info"),
+]
+
+def _same(predicted: str, expected: str) -> bool:
+    return predicted.replace("-", "_") == expected
+
+async def run_benchmark(router: FastQueryRouter = None):
+    router = router or get_fast_router() or FastQueryRouter(get_paper_signature())
+    covered = fast_correct = llm_correct = combined_correct = 0
+    misrouted = []
+    fast_ms, llm_ms, combined_ms = [], [], []
+
+    for query, expected in LABELED_QUERIES:
+        start = time.perf_counter()
+        fast = router.classify(query)
+        fast_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        llm = await route_with_llm([{"role": "user", "content": query}])
+        llm_ms.append((time.perf_counter() - start) * 1000)
+
+        llm_correct += _same(llm.type, expected)
+        if fast is not None:
+            covered += 1
+            fast_correct += _same(fast.type, expected)
+            if not _same(fast.type, expected):
+                misrouted.append(query)
+            combined_correct += _same(fast.type, expected)
+            combined_ms.append(fast_ms[-1])
+        else:
+            combined_correct += _same(llm.type, expected)
+            combined_ms.append(fast_ms[-1] + llm_ms[-1])
+        print(f"{expected:<10} fast={fast.type if fast else '-':<10} llm={llm.type:<10} {query}")
+
+    n = len(LABELED_QUERIES)
+    mean = lambda xs: sum(xs) / len(xs)
+    print(f"\n⚡ Fast router coverage: {covered}/{n}, accuracy on covered: {fast_correct / max(covered, 1):.2%}")
+    print(f"🧠 LLM router accuracy: {llm_correct / n:.2%}, mean latency {mean(llm_ms):.0f} ms")
+    print(f"🔀 Fast+fallback accuracy: {combined_correct / n:.2%}, mean latency {mean(combined_ms):.0f} ms")
+    print(f"💰 Latency saved per request: {mean(llm_ms) - mean(combined_ms):.0f} ms")
+    if misrouted:
+        print("❌ Misrouted by the fast router:\n" + "\n".join(f"   {q}" for q in misrouted))
+
+def main():
+    asyncio.run(run_benchmark())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Optional
+from langchain_core.documents import Document
+from RAG.retriever_utils import retrieve
+from RAG.index_manager import GlobalIndexManager
+from utils.utils import config
+
+logger = logging.getLogger(__name__)
+
+SPECULATIVE_CONFIG = config.get("speculative_retrieval", {})
+HEADERS_TO_SPLIT_ON = config["retriever"]["headers_to_split_on"]
+FILE_PTH = config["retriever"]["file_pth"]
+
+class SpeculativeRetrieval:
+    """
+    Retrieval for the raw user question started before routing/planning finish.
+    The task runs in a worker thread while the router and planner wait on the LLM;
+    `conduct_research` collects its documents, other routes discard it.
+    Running it also warms the index and the retrieval cache for the planned queries.
+    """
+    _tasks: "OrderedDict[str, asyncio.Task]" = OrderedDict()
+
+    enabled = SPECULATIVE_CONFIG.get("enabled", True)
+    max_pending = SPECULATIVE_CONFIG.get("max_pending", 64)
+
+    @staticmethod
+    def key(config, question: str) -> str:
+        thread_id = (config or {}).get("configurable", {}).get("thread_id")
+        return f"{thread_id}:{question}"
+
+    @classmethod
+    def start(cls, key: str, question: str, collection: str = ""):
+        if not cls.enabled or key in cls._tasks:
+            return
+        logger.info(f"🔮 Speculative retrieval started for: {question}")
+        cls._tasks[key] = asyncio.create_task(cls._retrieve(question, collection or None))
+        while len(cls._tasks) > cls.max_pending:
+            _, stale = cls._tasks.popitem(last=False)
+            stale.cancel()
+
+    @staticmethod
+    async def _retrieve(question: str, collection: Optional[str]) -> list[Document]:
+        # on a cold process, wait for the shared index build instead of parking a thread on its lock
+        await GlobalIndexManager.ensure_ready(HEADERS_TO_SPLIT_ON, FILE_PTH, collection=collection)
+        return await asyncio.to_thread(
+            retrieve,
+            headers_to_split_on=HEADERS_TO_SPLIT_ON,
+            query=question,
+            file_pth=FILE_PTH,
+            collection=collection
+        )
+
+    @classmethod
+    async def collect(cls, key: str) -> list[Document]:
+        task = cls._tasks.pop(key, None)
+        if task is None:
+            return []
+        try:
+            docs = await task
+        except Exception as e:
+            logger.warning(f"Speculative retrieval failed, ignoring it: {e}")
+            return []
+        logger.info(f"🔮 Merged {len(docs)} speculatively retrieved documents")
+        return docs
+
+    @classmethod
+    def discard(cls, key: str):
+        task = cls._tasks.pop(key, None)
+        if task is not None:
+            # the worker thread cannot be interrupted; its result is simply dropped
+            task.cancel()
@@ -0,0 +1,85 @@
+import re
+import threading
+
+# comparisons always involve several retrievals
+COMPARISON_PATTERN = re.compile(r"\b(vs\.?|versus|compar\w*|contrast\w*|differ\w*)\b", re.I)
+# where one ask could end and another begin
+CONJUNCTION_PATTERN = re.compile(r"\s*(?:;|,\s*(?:and|but)?|\band\b|\bas well as\b|\bbut\b|\balso\b)\s*", re.I)
+INTERROGATIVE_PATTERN = re.compile(r"^(what|which|how|why|when|where|who|whom|whose)\b", re.I)
+VERB_PATTERN = re.compile(
+    r"\b(is|are|was|were|be|been|do|does|did|can|could|should|would|will|has|have|had|"
+    r"explain|describe|list|summari[sz]e|show|give|report|define|outline|discuss|evaluate|identify|provide)\b",
+    re.I
+)
+
+def is_compound(question: str) -> bool:
+    """
+    Several asks in one step: more than one question mark, a comparison, or a conjunction joining
+    two clauses (the right one opens a new question, or both have a verb of their own).
+    "Which datasets and metrics are reported?" or "What learning rate, optimizer settings were used?"
+    share one clause and stay a single ask.
+    """
+    if question.count("?") > 1 or COMPARISON_PATTERN.search(question):
+        return True
+    parts = [part for part in CONJUNCTION_PATTERN.split(question.strip(" ?.")) if part]
+    return any(
+        INTERROGATIVE_PATTERN.match(right) or (VERB_PATTERN.search(left) and VERB_PATTERN.search(right))
+        for left, right in zip(parts, parts[1:])
+    )
+
+def needs_decomposition(question: str, max_words: int = 14) -> bool:
+    """
+    A step is sent to the LLM for decomposition only when it is long or compound (`is_compound`).
+    Short, single-ask steps are retrieved directly with their own text.
+    """
+    if len(question.split()) > max_words:
+        return True
+    return is_compound(question)
+
+class DecompositionStats:
+    """
+    LLM calls made / avoided by the decomposition gate and the latency they represent, in total
+    and per request (the request's `utils.instrumentation.Trace`; the last 1024 are kept).
+    """
+    _lock = threading.Lock()
+    _requests: dict = {}
+    llm_calls = 0
+    skipped = 0
+    llm_seconds = 0.0
+
+    @classmethod
+    def record(cls, request, skipped: bool, seconds: float = 0.0):
+        """`request` identifies the run (None when it is not traced: counted in the totals only)."""
+        with cls._lock:
+            if skipped:
+                cls.skipped += 1
+            else:
+                cls.llm_calls += 1
+                cls.llm_seconds += seconds
+            if request is None:
+                return
+            per_request = cls._requests.setdefault(request, {"llm_calls": 0, "skipped": 0})
+            per_request["skipped" if skipped else "llm_calls"] += 1
+            if len(cls._requests) > 1024:
+                cls._requests.pop(next(iter(cls._requests)))
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            avg_call = cls.llm_seconds / cls.llm_calls if cls.llm_calls else 0.0
+            requests = len(cls._requests)
+            saved = sum(r["skipped"] for r in cls._requests.values()) / requests if requests else 0.0
+            return {
+                "llm_calls": cls.llm_calls,
+                "skipped": cls.skipped,
+                "avg_llm_seconds": avg_call,
+                "estimated_seconds_saved": cls.skipped * avg_call,
+                "requests": requests,
+                "llm_calls_saved_per_request": saved,
+                "seconds_saved_per_request": saved * avg_call,
+            }
+
+    @classmethod
+    def request(cls, request) -> dict:
+        with cls._lock:
+            return dict(cls._requests.get(request, {"llm_calls": 0, "skipped": 0}))
@@ -1,20 +1,29 @@
 from research_graph.graph_state import ResearchAgentState, QueryState
 from langchain_core.runnables import RunnableConfig
 from utils.utils import config
-from langchain_openai import ChatOpenAI
+from utils.llm_client import LLMClient
 from utils.prompt import GENERATE_QUERIES_SYSTEM_PROMPT
 from typing import TypedDict, cast
 from langgraph.graph import StateGraph, START, END
-from utils.signature_extractor import paper_signature
+from utils.signature_extractor import get_collection_signature, NO_SIGNATURE
 from RAG.retriever_utils import retrieve
+from RAG.index_manager import GlobalIndexManager
 from langgraph.types import Send
+import asyncio
 import logging
+import time
+from research_graph.decomposition_gate import needs_decomposition, DecompositionStats
+from utils.instrumentation import timed_node, current_trace, count
 
 logger = logging.getLogger(__name__)
 
 MODEL_NAME = config["llm"]["gpt_4o_mini"]
 HEADERS_TO_SPLIT_ON = config["retriever"]["headers_to_split_on"]
 FILE_PTH = config["retriever"]["file_pth"]
+RESEARCH_CONFIG = config.get("research", {})
+SKIP_SIMPLE_STEPS = RESEARCH_CONFIG.get("skip_simple_decomposition", True)
+SIMPLE_STEP_MAX_WORDS = RESEARCH_CONFIG.get("simple_step_max_words", 14)
+MAX_QUERIES = RESEARCH_CONFIG.get("max_queries", 2)
 # TODO:
 #     Input (step == user_question)
 #     decomposite the single question / step to a more refined step
@@ -25,9 +34,18 @@ async def generate_queries(
 ):
     # Print node boundaries so subgraph activity is visible in console
     print(f"\n============ ENTER NODE (research_graph): generate_queries ============\n")
-    model = ChatOpenAI(model=MODEL_NAME, temperature=0)
+    trace = current_trace()
+    request = trace.id if trace is not None else None
+    if SKIP_SIMPLE_STEPS and not needs_decomposition(state.question, max_words=SIMPLE_STEP_MAX_WORDS):
+        DecompositionStats.record(request, skipped=True)
+        count("decomposition_skipped")
+        print(f"👉 Step is already a specific question, retrieving with it directly: {state.question}")
+        print("\n------------ END generate_queries ------------\n")
+        return {"queries": [state.question]}
+
+    model = LLMClient.get_chat_model(MODEL_NAME, temperature=0)
     system_prompt = GENERATE_QUERIES_SYSTEM_PROMPT.format(
-        paper_signature=paper_signature
+        paper_signature=get_collection_signature(state.collection) or NO_SIGNATURE
     )
     messages = [
         {"role": "system", "content": system_prompt},
@@ -35,31 +53,49 @@ async def generate_queries(
     ]
     class Queries(TypedDict):
         queries: list[str]
-    response = cast(Queries, await model.with_structured_output(Queries).ainvoke(messages))
-    print("👉 Here is generated queries:\n" + "\n".join(response['queries']) + f"\nbased on user question: {state.question}")
+    start = time.perf_counter()
+    response = cast(Queries, await LLMClient.structured_invoke(model, Queries, messages, priority="planning"))
+    DecompositionStats.record(request, skipped=False, seconds=time.perf_counter() - start)
+    count("decomposition_llm_calls")
+    # the prompt asks for at most 2 queries, but the model does not always comply
+    queries = response["queries"][:MAX_QUERIES] or [state.question]
+    print("👉 Here is generated queries:\n" + "\n".join(queries) + f"\nbased on user question: {state.question}")
     print("\n------------ END generate_queries ------------\n")
     # ensure returned shape is simple list of queries
-    return {"queries": response["queries"]}
+    return {"queries": queries}
 
 async def research_over_document(
     state: QueryState, *, config: RunnableConfig
 ):
     logger.info("---RETRIEVING DOCUMENTS---")
     logger.info(f"Query for the retrieval process: {state['query']}")
-    retrieved_docs = retrieve(headers_to_split_on=HEADERS_TO_SPLIT_ON, query=state['query'], file_pth=FILE_PTH)
+    # a cold burst of fan-outs awaits one index build; retrieval itself blocks, so it runs off the event loop
+    collection = state.get('collection') or None
+    await GlobalIndexManager.ensure_ready(HEADERS_TO_SPLIT_ON, FILE_PTH, collection=collection)
+    retrieved_docs = await asyncio.to_thread(
+        retrieve,
+        headers_to_split_on=HEADERS_TO_SPLIT_ON,
+        query=state['query'],
+        file_pth=FILE_PTH,
+        filter=state.get('filter'),
+        collection=collection
+    )
     print(f"👉 Research for query: {state['query']} completed..")
     return {"documents": retrieved_docs}
 
 def retrieve_in_parallell(
         state: ResearchAgentState
 ):
-    return [Send("research_over_document", QueryState(query=query)) for query in state.queries]
+    return [
+        Send("research_over_document", QueryState(query=query, filter=state.filter, collection=state.collection))
+        for query in state.queries
+    ]
     
 
 builder = StateGraph(ResearchAgentState)
-builder.add_node(generate_queries)
+builder.add_node(timed_node(generate_queries))
 builder.add_edge(START, "generate_queries")
-builder.add_node(research_over_document)
+builder.add_node(timed_node(research_over_document))
 builder.add_conditional_edges("generate_queries", retrieve_in_parallell, path_map=["research_over_document"])
 builder.add_edge("research_over_document", END)
 
@@ -1,5 +1,5 @@
 from langchain_core.documents import Document
-from typing import Annotated, TypedDict
+from typing import Annotated, Optional, TypedDict
 from dataclasses import dataclass, field
 from utils.utils import reduce_docs
 
@@ -7,7 +7,11 @@ from utils.utils import reduce_docs
 class ResearchAgentState:
     question: str
     queries: list[str] = field(default_factory=list)
+    filter: Optional[dict] = None
+    collection: str = ""
     documents: Annotated[list[Document], reduce_docs] = field(default_factory=list)
 
 class QueryState(TypedDict):
-    query: str
\ No newline at end of file
+    query: str
+    filter: Optional[dict]
+    collection: str
\ No newline at end of file
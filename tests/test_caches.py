@@ -0,0 +1,52 @@
+from collections import OrderedDict
+import pytest
+from langchain_core.documents import Document
+from RAG.retrieval_cache import SemanticRetrievalCache
+from main_graph.answer_cache import AnswerCache
+
+@pytest.fixture(autouse=True)
+def empty_caches(monkeypatch):
+    monkeypatch.setattr(SemanticRetrievalCache, "_entries", OrderedDict())
+    monkeypatch.setattr(SemanticRetrievalCache, "_index_versions", {})
+    monkeypatch.setattr(SemanticRetrievalCache, "enabled", True)
+    monkeypatch.setattr(SemanticRetrievalCache, "similarity_threshold", 0.95)
+    monkeypatch.setattr(AnswerCache, "_entries", OrderedDict())
+    monkeypatch.setattr(AnswerCache, "enabled", True)
+    monkeypatch.setattr(AnswerCache, "ttl_seconds", 3600)
+
+DOCS = [Document(page_content="cached chunk", metadata={"doc_id": "a.pdf"})]
+
+def test_retrieval_cache_hits_similar_queries_only():
+    SemanticRetrievalCache.store("what is rag", [1.0, 0.0], {"doc_id": "a.pdf"}, 1, DOCS, "papers")
+    assert SemanticRetrievalCache.lookup([0.99, 0.05], {"doc_id": "a.pdf"}, 1, "papers") == DOCS
+    assert SemanticRetrievalCache.lookup([0.0, 1.0], {"doc_id": "a.pdf"}, 1, "papers") is None
+    assert SemanticRetrievalCache.lookup([1.0, 0.0], {"doc_id": "b.pdf"}, 1, "papers") is None
+    assert SemanticRetrievalCache.lookup([1.0, 0.0], {"doc_id": "a.pdf"}, 1, "other") is None
+
+def test_retrieval_cache_drops_collection_on_new_index_version():
+    SemanticRetrievalCache.store("q", [1.0, 0.0], None, 1, DOCS, "papers")
+    SemanticRetrievalCache.store("q", [1.0, 0.0], None, 1, DOCS, "other")
+    assert SemanticRetrievalCache.lookup([1.0, 0.0], None, 2, "papers") is None
+    # the old version's entry is gone, not just skipped
+    assert SemanticRetrievalCache.lookup([1.0, 0.0], None, 1, "papers") is None
+    assert SemanticRetrievalCache.lookup([1.0, 0.0], None, 1, "other") == DOCS
+
+def test_answer_cache_keys_on_normalized_question_and_version():
+    AnswerCache.put("What is RAG?", 1, "an answer", "papers")
+    assert AnswerCache.get("what is  rag", 1, "papers") == "an answer"
+    assert AnswerCache.get("What is RAG?", 2, "papers") is None
+    assert AnswerCache.get("What is RAG?", 1, "other") is None
+
+def test_answer_cache_invalidates_selected_collections():
+    AnswerCache.put("q", 1, "a", "papers")
+    AnswerCache.put("q", 1, "b", "other")
+    AnswerCache.invalidate({"papers"})
+    assert AnswerCache.get("q", 1, "papers") is None
+    assert AnswerCache.get("q", 1, "other") == "b"
+    AnswerCache.invalidate()
+    assert AnswerCache.get("q", 1, "other") is None
+
+def test_answer_cache_entries_expire(monkeypatch):
+    monkeypatch.setattr(AnswerCache, "ttl_seconds", -1)
+    AnswerCache.put("q", 1, "a")
+    assert AnswerCache.get("q", 1) is None
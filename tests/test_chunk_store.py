@@ -0,0 +1,64 @@
+import numpy as np
+from langchain_core.documents import Document
+from RAG.chunk_store import ChunkStore
+
+def make_documents(n: int = 12) -> list[Document]:
+    return [
+        Document(
+            page_content=f"chunk {i} über text",
+            metadata={"doc_id": f"paper-{i % 3}.pdf", "chunk_id": f"paper-{i % 3}.pdf::{i}", "Header 2": "Method" if i % 2 else "Results"},
+        )
+        for i in range(n)
+    ]
+
+def test_offsets_address_utf8_texts():
+    documents = make_documents()
+    store = ChunkStore.from_documents(documents)
+    assert len(store) == len(documents)
+    assert store.offsets[0] == 0
+    assert np.all(np.diff(store.offsets) == [len(d.page_content.encode("utf-8")) for d in documents])
+    assert store.texts() == [d.page_content for d in documents]
+
+def test_low_cardinality_keys_are_interned(monkeypatch):
+    monkeypatch.setattr(ChunkStore, "max_interned_values", 4)
+    store = ChunkStore.from_documents(make_documents())
+    tables = dict(zip(store.keys, store.values))
+    assert sorted(tables["doc_id"]) == ["paper-0.pdf", "paper-1.pdf", "paper-2.pdf"]
+    assert sorted(tables["Header 2"]) == ["Method", "Results"]
+    # unique chunk ids are not interned; they live in the text buffer
+    assert tables["chunk_id"] is None
+    assert store.codes.shape == (12, 2) and store.spans.shape == (12, 1, 2)
+    assert store.chunk_id(7) == "paper-1.pdf::7"
+
+def test_round_trip_documents(tmp_path, monkeypatch):
+    monkeypatch.setattr(ChunkStore, "max_interned_values", 4)
+    documents = make_documents() + [Document(page_content="no metadata")]
+    store = ChunkStore.from_documents(documents)
+    store.save(tmp_path)
+    for loaded in (store, ChunkStore.load(tmp_path), ChunkStore.load(tmp_path, mmap=False)):
+        assert [(d.page_content, d.metadata) for d in loaded] == [(d.page_content, d.metadata) for d in documents]
+        assert loaded.get(12, "doc_id", "missing") == "missing"
+        assert loaded.rows_by_id()["paper-2.pdf::5"] == 5
+        assert sorted(loaded.distinct("doc_id")) == ["paper-0.pdf", "paper-1.pdf", "paper-2.pdf"]
+
+def test_ids_are_stamped_as_chunk_ids():
+    store = ChunkStore.from_documents(make_documents(2), ids=["a", "b"])
+    assert store.ids() == ["a", "b"]
+
+def test_filter_masks_match_metadata(monkeypatch):
+    monkeypatch.setattr(ChunkStore, "max_interned_values", 4)
+    store = ChunkStore.from_documents(make_documents())
+    assert store.matches(None) is None
+    assert store.matches({"doc_id": "paper-1.pdf"}).nonzero()[0].tolist() == [1, 4, 7, 10]
+    assert store.matches({"doc_id": ["paper-1.pdf", "paper-2.pdf"], "Header 2": "Method"}).nonzero()[0].tolist() == [1, 5, 7, 11]
+    assert store.matches({"chunk_id": "paper-0.pdf::3"}).nonzero()[0].tolist() == [3]
+    assert not store.matches({"Header 3": "Intro"}).any()
+    assert store.matches({"Header 3": None}).all()
+    where = {"$and": [{"doc_id": {"$in": ["paper-0.pdf"]}}, {"Header 2": "Results"}]}
+    assert store.matches_where(where).nonzero()[0].tolist() == [0, 6]
+
+def test_without_drops_and_appends():
+    store = ChunkStore.from_documents(make_documents())
+    updated = store.without({"doc_id": "paper-0.pdf"}, [Document(page_content="new", metadata={"doc_id": "paper-9.pdf"})])
+    assert len(updated) == 9
+    assert sorted(updated.distinct("doc_id")) == ["paper-1.pdf", "paper-2.pdf", "paper-9.pdf"]
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+from langchain_community.retrievers import BM25Retriever
+from RAG.lexical_index import LexicalIndex, tokenize
+
+CORPUS = [
+    "retrieval augmented generation grounds answers in documents",
+    "dense retrieval embeds queries and documents",
+    "the transformer uses attention",
+    "bm25 ranks documents by term frequency and inverse document frequency",
+    "attention is all you need",
+    "sparse retrieval with bm25 remains a strong baseline for retrieval",
+    "convolutional networks classify images",
+    "we evaluate on natural questions and trivia qa",
+    "a learned reranker reorders retrieved passages",
+    "the attention transformer baseline is trained on documents",
+]
+
+@pytest.mark.parametrize("query", ["retrieval documents", "attention", "bm25 baseline", "attention transformer baseline", "unknown words"])
+def test_scores_match_bm25_retriever(query):
+    index = LexicalIndex.build(CORPUS)
+    reference = BM25Retriever.from_texts(CORPUS, preprocess_func=tokenize).vectorizer
+    assert index.scores(query).tolist() == pytest.approx(reference.get_scores(tokenize(query)).tolist(), rel=1e-5)
+
+def test_search_ranks_like_bm25_retriever():
+    index = LexicalIndex.build(CORPUS)
+    retriever = BM25Retriever.from_texts(CORPUS, preprocess_func=tokenize, k=3)
+    rows = [row for row, _ in index.search("attention transformer baseline", k=3)]
+    assert [CORPUS[row] for row in rows] == [d.page_content for d in retriever.invoke("attention transformer baseline")]
+
+def test_search_respects_row_mask(tmp_path):
+    index = LexicalIndex.build(CORPUS)
+    index.save(tmp_path)
+    loaded = LexicalIndex.load(tmp_path)
+    allowed = np.zeros(len(CORPUS), dtype=bool)
+    allowed[[1, 2]] = True
+    assert [row for row, _ in loaded.search("retrieval", k=3, allowed=allowed)] == [1, 2]
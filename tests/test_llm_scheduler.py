@@ -0,0 +1,59 @@
+import asyncio
+import time
+import pytest
+from utils.llm_scheduler import RateLimitScheduler, TokenBucket
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(600)  # 10 per second
+    bucket.consume(600)
+    assert bucket.wait_time(5) == pytest.approx(0.5, abs=0.05)
+    # requests above capacity wait for a full bucket instead of forever
+    assert bucket.wait_time(10_000) == pytest.approx(60, abs=0.1)
+
+def test_token_bucket_adjust_refunds_and_charges():
+    bucket = TokenBucket(1000)
+    bucket.consume(500)
+    bucket.adjust(500, 100)
+    assert bucket.level == pytest.approx(900, abs=1)
+    bucket.adjust(100, 300)
+    assert bucket.level == pytest.approx(700, abs=1)
+    bucket.adjust(10_000, 0)
+    assert bucket.level == 1000
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(RateLimitScheduler, "enabled", True)
+    monkeypatch.setattr(RateLimitScheduler, "_requests", TokenBucket(600))
+    monkeypatch.setattr(RateLimitScheduler, "_tokens", TokenBucket(100_000))
+    monkeypatch.setattr(RateLimitScheduler, "_queue", [])
+    monkeypatch.setattr(RateLimitScheduler, "_virtual_time", 0)
+    monkeypatch.setattr(RateLimitScheduler, "_session_tags", {})
+    monkeypatch.setattr(RateLimitScheduler, "_cond", None)
+    return RateLimitScheduler
+
+def test_priority_then_round_robin_across_sessions(scheduler):
+    order = []
+
+    async def call(name, priority, session):
+        await scheduler.acquire(priority=priority, session=session)
+        order.append(name)
+
+    async def main():
+        # an empty request bucket queues every call; one is released every 0.1s
+        scheduler._requests.level, scheduler._requests.updated = 0.0, time.monotonic()
+        calls = [
+            call("a1", "background", "a"), call("a2", "background", "a"), call("a3", "background", "a"),
+            call("b1", "background", "b"), call("c1", "interactive", "c"),
+        ]
+        await asyncio.gather(*calls)
+
+    asyncio.run(main())
+    assert order == ["c1", "a1", "b1", "a2", "a3"]
+
+def test_settle_replaces_estimate_with_usage(scheduler):
+    async def main():
+        await scheduler.acquire(tokens=5_000)
+        await scheduler.settle(5_000, 1_200)
+
+    asyncio.run(main())
+    assert scheduler._tokens.level == pytest.approx(100_000 - 1_200, abs=5)
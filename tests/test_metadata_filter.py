@@ -0,0 +1,25 @@
+from RAG.metadata_filter import matches_filter, matches_where, to_chroma_where
+
+METADATA = {"doc_id": "a.pdf", "Header 2": "Method", "page": 3}
+
+def test_equality_and_in():
+    assert matches_where(METADATA, {"doc_id": "a.pdf"})
+    assert not matches_where(METADATA, {"doc_id": "b.pdf"})
+    assert matches_where(METADATA, {"page": {"$in": [1, 3]}})
+    assert not matches_where(METADATA, {"page": {"$in": [1, 2]}})
+
+def test_and_requires_every_clause():
+    assert matches_where(METADATA, {"$and": [{"doc_id": "a.pdf"}, {"Header 2": {"$in": ["Method"]}}]})
+    assert not matches_where(METADATA, {"$and": [{"doc_id": "a.pdf"}, {"Header 2": "Results"}]})
+
+def test_missing_key_reads_as_none():
+    assert matches_where(METADATA, {"Header 3": None})
+    assert not matches_where(METADATA, {"Header 3": "Intro"})
+
+def test_empty_clause_matches_everything():
+    assert matches_where(METADATA, None) and matches_where(METADATA, {})
+
+def test_agrees_with_matches_filter_through_chroma_where():
+    filters = [{"doc_id": "a.pdf"}, {"doc_id": ["b.pdf", "a.pdf"], "page": 3}, {"page": [1, 2]}, {"Header 2": "Results"}]
+    for filter in filters:
+        assert matches_where(METADATA, to_chroma_where(filter)) == matches_filter(METADATA, filter)
@@ -0,0 +1,15 @@
+from RAG.post_processor import near_duplicate_keep
+
+BASE = "the model is trained with a contrastive loss on pairs of queries and relevant passages"
+
+def test_drops_exact_and_contained_duplicates():
+    texts = [BASE, "an unrelated chunk about evaluation metrics and results on the benchmark", BASE, "intro " + BASE + " more words"]
+    assert near_duplicate_keep(texts, threshold=0.8) == [0, 1]
+
+def test_keeps_highest_scoring_duplicate_in_original_order():
+    texts = ["other text about datasets used for training the retriever model", BASE, BASE + " extra"]
+    assert near_duplicate_keep(texts, threshold=0.8, scores=[0.5, 0.1, 0.9]) == [0, 2]
+
+def test_distinct_texts_are_kept():
+    texts = ["alpha beta gamma delta epsilon zeta", "one two three four five six", "red green blue cyan magenta yellow"]
+    assert near_duplicate_keep(texts, threshold=0.8) == [0, 1, 2]
@@ -0,0 +1,34 @@
+from langchain_core.documents import Document
+from RAG.chunk_store import ChunkStore
+from RAG.term_index import TermIndex, extract_acronyms
+
+def test_extracts_both_definition_orders():
+    text = "We use retrieval augmented generation (RAG). LLM (large language model) outputs are grounded."
+    assert extract_acronyms(text) == {"RAG": "retrieval augmented generation", "LLM": "large language model"}
+
+def test_plural_acronym_defines_singular():
+    assert extract_acronyms("Large language models (LLMs) are used.") == {"LLM": "Large language models"}
+
+def build_index() -> TermIndex:
+    store = ChunkStore.from_documents([
+        Document(page_content="We study retrieval augmented generation (RAG) for QA.", metadata={"doc_id": "a.pdf"}),
+        Document(page_content="Results of RAG on benchmarks.", metadata={"doc_id": "a.pdf"}),
+        Document(page_content="Reinforcement learning (RL) with rewards.", metadata={"doc_id": "b.pdf"}),
+    ])
+    return TermIndex.build(store)
+
+def test_expands_acronym_both_ways():
+    index = build_index()
+    assert index.expand("How well does RAG work?") == "How well does RAG work? retrieval augmented generation"
+    assert index.expand("retrieval augmented generation results").endswith(" rag")
+
+def test_expansion_is_scoped_to_defining_documents():
+    index = build_index()
+    assert index.expand("RAG", {"b.pdf"}) == "RAG"
+    assert index.expand("RAG", {"a.pdf"}) == "RAG retrieval augmented generation"
+
+def test_saved_index_expands_like_built(tmp_path):
+    index = build_index()
+    index.save(tmp_path / "terms.json")
+    loaded = TermIndex.load(tmp_path / "terms.json")
+    assert loaded.expand("RL") == "RL reinforcement learning"
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import threading
+import httpx
+from typing import Callable, Optional
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+from utils.utils import config
+
+logger = logging.getLogger(__name__)
+
+CLIENT_CONFIG = config.get("llm_client", {})
+
+class ClientRegistry:
+    """
+    Process-wide registry of model clients.
+    All chat and embedding clients share one pooled, keep-alive HTTP client (sync and async),
+    so sockets and TLS sessions are reused across nodes, sessions and retrieval calls.
+    Each model also gets a semaphore capping its concurrent upstream requests.
+    `configure` swaps the client factories, e.g. for deterministic offline stand-ins in benchmarks.
+    """
+    _http_client = None
+    _http_async_client = None
+    _chat_models: dict[tuple, ChatOpenAI] = {}
+    _embeddings: dict[str, OpenAIEmbeddings] = {}
+    _rerankers: dict[tuple, object] = {}
+    _chat_factory: Optional[Callable] = None
+    _embeddings_factory: Optional[Callable] = None
+    _reranker_factory: Optional[Callable] = None
+    _semaphores: dict[str, asyncio.Semaphore] = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=CLIENT_CONFIG.get("max_connections", 100),
+            max_keepalive_connections=CLIENT_CONFIG.get("max_keepalive_connections", 20),
+            keepalive_expiry=CLIENT_CONFIG.get("keepalive_expiry", 30),
+        )
+
+    @classmethod
+    def http_clients(cls) -> tuple[httpx.Client, httpx.AsyncClient]:
+        with cls._lock:
+            if cls._http_client is None:
+                timeout = httpx.Timeout(CLIENT_CONFIG.get("timeout", 60))
+                cls._http_client = httpx.Client(limits=cls._limits(), timeout=timeout)
+                cls._http_async_client = httpx.AsyncClient(limits=cls._limits(), timeout=timeout)
+                logger.info("🔌 Created pooled HTTP clients for model providers")
+            return cls._http_client, cls._http_async_client
+
+    @classmethod
+    def configure(
+            cls,
+            chat: Optional[Callable] = None,
+            embeddings: Optional[Callable] = None,
+            reranker: Optional[Callable] = None
+    ):
+        """
+        Replaces how clients are created: `chat(model, temperature, streaming)`, `embeddings(model)`
+        and `reranker(model, top_n)`. None restores the provider client; cached clients are dropped.
+        """
+        with cls._lock:
+            cls._chat_factory, cls._embeddings_factory, cls._reranker_factory = chat, embeddings, reranker
+            cls._chat_models.clear()
+            cls._embeddings.clear()
+            cls._rerankers.clear()
+
+    @classmethod
+    def get_chat_model(cls, model: str, temperature: float = 0, streaming: bool = False) -> ChatOpenAI:
+        key = (model, temperature, streaming)
+        if cls._chat_factory is not None:
+            with cls._lock:
+                if key not in cls._chat_models:
+                    cls._chat_models[key] = cls._chat_factory(model, temperature, streaming)
+                return cls._chat_models[key]
+        http_client, http_async_client = cls.http_clients()
+        with cls._lock:
+            if key not in cls._chat_models:
+                cls._chat_models[key] = ChatOpenAI(
+                    model=model,
+                    temperature=temperature,
+                    streaming=streaming,
+                    stream_usage=True,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                )
+            return cls._chat_models[key]
+
+    @classmethod
+    def get_embeddings(cls, model: str = "text-embedding-3-small") -> OpenAIEmbeddings:
+        if cls._embeddings_factory is not None:
+            with cls._lock:
+                if model not in cls._embeddings:
+                    cls._embeddings[model] = cls._embeddings_factory(model)
+                return cls._embeddings[model]
+        http_client, http_async_client = cls.http_clients()
+        with cls._lock:
+            if model not in cls._embeddings:
+                cls._embeddings[model] = OpenAIEmbeddings(
+                    model=model,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                )
+            return cls._embeddings[model]
+
+    @classmethod
+    def get_reranker(cls, model: str = "rerank-english-v3.0", top_n: int = 4):
+        """One shared reranker per (model, top_n) instead of a new client per retrieval."""
+        key = (model, top_n)
+        with cls._lock:
+            if key not in cls._rerankers:
+                if cls._reranker_factory is not None:
+                    cls._rerankers[key] = cls._reranker_factory(model, top_n)
+                else:
+                    from langchain_cohere import CohereRerank
+                    cls._rerankers[key] = CohereRerank(model=model, top_n=top_n)
+            return cls._rerankers[key]
+
+    @classmethod
+    def semaphore(cls, model: str) -> asyncio.Semaphore:
+        """Caps concurrent in-flight requests per model (`llm_client.max_concurrency`)."""
+        with cls._lock:
+            if model not in cls._semaphores:
+                limits = CLIENT_CONFIG.get("max_concurrency", {})
+                cls._semaphores[model] = asyncio.Semaphore(limits.get(model, limits.get("default", 16)))
+            return cls._semaphores[model]
+
+    @classmethod
+    async def aclose(cls):
+        with cls._lock:
+            http_client, http_async_client = cls._http_client, cls._http_async_client
+            cls._http_client = cls._http_async_client = None
+            cls._chat_models.clear()
+            cls._embeddings.clear()
+            cls._rerankers.clear()
+        if http_async_client is not None:
+            await http_async_client.aclose()
+        if http_client is not None:
+            http_client.close()
@@ -0,0 +1,208 @@
+import time
+import asyncio
+import functools
+import inspect
+import itertools
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+# seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Metrics:
+    """
+    Process-wide counters and histograms, rendered in the Prometheus text format by `/metrics`.
+    Series are identified by metric name plus keyword labels.
+    """
+    _lock = threading.Lock()
+    _help: dict[str, tuple[str, str]] = {}  # name -> (type, help)
+    _counters: dict[tuple, float] = {}
+    _gauges: dict[tuple, float] = {}
+    _histograms: dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+
+    @classmethod
+    def describe(cls, name: str, kind: str, help: str):
+        cls._help[name] = (kind, help)
+
+    @classmethod
+    def inc(cls, name: str, value: float = 1.0, **labels):
+        key = cls._key(name, labels)
+        with cls._lock:
+            cls._counters[key] = cls._counters.get(key, 0.0) + value
+
+    @classmethod
+    def set(cls, name: str, value: float, **labels):
+        with cls._lock:
+            cls._gauges[cls._key(name, labels)] = value
+
+    @classmethod
+    def observe(cls, name: str, value: float, **labels):
+        key = cls._key(name, labels)
+        with cls._lock:
+            series = cls._histograms.get(key)
+            if series is None:
+                series = cls._histograms[key] = [0] * len(DEFAULT_BUCKETS) + [0.0, 0]
+            index = bisect_left(DEFAULT_BUCKETS, value)
+            if index < len(DEFAULT_BUCKETS):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @staticmethod
+    def _labels(labels: tuple, extra: tuple = ()) -> str:
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ""
+        escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+        return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+    @classmethod
+    def render(cls) -> str:
+        with cls._lock:
+            counters, gauges = dict(cls._counters), dict(cls._gauges)
+            histograms = {k: list(v) for k, v in cls._histograms.items()}
+        lines, described = [], set()
+
+        def header(name: str, kind: str):
+            if name in described:
+                return
+            described.add(name)
+            _, help = cls._help.get(name, (kind, ""))
+            if help:
+                lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in sorted(counters.items()):
+            header(name, "counter")
+            lines.append(f"{name}{cls._labels(labels)} {value}")
+        for (name, labels), value in sorted(gauges.items()):
+            header(name, "gauge")
+            lines.append(f"{name}{cls._labels(labels)} {value}")
+        for (name, labels), series in sorted(histograms.items()):
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(DEFAULT_BUCKETS, series):
+                cumulative += count
+                lines.append(f"{name}_bucket{cls._labels(labels, (('le', str(bound)),))} {cumulative}")
+            lines.append(f"{name}_bucket{cls._labels(labels, (('le', '+Inf'),))} {series[-1]}")
+            lines.append(f"{name}_sum{cls._labels(labels)} {series[-2]}")
+            lines.append(f"{name}_count{cls._labels(labels)} {series[-1]}")
+        return "\n".join(lines) + "\n"
+
+Metrics.describe("rag_node_seconds", "histogram", "Wall time of graph nodes")
+Metrics.describe("rag_stage_seconds", "histogram", "Wall time of retrieval / processing stages")
+Metrics.describe("llm_call_seconds", "histogram", "Wall time of upstream LLM calls (excluding queueing)")
+Metrics.describe("llm_queue_wait_seconds", "histogram", "Time LLM calls waited for the scheduler and concurrency slots")
+Metrics.describe("llm_tokens_total", "counter", "Tokens reported by the provider")
+Metrics.describe("cache_requests_total", "counter", "Cache lookups by cache and result")
+
+_trace_ids = itertools.count(1)
+
+class Trace:
+    """Per-request timing summary: spans and counters recorded by whatever ran for the request."""
+    def __init__(self):
+        self.id = next(_trace_ids)
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self.spans: dict[str, dict] = {}
+        self.counters: dict[str, float] = {}
+
+    def add(self, name: str, seconds: float):
+        with self._lock:
+            span = self.spans.setdefault(name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0})
+            span["count"] += 1
+            span["seconds"] += seconds
+            span["max_seconds"] = max(span["max_seconds"], seconds)
+
+    def count(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def summary(self) -> dict:
+        with self._lock:
+            return {
+                "total_seconds": round(time.perf_counter() - self.started, 4),
+                "spans": {
+                    name: {k: round(v, 4) if isinstance(v, float) else v for k, v in span.items()}
+                    for name, span in sorted(self.spans.items(), key=lambda item: -item[1]["seconds"])
+                },
+                "counters": dict(self.counters),
+            }
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("rag_trace", default=None)
+
+def start_trace() -> Trace:
+    """Starts the trace of a request; tasks and worker threads spawned afterwards inherit it."""
+    trace = Trace()
+    _current_trace.set(trace)
+    return trace
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def count(name: str, value: float = 1):
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.count(name, value)
+
+def record(metric: str, span: str, seconds: float, **labels):
+    Metrics.observe(metric, seconds, **labels)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(span, seconds)
+
+@contextmanager
+def timed(stage: str, **labels):
+    """Times a block as `rag_stage_seconds{stage=...}` and as a `stage:<name>` span of the current trace."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record("rag_stage_seconds", f"stage:{stage}", time.perf_counter() - start, stage=stage, **labels)
+
+def cache_result(cache: str, result: str):
+    """Counts a cache lookup outcome (hit / miss / coalesced)."""
+    Metrics.inc("cache_requests_total", cache=cache, result=result)
+    count(f"{cache}_cache_{result}")
+
+def timed_node(fn):
+    """Wraps a graph node so its wall time is recorded; name and signature are preserved for LangGraph."""
+    name = fn.__name__
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                record("rag_node_seconds", f"node:{name}", time.perf_counter() - start, node=name)
+        return async_wrapper
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            record("rag_node_seconds", f"node:{name}", time.perf_counter() - start, node=name)
+    return wrapper
+
+Metrics.describe("event_loop_lag_seconds", "histogram", "Delay of the event loop in waking a periodic timer")
+Metrics.describe("event_loop_lag_last_seconds", "gauge", "Most recent event loop lag sample")
+
+async def monitor_event_loop_lag(interval: float = 0.1):
+    """Samples how late the loop runs a timer; blocking work in coroutines shows up as lag."""
+    loop = asyncio.get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lag = max(loop.time() - expected, 0.0)
+        Metrics.observe("event_loop_lag_seconds", lag)
+        Metrics.set("event_loop_lag_last_seconds", lag)
@@ -0,0 +1,245 @@
+import copy
+import json
+import asyncio
+import hashlib
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Optional
+from langchain_core.messages import BaseMessage
+from langchain_openai import ChatOpenAI
+from utils.utils import config
+from utils.client_registry import ClientRegistry
+from utils.llm_scheduler import RateLimitScheduler, SCHEDULER_CONFIG
+from langgraph.config import get_config
+from utils.token_budget import count_tokens, TokenUsage
+from utils.instrumentation import Metrics, record, count, cache_result
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONFIG = config.get("llm_cache", {})
+
+class LLMClient:
+    """
+    Shared LLM access layer for the graph nodes.
+    - one `ChatOpenAI` per (model, temperature, streaming) from `ClientRegistry`, on pooled HTTP connections
+    - upstream calls pass the shared rate-limit scheduler (priority + per-session fairness)
+      and respect the per-model concurrency limit
+    - responses of deterministic (temperature 0) structured calls are cached
+    - identical in-flight calls from concurrent sessions are coalesced into one upstream request
+    """
+    _cache: "OrderedDict[str, Any]" = OrderedDict()
+    _inflight: dict[str, asyncio.Future] = {}
+    _hits = 0
+    _misses = 0
+    _coalesced = 0
+
+    cache_enabled = CACHE_CONFIG.get("enabled", True)
+    max_entries = CACHE_CONFIG.get("max_entries", 2048)
+
+    @classmethod
+    def get_chat_model(cls, model: str, temperature: float = 0, streaming: bool = False) -> ChatOpenAI:
+        return ClientRegistry.get_chat_model(model, temperature=temperature, streaming=streaming)
+
+    @staticmethod
+    def _current_session():
+        """thread_id of the graph run this call belongs to (None outside a graph)."""
+        try:
+            return get_config().get("configurable", {}).get("thread_id")
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def _current_node():
+        """Graph node issuing the call, used to attribute token usage."""
+        try:
+            return get_config().get("metadata", {}).get("langgraph_node")
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def _estimate_tokens(messages: list) -> int:
+        prompt = sum(count_tokens(str(LLMClient._message_fingerprint(m)["content"])) for m in messages)
+        return prompt + SCHEDULER_CONFIG.get("completion_tokens_estimate", 512)
+
+    @classmethod
+    async def _admit(cls, messages: list, priority: str, session) -> int:
+        """Waits for the scheduler; returns the token estimate it debited (see `_settle`)."""
+        tokens = cls._estimate_tokens(messages)
+        await RateLimitScheduler.acquire(
+            priority=priority,
+            session=session if session is not None else cls._current_session(),
+            tokens=tokens
+        )
+        return tokens
+
+    @staticmethod
+    async def _settle(estimated: int, usage: Optional[dict]):
+        """Charges the scheduler the tokens the provider reported instead of the admission estimate."""
+        if not usage:
+            return
+        actual = usage.get("total_tokens") or usage.get("input_tokens", 0) + usage.get("output_tokens", 0)
+        await RateLimitScheduler.settle(estimated, actual)
+
+    @staticmethod
+    def _record_usage(node: Optional[str], usage: Optional[dict]):
+        TokenUsage.record(node, usage)
+        if not usage:
+            return
+        Metrics.inc("llm_tokens_total", usage.get("input_tokens", 0), kind="prompt", node=node or "unknown")
+        Metrics.inc("llm_tokens_total", usage.get("output_tokens", 0), kind="completion", node=node or "unknown")
+        count("llm_prompt_tokens", usage.get("input_tokens", 0))
+        count("llm_completion_tokens", usage.get("output_tokens", 0))
+
+    @classmethod
+    async def _limited(cls, model: ChatOpenAI, runnable, messages: list, priority: str, session, tags=None):
+        queued = time.perf_counter()
+        estimated = await cls._admit(messages, priority, session)
+        async with ClientRegistry.semaphore(model.model_name):
+            started = time.perf_counter()
+            record("llm_queue_wait_seconds", "llm:queue_wait", started - queued, priority=priority)
+            try:
+                result = await runnable.ainvoke(messages, config={"tags": tags} if tags else None)
+            finally:
+                node = cls._current_node() or "unknown"
+                record("llm_call_seconds", f"llm:{node}", time.perf_counter() - started, model=model.model_name, node=node)
+        # structured calls return {"raw": AIMessage, "parsed": ...}
+        response = result.get("raw") if isinstance(result, dict) else result
+        await cls._settle(estimated, getattr(response, "usage_metadata", None))
+        return result
+
+    @classmethod
+    async def invoke(
+            cls,
+            model: ChatOpenAI,
+            messages: list,
+            priority: str = "interactive",
+            session=None,
+            tags: Optional[list[str]] = None
+    ):
+        """Plain (free-text) call under the scheduler and concurrency limit; never cached."""
+        response = await cls._limited(model, model, messages, priority, session, tags)
+        cls._record_usage(cls._current_node(), response.usage_metadata)
+        return response
+
+    @classmethod
+    async def _structured_call(cls, model: ChatOpenAI, schema, messages: list, priority: str, session, tags):
+        result = await cls._limited(
+            model, model.with_structured_output(schema, include_raw=True), messages, priority, session, tags
+        )
+        cls._record_usage(cls._current_node(), getattr(result["raw"], "usage_metadata", None))
+        if result.get("parsing_error") is not None:
+            raise result["parsing_error"]
+        return result["parsed"]
+
+    @classmethod
+    async def stream(
+            cls,
+            model: ChatOpenAI,
+            messages: list,
+            priority: str = "interactive",
+            session=None,
+            tags: Optional[list[str]] = None
+    ) -> AsyncIterator[str]:
+        """Yields text tokens; the concurrency slot is held until the stream is exhausted."""
+        queued = time.perf_counter()
+        estimated = await cls._admit(messages, priority, session)
+        usage = {}
+        node = cls._current_node() or "unknown"
+        async with ClientRegistry.semaphore(model.model_name):
+            started = time.perf_counter()
+            record("llm_queue_wait_seconds", "llm:queue_wait", started - queued, priority=priority)
+            try:
+                async for chunk in model.astream(messages, config={"tags": tags} if tags else None):
+                    if chunk.usage_metadata:
+                        usage = chunk.usage_metadata
+                    if chunk.content:
+                        yield chunk.content
+            finally:
+                record("llm_call_seconds", f"llm:{node}", time.perf_counter() - started, model=model.model_name, node=node)
+        await cls._settle(estimated, usage)
+        cls._record_usage(node, usage)
+
+    @staticmethod
+    def _schema_fingerprint(schema) -> str:
+        if hasattr(schema, "model_json_schema"):
+            return json.dumps(schema.model_json_schema(), sort_keys=True)
+        return f"{schema.__name__}:{getattr(schema, '__annotations__', {})}"
+
+    @staticmethod
+    def _message_fingerprint(message) -> dict:
+        if isinstance(message, BaseMessage):
+            return {"role": message.type, "content": message.content}
+        return {"role": message.get("role"), "content": message.get("content")}
+
+    @classmethod
+    def _cache_key(cls, model: ChatOpenAI, schema, messages: list) -> str:
+        payload = json.dumps({
+            "model": model.model_name,
+            "temperature": model.temperature,
+            "schema": cls._schema_fingerprint(schema),
+            "messages": [cls._message_fingerprint(m) for m in messages],
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @classmethod
+    async def structured_invoke(
+            cls,
+            model: ChatOpenAI,
+            schema,
+            messages: list,
+            priority: str = "background",
+            session=None,
+            tags: Optional[list[str]] = None
+    ):
+        """
+        `model.with_structured_output(schema).ainvoke(messages)` behind the cache and coalescing.
+        `priority` is one of "interactive", "planning", "background" (see `RateLimitScheduler`).
+        """
+        key = cls._cache_key(model, schema, messages)
+        cacheable = cls.cache_enabled and not model.temperature
+
+        if cacheable and key in cls._cache:
+            cls._cache.move_to_end(key)
+            cls._hits += 1
+            cache_result("llm", "hit")
+            return copy.deepcopy(cls._cache[key])
+
+        inflight = cls._inflight.get(key)
+        if inflight is not None:
+            cls._coalesced += 1
+            cache_result("llm", "coalesced")
+            logger.info("🔗 Coalesced identical in-flight LLM call")
+            return copy.deepcopy(await asyncio.shield(inflight))
+
+        cls._misses += 1
+        cache_result("llm", "miss")
+        task = asyncio.ensure_future(
+            cls._structured_call(model, schema, messages, priority, session, tags)
+        )
+        cls._inflight[key] = task
+        try:
+            response = await asyncio.shield(task)
+        finally:
+            if task.done():
+                cls._inflight.pop(key, None)
+            else:
+                # The leader was cancelled; leave the call running for the coalesced followers
+                task.add_done_callback(lambda _: cls._inflight.pop(key, None))
+
+        if cacheable:
+            cls._cache[key] = copy.deepcopy(response)
+            while len(cls._cache) > cls.max_entries:
+                cls._cache.popitem(last=False)
+        return response
+
+    @classmethod
+    def stats(cls) -> dict:
+        total = cls._hits + cls._misses
+        return {
+            "hits": cls._hits,
+            "misses": cls._misses,
+            "coalesced": cls._coalesced,
+            "hit_rate": cls._hits / total if total else 0.0,
+            "entries": len(cls._cache),
+        }
@@ -0,0 +1,138 @@
+import time
+import heapq
+import asyncio
+import itertools
+import logging
+from typing import Optional
+from utils.utils import config
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_CONFIG = config.get("llm_scheduler", {})
+# Lower value is served first
+PRIORITIES = {"interactive": 0, "planning": 1, "background": 2}
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def consume(self, amount: float):
+        self._refill()
+        self.level -= min(amount, self.capacity)
+
+    def adjust(self, consumed: float, actual: float):
+        """Corrects an earlier `consume(consumed)` to the `actual` amount used (a refund when it was lower)."""
+        self._refill()
+        self.level = min(self.capacity, self.level + min(consumed, self.capacity) - min(actual, self.capacity))
+
+class RateLimitScheduler:
+    """
+    Admission control for every outbound LLM call in the process.
+    Requests/min and tokens/min are enforced with token buckets; waiting calls are served by
+    priority class first, then round-robin across sessions (thread ids), then arrival order.
+    """
+    enabled = SCHEDULER_CONFIG.get("enabled", True)
+    _requests = TokenBucket(SCHEDULER_CONFIG.get("requests_per_minute", 500))
+    _tokens = TokenBucket(SCHEDULER_CONFIG.get("tokens_per_minute", 200000))
+    _queue: list[tuple] = []
+    _seq = itertools.count()
+    _virtual_time = 0
+    _session_tags: dict[str, int] = {}
+    _cond: Optional[asyncio.Condition] = None
+    _loop = None
+
+    @classmethod
+    def _condition(cls) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if cls._cond is None or cls._loop is not loop:
+            cls._cond, cls._loop = asyncio.Condition(), loop
+            cls._queue = []
+        return cls._cond
+
+    @classmethod
+    def _fair_tag(cls, session: Optional[str]) -> int:
+        # Each session advances its own round counter, so a burst from one session
+        # queues behind the next request of every other session
+        tag = max(cls._virtual_time, cls._session_tags.get(session, 0)) + 1
+        cls._session_tags[session] = tag
+        return tag
+
+    @classmethod
+    def _dispatch(cls, entry: tuple, tokens: int):
+        heapq.heappop(cls._queue)
+        cls._requests.consume(1)
+        cls._tokens.consume(tokens)
+        cls._virtual_time = entry[1]
+        if len(cls._session_tags) > 1024:
+            cls._session_tags = {s: t for s, t in cls._session_tags.items() if t > cls._virtual_time}
+
+    @classmethod
+    async def acquire(cls, priority: str = "background", session: Optional[str] = None, tokens: int = 0) -> float:
+        """Wait until the call may be sent upstream; returns the time spent queued (seconds)."""
+        if not cls.enabled:
+            return 0.0
+        start = time.monotonic()
+        cond = cls._condition()
+        async with cond:
+            entry = (PRIORITIES.get(priority, PRIORITIES["background"]), cls._fair_tag(session), next(cls._seq))
+            heapq.heappush(cls._queue, entry)
+            try:
+                while True:
+                    timeout = None
+                    if cls._queue[0] == entry:
+                        timeout = max(cls._requests.wait_time(1), cls._tokens.wait_time(tokens))
+                        if timeout <= 0:
+                            cls._dispatch(entry, tokens)
+                            cond.notify_all()
+                            break
+                    try:
+                        await asyncio.wait_for(cond.wait(), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except asyncio.CancelledError:
+                if entry in cls._queue:
+                    cls._queue.remove(entry)
+                    heapq.heapify(cls._queue)
+                    cond.notify_all()
+                raise
+        waited = time.monotonic() - start
+        if waited > 1:
+            logger.info(f"⏳ LLM call ({priority}) queued {waited:.2f}s by the rate limiter")
+        return waited
+
+    @classmethod
+    async def settle(cls, estimated_tokens: int, actual_tokens: int):
+        """
+        Replaces the token estimate debited by `acquire` with the usage the provider reported,
+        so over-estimates are returned to the bucket and under-estimates are charged.
+        """
+        if not cls.enabled or estimated_tokens == actual_tokens:
+            return
+        cond = cls._condition()
+        async with cond:
+            cls._tokens.adjust(estimated_tokens, actual_tokens)
+            # a refund may let the head of the queue go now
+            cond.notify_all()
+
+    @classmethod
+    def stats(cls) -> dict:
+        return {
+            "queued": len(cls._queue),
+            "requests_available": round(cls._requests.level, 1),
+            "tokens_available": round(cls._tokens.level),
+        }
@@ -1,7 +1,6 @@
 import re
-from pypdf import PdfReader
-from transformers import pipeline
-import pprint
+from typing import Optional
+from utils.utils import config
 
 def fix_broken_words(text):
     # Fix: "I NTRODUCTION" → "INTRODUCTION"
@@ -10,6 +9,7 @@ def fix_broken_words(text):
     return text
 
 def extract_text_from_pdf(path):
+    from pypdf import PdfReader
     reader = PdfReader(path)
     text = ""
     for page in reader.pages:
@@ -232,4 +232,26 @@ def build_paper_signature(pdf_path):
     return signature
 
 
-paper_signature = build_paper_signature("/Users/george/ai-projects/MultiAgenticRAG_Rep/papers/2310.08560v2.pdf")
+_paper_signature: Optional[dict] = None
+
+def get_paper_signature() -> dict:
+    """Signature of the configured paper (`retriever.file_pth`), extracted on first use."""
+    global _paper_signature
+    if _paper_signature is None:
+        _paper_signature = build_paper_signature(config["retriever"]["file_pth"])
+    return _paper_signature
+
+# prompt text in place of a signature for collections it does not describe
+NO_SIGNATURE = "(none: this collection holds uploaded documents, not the configured paper)"
+
+def get_collection_signature(collection: Optional[str] = None) -> Optional[dict]:
+    """The paper signature for the default collection; None for any other, whose documents it does not describe."""
+    from RAG.index_manager import DEFAULT_COLLECTION
+    if collection and collection != DEFAULT_COLLECTION:
+        return None
+    return get_paper_signature()
+
+def set_paper_signature(signature: dict):
+    """Replaces the signature, e.g. for benchmarks over a synthetic corpus."""
+    global _paper_signature
+    _paper_signature = signature
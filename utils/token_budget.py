@@ -0,0 +1,103 @@
+import threading
+from functools import lru_cache
+from typing import Optional
+import tiktoken
+
+# Rough chars-per-token ratio used when the tokenizer files are unavailable (e.g. offline)
+CHARS_PER_TOKEN = 4
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text or "") // CHARS_PER_TOKEN)
+    return len(encoding.encode(text or "", disallowed_special=()))
+
+def truncate_to_budget(text: str, max_tokens: int, model: str = "gpt-4o-mini") -> str:
+    encoding = _encoding(model)
+    if encoding is None:
+        return (text or "")[:max_tokens * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text or "", disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])
+
+def pack_by_score(
+        items: list[str],
+        scores: Optional[list[float]],
+        budget: int,
+        model: str = "gpt-4o-mini"
+) -> list[int]:
+    """
+    Greedily keeps the highest-scoring items whose token counts fit in `budget`.
+    Returns the kept indices in their original order.
+    """
+    scores = scores if scores and len(scores) == len(items) else [0.0] * len(items)
+    order = sorted(range(len(items)), key=lambda i: scores[i], reverse=True)
+    kept, used = [], 0
+    for i in order:
+        cost = count_tokens(items[i], model)
+        if used + cost > budget:
+            continue
+        kept.append(i)
+        used += cost
+    return sorted(kept)
+
+MERGE_SEPARATOR = "\n\n------------------------------------\n\n"
+
+def group_by_score(
+        items: list[str],
+        scores: list[float],
+        budget: int,
+        separator: str = MERGE_SEPARATOR,
+        model: str = "gpt-4o-mini"
+) -> list[tuple[list[int], float]]:
+    """
+    Packs items (highest score first) into as few groups as possible, each within `budget` tokens
+    once joined by `separator`. Items larger than the budget get a group of their own.
+    Returns (item indices, best score in the group) pairs.
+    """
+    groups: list[list] = []  # [indices, tokens, best score]
+    for i in sorted(range(len(items)), key=lambda i: scores[i], reverse=True):
+        cost = count_tokens(items[i], model)
+        if cost >= budget:
+            groups.append([[i], budget, scores[i]])
+            continue
+        cost += count_tokens(separator, model)
+        for group in groups:
+            if group[1] + cost <= budget:
+                group[0].append(i)
+                group[1] += cost
+                break
+        else:
+            groups.append([[i], cost, scores[i]])
+    return [(indices, best) for indices, _, best in groups]
+
+class TokenUsage:
+    """Prompt / completion tokens reported by the provider, aggregated per graph node."""
+    _lock = threading.Lock()
+    _nodes: dict[str, dict] = {}
+
+    @classmethod
+    def record(cls, node: Optional[str], usage: Optional[dict]):
+        if not usage:
+            return
+        with cls._lock:
+            entry = cls._nodes.setdefault(node or "unknown", {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            entry["calls"] += 1
+            entry["prompt_tokens"] += usage.get("input_tokens", 0)
+            entry["completion_tokens"] += usage.get("output_tokens", 0)
+
+    @classmethod
+    def stats(cls) -> dict:
+        with cls._lock:
+            return {node: dict(entry) for node, entry in cls._nodes.items()}
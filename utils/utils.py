@@ -1,13 +1,17 @@
 import yaml
 import uuid
 from langchain_core.documents import Document
+from langgraph.constants import TAG_NOSTREAM
 from typing import List, Dict, TypedDict
 def load_config(file_path="./config.yaml"):
     with open(file_path, 'r') as f:
         config = yaml.safe_load(f)
     return config
 
-def reduce_docs(a: list, b: list) -> list:
+def reduce_docs(a: list, b) -> list:
+    # "delete" resets the accumulated list (used at the start of every turn of a checkpointed thread)
+    if b == "delete":
+        return []
     return a + b
 
 def new_uuid():
@@ -56,19 +60,24 @@ Evidence:
 """
     class Alignment(TypedDict):
         alignment: Dict[str, list]
-    response = await model.with_structured_output(Alignment).ainvoke(
-        [{"role": "system", "content": prompt}]
+    from utils.llm_client import LLMClient
+    response = await LLMClient.structured_invoke(
+        model, Alignment, [{"role": "system", "content": prompt}], priority="interactive", tags=[TAG_NOSTREAM]
     )
     return response["alignment"]
 
 
-async def write_step_from_evidence(
+async def stream_step_from_evidence(
     model,
     step: str,
     selected_evidence: list[str],
 ):
+    """
+    Rewrites the evidence selected for one research step into a grounded paragraph, yielded token by token.
+    """
     if not selected_evidence:
-        return "The provided evidence does not contain information about this aspect."
+        yield "The provided evidence does not contain information about this aspect."
+        return
 
     prompt = f"""
 You are a grounded writing assistant.
@@ -93,18 +102,13 @@ Evidence:
 ==================
 OUTPUT FORMAT
 ==================
-OUTPUT JSON ONLY:
-    {{
-    "paragraph": "..."
-    }}
-
+Output the paragraph as plain text only, with no heading, JSON or commentary.
 """
-    class StepParagraph(TypedDict):
-        paragraph: str
-
-    response = await model.with_structured_output(StepParagraph).ainvoke(
-        [{"role": "system", "content": prompt}]
-    )
-    return response
+    from utils.llm_client import LLMClient
+    # Tokens are forwarded by the caller through the custom stream, so keep them out of "messages"
+    async for token in LLMClient.stream(
+        model, [{"role": "system", "content": prompt}], priority="interactive", tags=[TAG_NOSTREAM]
+    ):
+        yield token
 
 config = load_config()
\ No newline at end of file